@@ -0,0 +1,95 @@
+import os
+from queue import Queue, Full, Empty
+from threading import Thread, Lock
+
+import cv2
+
+FORMATS = {
+    "png": (".png", cv2.IMWRITE_PNG_COMPRESSION),
+    "jpg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+class ArtifactSink:
+    """
+    Writes debug images on a small pool of worker threads. submit() never blocks: when
+    the queue is full the image is dropped and counted, so detection never waits on
+    encoding or disk I/O. level is the PNG compression (0-9) or the JPEG/WebP quality
+    (0-100) depending on fmt.
+    """
+
+    def __init__(self, base_dir="debug", fmt="png", level=1, workers=2, max_queue=32):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown image format '{fmt}', expected one of {sorted(FORMATS)}")
+        self.base_dir = base_dir
+        self.ext, param = FORMATS[fmt]
+        self.params = [param, int(level)]
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._lock = Lock()
+
+        os.makedirs(base_dir, exist_ok=True)
+        self._queue = Queue(maxsize=max_queue)
+        self._threads = [Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, name, img, copy=False):
+        """
+        Queue img to be saved as <base_dir>/<name><ext>. The sink keeps a reference, so pass
+        copy=True for buffers the caller will overwrite. Returns False if it was dropped.
+        """
+        if img is None:
+            return False
+        try:
+            self._queue.put((name, img.copy() if copy else img), block=False)
+        except Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def _worker(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except Empty:
+                continue
+            if item is None:
+                break
+            name, img = item
+            try:
+                ok, buf = cv2.imencode(self.ext, img, self.params)
+                if not ok:
+                    raise ValueError(f"could not encode {name}")
+                with open(os.path.join(self.base_dir, name + self.ext), "wb") as f:
+                    f.write(buf.tobytes())
+                with self._lock:
+                    self.written += 1
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"[WARN] Failed to write debug image {name}: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "queue_depth": self._queue.qsize(),
+            }
+
+    def close(self, timeout=2.0):
+        """Writes what is still queued, then stops the workers."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join(timeout=timeout)
@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+
+
+class SnapshotBackground:
+    """
+    The original model: the background is the frame it was last reset to. reset() copies
+    into the existing array when the shape is unchanged instead of allocating a new one.
+    """
+
+    kind = "snapshot"
+
+    def __init__(self):
+        self.frame = None
+
+    def reset(self, img):
+        if self.frame is None or self.frame.shape != img.shape:
+            self.frame = img.copy()
+        else:
+            np.copyto(self.frame, img)
+
+    def update(self, img, motion_mask):
+        """Called once per analysed frame, motion_mask is 255 where something moved."""
+        pass
+
+    def clear(self):
+        self.frame = None
+
+
+class RunningAverageBackground(SnapshotBackground):
+    """
+    Per-pixel running mean in float32: every frame, pixels without motion move alpha of
+    the way towards the new frame (cv2.accumulateWeighted with a mask), in place. Slow
+    lighting changes and sensor noise fade into the background instead of building up
+    until the camera-adjustment check resets everything. Pixels with motion, such as a
+    dart that is still settling, are left alone. frame is the mean rounded to uint8.
+    """
+
+    kind = "running"
+
+    def __init__(self, alpha=0.05):
+        super().__init__()
+        self.alpha = alpha
+        self.mean = None
+        self._still = None
+
+    def reset(self, img):
+        super().reset(img)
+        if self.mean is None or self.mean.shape != img.shape:
+            self.mean = img.astype(np.float32)
+            self._still = np.empty(img.shape, dtype=np.uint8)
+        else:
+            np.copyto(self.mean, img)
+
+    def update(self, img, motion_mask):
+        if self.mean is None or self.mean.shape != img.shape:
+            return
+        cv2.bitwise_not(motion_mask, dst=self._still)
+        cv2.accumulateWeighted(img, self.mean, self.alpha, mask=self._still)
+        cv2.convertScaleAbs(self.mean, dst=self.frame)
+
+    def clear(self):
+        super().clear()
+        self.mean = None
+
+
+BACKGROUNDS = {
+    "snapshot": SnapshotBackground,
+    "running": RunningAverageBackground,
+}
+
+
+def make_background(model):
+    """A background model instance from a name in BACKGROUNDS, or model itself."""
+    if isinstance(model, str):
+        if model not in BACKGROUNDS:
+            raise ValueError(f"Unknown background model '{model}', expected one of {sorted(BACKGROUNDS)}")
+        return BACKGROUNDS[model]()
+    return model
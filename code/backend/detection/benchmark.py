@@ -0,0 +1,723 @@
+import argparse
+import time
+
+import numpy as np
+
+
+def _timeit(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_classifier(args):
+    from classifier import classify_ring, classify_sector, classify_field
+    from score_table import ScoreTable
+
+    shape = (args.height, args.width)
+    rng = np.random.default_rng(0)
+    xs = rng.integers(0, args.width, args.points)
+    ys = rng.integers(0, args.height, args.points)
+
+    start = time.perf_counter()
+    table = ScoreTable(shape)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    def scalar():
+        return [classify_field(classify_ring(int(x), int(y)), classify_sector(int(x), int(y)))
+                for x, y in zip(xs, ys)]
+
+    def table_scalar():
+        return [table.lookup(x, y) for x, y in zip(xs, ys)]
+
+    def table_batch():
+        return table.lookup_labels(xs, ys)
+
+    expected = scalar()
+    mismatches = sum(1 for a, b in zip(expected, table.lookup_many(xs, ys)) if a != b)
+
+    t_scalar = _timeit(scalar, repeat=1)
+    t_lookup = _timeit(table_scalar)
+    t_batch = _timeit(table_batch)
+
+    print(f"Frame {args.width}x{args.height}, {args.points} points")
+    print(f"  table build:        {build_ms:9.1f} ms")
+    print(f"  classify_* scalar:  {t_scalar / args.points * 1e6:9.3f} us/point")
+    print(f"  table lookup:       {t_lookup / args.points * 1e6:9.3f} us/point  ({t_scalar / t_lookup:.0f}x)")
+    print(f"  table lookup_many:  {t_batch / args.points * 1e6:9.3f} us/point  ({t_scalar / t_batch:.0f}x)")
+    print(f"  mismatches vs scalar: {mismatches}")
+
+
+def bench_batch(args):
+    from classifier import classify_ring_array, classify_sector_array, classify_field_array
+
+    rng = np.random.default_rng(args.seed)
+    xs = rng.uniform(0, args.width, args.points).astype(np.float32)
+    ys = rng.uniform(0, args.height, args.points).astype(np.float32)
+
+    def run():
+        outer, inner = classify_ring_array(xs, ys)
+        return classify_field_array(outer, inner, classify_sector_array(xs, ys))
+
+    elapsed = _timeit(run, repeat=3)
+    print(f"{args.points} points in {elapsed * 1000:.1f} ms ({args.points / elapsed / 1e6:.2f} M points/s)")
+
+
+def _traced(fn, frames):
+    """Runs fn once per frame under tracemalloc. Returns the mean peak of bytes allocated during a frame."""
+    import tracemalloc
+
+    # Warm up caches. A detector only allocates its per-frame buffers on the frame after
+    # the one that set the background
+    for _ in range(3):
+        fn()
+    tracemalloc.start()
+    peaks = []
+    for _ in range(frames):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - base)
+    tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def bench_masks(args):
+    import cv2
+    from board_cache import BoardCache, build_board_ignore_mask
+    from detector import DartDetector
+    from draw_canvas import draw_ellipses, draw_sector_lines
+    from file_handler import load_rings, load_lines
+
+    ring_data, _ = load_rings()
+    sector_config = load_lines()
+    shape = (args.height, args.width)
+    frame_bytes = args.height * args.width
+    thresh = np.zeros(shape, dtype=np.uint8)
+    known_darts = [(args.width // 2, args.height // 2), (args.width // 3, args.height // 2)]
+
+    def legacy():
+        # What main() and DartDetector.update did on every frame before the cache
+        canvas = np.zeros((shape[0], shape[1], 3), dtype=np.uint8)
+        draw_ellipses(canvas, ring_data)
+        draw_sector_lines(canvas, ring_data[0], *sector_config)
+        board_ignore_mask = np.ones(shape, dtype=np.uint8)
+        outer = ring_data[0]
+        ax = int(outer[2] * outer[3]) + 80
+        ay = int(outer[2] * outer[4]) + 80
+        cv2.ellipse(board_ignore_mask, (int(outer[0]), int(outer[1])), (ax, ay), 0.0, 0.0, 360.0, (0,), -1)
+        canvas_mask = np.any(canvas != 0, axis=2).astype(np.uint8)
+        mask = board_ignore_mask.astype(bool)
+        t = thresh.copy()
+        t[mask] = 0
+        known_mask = np.ones_like(t) * 255
+        for (x, y) in known_darts:
+            cv2.circle(known_mask, (int(x), int(y)), 12, (0,), -1)
+        return cv2.bitwise_and(t, t, mask=known_mask), canvas, canvas_mask
+
+    cache = BoardCache(padding=80)
+    detector = DartDetector()
+    detector.known_darts = list(known_darts)
+
+    def cached():
+        board = cache.get(ring_data, sector_config, shape)
+        keep = detector._get_keep_mask(board.ignore_mask, shape)
+        return cv2.bitwise_and(thresh, keep, dst=thresh), board.overlay
+
+    assert np.array_equal(legacy()[0], cv2.bitwise_and(
+        thresh, detector._get_keep_mask(build_board_ignore_mask(shape, ring_data, 80), shape)))
+
+    for name, fn in (("legacy", legacy), ("cached", cached)):
+        peak = _traced(fn, args.frames)
+        elapsed = _timeit(fn, repeat=args.frames)
+        print(f"  {name:7s} {elapsed * 1000:7.2f} ms/frame, "
+              f"peak {peak / 1e6:7.2f} MB/frame ({peak / frame_bytes:.1f} gray-frame buffers)")
+
+    # A new dart: the keep mask used to be rebuilt, now the dart is stamped into it
+    ignore_mask = cache.get(ring_data, sector_config, shape).ignore_mask
+    rng = np.random.default_rng(0)
+    darts = [(int(x), int(y)) for x, y in zip(rng.integers(0, args.width, 100), rng.integers(0, args.height, 100))]
+    for name, stamp in (("rebuild", False), ("stamp", True)):
+        detector.known_darts = []
+        detector._get_keep_mask(ignore_mask, shape)
+        start = time.perf_counter()
+        for dart in darts:
+            detector.known_darts.append(dart)
+            if not stamp:
+                detector._keep_mask = None
+            detector._get_keep_mask(ignore_mask, shape)
+        elapsed = (time.perf_counter() - start) / len(darts)
+        print(f"  new dart, {name:7s} {elapsed * 1000:7.3f} ms")
+    start = time.perf_counter()
+    for dart in darts:
+        detector.known_darts.near(dart[0] + 5, dart[1] + 5, detector.duplicate_radius)
+    print(f"  duplicate lookup among {len(darts)} darts {(time.perf_counter() - start) / len(darts) * 1e6:7.2f} us")
+    detector.cleanup()
+
+
+def _synthetic_frames(count, width, height, seed=0):
+    """Empty board, then one bright dart-like stroke per frame on top of sensor noise."""
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    board = np.full((height, width, 3), 90, dtype=np.uint8)
+    cv2.circle(board, (width // 2, height // 2), int(height * 0.4), (40, 60, 40), -1)
+    frames = [board.copy()]
+    for _ in range(count):
+        frame = board.copy()
+        x = int(rng.uniform(0.35, 0.6) * width)
+        y = int(rng.uniform(0.3, 0.7) * height)
+        angle = rng.uniform(-0.5, 0.5)
+        length = rng.uniform(100, 180)
+        end = (int(x + length * np.cos(angle)), int(y + length * np.sin(angle)))
+        cv2.line(frame, (x, y), end, (240, 240, 240), 5)
+        cv2.line(frame, end, (end[0] + 60, end[1] - 20), (20, 20, 200), 16)
+        noise = rng.normal(0, 3, frame.shape)
+        frames.append(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    return frames
+
+
+def _thresh_from_diff(detector, diff):
+    """The part of DartDetector.update between the filter chain and blob analysis."""
+    import cv2
+
+    thresh = detector._apply_filter_pipeline(diff)
+    thresh = cv2.dilate(thresh, None, iterations=2)
+    thresh = cv2.erode(thresh, None, iterations=1)
+    return detector._connect_dart_parts(thresh)
+
+
+def _leftmost(hull):
+    """The tip as DartDetector took it before tip.TipLocator: the leftmost hull point"""
+    pts = hull.reshape(-1, 2)
+    return tuple(pts[np.argmin(pts[:, 0])].astype(int))
+
+
+def _tip_from_thresh(detector, thresh, find_blobs):
+    from blobs import blob_hull
+
+    blobs, labels, origin = find_blobs(thresh, detector.min_blob_area)
+    if not blobs:
+        return None
+    return _leftmost(blob_hull(labels, blobs, origin))
+
+
+def _legacy_tip_from_thresh(detector, thresh):
+    """findContours, contourArea per contour, vstack and a hull of the hull, as update() did before blobs.py"""
+    import cv2
+
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    contours = [c for c in contours if cv2.contourArea(c) >= detector.min_blob_area]
+    contours = sorted(contours, key=cv2.contourArea, reverse=True)
+    if not contours:
+        return None
+    pts = np.vstack([c.reshape(-1, 2) for c in contours]).astype(np.float32)
+    if len(pts) < 3:
+        return None
+    return _leftmost(cv2.convexHull(cv2.convexHull(pts.reshape(-1, 1, 2))))
+
+
+def _tip_from_diff(detector, diff):
+    """thresh and the tip DartDetector would report for diff at full resolution"""
+    thresh = _thresh_from_diff(detector, diff)
+    blobs, labels, origin = detector.find_blobs(thresh, detector.min_blob_area)
+    tip, _, _ = detector.tip_locator.locate(labels, blobs, origin, diff)
+    return thresh, tip
+
+
+def _load_diffs(args):
+    import cv2
+
+    if args.frames:
+        from replay import ReplaySource
+        frames = [frame for _, frame in ReplaySource(args.frames, limit=args.limit)]
+    else:
+        frames = _synthetic_frames(args.limit or 30, args.width, args.height)
+    if len(frames) < 2:
+        raise SystemExit("Need at least two frames (background + one or more)")
+
+    def blurred(frame):
+        return cv2.GaussianBlur(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (9, 9), 0)
+
+    bg = blurred(frames[0])
+    return [cv2.absdiff(bg, blurred(f)) for f in frames[1:]]
+
+
+def bench_filters(args):
+    from detector import DartDetector
+    from filters import PRESETS
+
+    diffs = _load_diffs(args)
+    h, w = diffs[0].shape
+    print(f"{len(diffs)} frames at {w}x{h}")
+
+    detectors = {}
+    for name in ["reference"] + [p for p in PRESETS if p != "reference"]:
+        det = DartDetector(filter_pipeline=name)
+        detectors[name] = det
+
+    reference = [_tip_from_diff(detectors["reference"], d) for d in diffs]
+
+    for name, det in detectors.items():
+        elapsed = _timeit(lambda: [det._apply_filter_pipeline(d) for d in diffs], repeat=3) / len(diffs)
+        deviations, missed, extra, agreement = [], 0, 0, []
+        for d, (ref_thresh, ref_tip) in zip(diffs, reference):
+            thresh, tip = _tip_from_diff(det, d)
+            agreement.append(np.mean(thresh == ref_thresh))
+            if ref_tip is None and tip is None:
+                continue
+            if ref_tip is None:
+                extra += 1
+            elif tip is None:
+                missed += 1
+            else:
+                deviations.append(float(np.hypot(tip[0] - ref_tip[0], tip[1] - ref_tip[1])))
+        dev = f"mean {np.mean(deviations):5.2f} px, max {np.max(deviations):5.2f} px" if deviations else "no tips"
+        print(f"  {name:10s} {elapsed * 1000:7.2f} ms/frame  tip deviation {dev}, "
+              f"missed {missed}, extra {extra}, thresh agreement {np.mean(agreement):.4%}")
+        print(f"             [{det.filter_pipeline.describe()}]")
+
+
+def bench_blobs(args):
+    from blobs import BLOB_FINDERS
+    from detector import DartDetector
+
+    detector = DartDetector()
+    threshes = [_thresh_from_diff(detector, d) for d in _load_diffs(args)]
+    h, w = threshes[0].shape
+    print(f"{len(threshes)} thresh images at {w}x{h}")
+
+    legacy = [_legacy_tip_from_thresh(detector, t) for t in threshes]
+    methods = [("legacy", _legacy_tip_from_thresh)]
+    methods += [(name, lambda d, t, f=finder: _tip_from_thresh(d, t, f)) for name, finder in BLOB_FINDERS.items()]
+    for name, fn in methods:
+        elapsed = _timeit(lambda: [fn(detector, t) for t in threshes], repeat=args.repeat) / len(threshes)
+        tips = [fn(detector, t) for t in threshes]
+        differ = sum(a != b for a, b in zip(legacy, tips))
+        print(f"  {name:10s} {elapsed * 1000:7.3f} ms/frame  tips found {sum(t is not None for t in tips)}"
+              f"/{len(threshes)}, different from legacy: {differ}")
+
+
+def _synthetic_darts(count, width, height, seed=0):
+    """
+    Like _synthetic_frames, but the darts have a pointed shaft drawn at sub-pixel
+    coordinates. Returns the empty board and [(frame, (tip_x, tip_y))].
+    """
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    board = np.full((height, width, 3), 90, dtype=np.uint8)
+    cv2.circle(board, (width // 2, height // 2), int(height * 0.4), (40, 60, 40), -1)
+
+    def poly(points):
+        return [np.round(np.array(points) * 16).astype(np.int32)]
+
+    darts = []
+    for _ in range(count):
+        frame = board.copy()
+        tip = np.array([rng.uniform(0.35, 0.6) * width, rng.uniform(0.3, 0.7) * height])
+        a = rng.uniform(-0.5, 0.5)
+        d, n = np.array([np.cos(a), np.sin(a)]), np.array([-np.sin(a), np.cos(a)])
+        shaft_end, barrel_end = tip + 30 * d, tip + 110 * d
+        cv2.fillPoly(frame, poly([tip, shaft_end + 2 * n, shaft_end - 2 * n]), (230, 230, 230), cv2.LINE_AA, 4)
+        cv2.fillPoly(frame, poly([shaft_end + 4 * n, barrel_end + 4 * n, barrel_end - 4 * n, shaft_end - 4 * n]),
+                     (200, 200, 200), cv2.LINE_AA, 4)
+        cv2.fillPoly(frame, poly([barrel_end, barrel_end + 50 * d + 18 * n, barrel_end + 50 * d - 18 * n]),
+                     (20, 20, 200), cv2.LINE_AA, 4)
+        noise = rng.normal(0, 3, frame.shape)
+        darts.append((np.clip(frame + noise, 0, 255).astype(np.uint8), (float(tip[0]), float(tip[1]))))
+    return board, darts
+
+
+def bench_tips(args):
+    import cv2
+    from blobs import blob_hull
+    from detector import DartDetector
+    from tip import TipLocator
+
+    def blurred(frame):
+        return cv2.GaussianBlur(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (9, 9), 0)
+
+    if args.frames:
+        diffs = _load_diffs(args)
+        truth = [None] * len(diffs)
+    else:
+        board, darts = _synthetic_darts(args.limit or 50, args.width, args.height)
+        bg = blurred(board)
+        diffs = [cv2.absdiff(bg, blurred(frame)) for frame, _ in darts]
+        truth = [tip for _, tip in darts]
+
+    detector = DartDetector(tip_direction=args.direction)
+    cases = []
+    for diff, true_tip in zip(diffs, truth):
+        thresh = _thresh_from_diff(detector, diff)
+        blobs, labels, origin = detector.find_blobs(thresh, detector.min_blob_area)
+        if blobs:
+            cases.append((diff, labels, blobs, origin, true_tip))
+    print(f"{len(cases)} of {len(diffs)} frames with a blob")
+    if not cases:
+        return
+
+    def leftmost(case):
+        diff, labels, blobs, origin, _ = case
+        return _leftmost(blob_hull(labels, blobs, origin))
+
+    def axis(case, refine):
+        diff, labels, blobs, origin, _ = case
+        return detector.tip_locator.locate(labels, blobs, origin, diff if refine else None)[0]
+
+    methods = (("leftmost", leftmost), ("axis", lambda c: axis(c, False)), ("subpixel", lambda c: axis(c, True)))
+    results = {}
+    for name, fn in methods:
+        elapsed = _timeit(lambda: [fn(c) for c in cases], repeat=args.repeat) / len(cases)
+        tips = np.array([fn(c) for c in cases], dtype=np.float64)
+        results[name] = tips
+        line = f"  {name:9s} {elapsed * 1000:6.3f} ms/tip"
+        if truth[0] is not None:
+            err = np.hypot(*(tips - np.array([c[4] for c in cases])).T)
+            line += f"  error mean {err.mean():5.2f} px  p95 {np.percentile(err, 95):5.2f}  max {err.max():5.2f}"
+        else:
+            spread = np.hypot(*(tips - tips.mean(axis=0)).T)
+            line += f"  mean tip ({tips[:, 0].mean():.2f}, {tips[:, 1].mean():.2f})  spread {spread.max():5.2f} px"
+        print(line)
+
+    # Once more for the counts only, over every case with the diff
+    locator = TipLocator(args.direction)
+    for diff, labels, blobs, origin, _ in cases:
+        locator.locate(labels, blobs, origin, diff)
+    reasons = ", ".join(f"{k} {v}" for k, v in locator.rejected.items())
+    print(f"  subpixel refined {locator.refined} of {len(cases)}, kept coarse {locator.coarse} ({reasons})")
+
+
+def _synthetic_board_view(width, height, markers, marker_size, tilt=0.35, seed=0):
+    """
+    A board with ArUco markers at markers (board mm) seen at an angle. Returns the frame and
+    the true image -> board mm homography.
+    """
+    import cv2
+    from board_homography import ARUCO_DICTIONARY
+
+    rng = np.random.default_rng(seed)
+    px = 2.0  # canonical pixels per mm
+    half = int(max(max(abs(c) for c in xy) for xy in markers.values()) + marker_size)
+    size = int(2 * half * px)
+    canvas = np.full((size, size), 200, dtype=np.uint8)
+    for r in (170, 162, 107, 99, 15.9, 6.35):
+        cv2.circle(canvas, (size // 2, size // 2), int(r * px), 40, 2)
+    dictionary = cv2.aruco.getPredefinedDictionary(ARUCO_DICTIONARY)
+    side = int(marker_size * px)
+    for marker_id, (u, v) in markers.items():
+        img = cv2.aruco.generateImageMarker(dictionary, int(marker_id), side)
+        x0, y0 = int((u + half) * px - side / 2), int((v + half) * px - side / 2)
+        canvas[y0 - side // 4:y0 + side + side // 4, x0 - side // 4:x0 + side + side // 4] = 255
+        canvas[y0:y0 + side, x0:x0 + side] = img
+
+    # Canonical pixels -> board mm (pixel centres, the marker edges are on pixel borders),
+    # then a tilted view of it
+    to_mm = np.array([[1 / px, 0, 0.5 / px - half], [0, 1 / px, 0.5 / px - half], [0, 0, 1]])
+    src = np.float32([[0, 0], [size, 0], [size, size], [0, size]])
+    cx, cy, s = width / 2, height / 2, height * 0.48
+    dst = np.float32([[cx - s * (1 - tilt / 2), cy - s], [cx + s * (1 + tilt / 4), cy - s * (1 - tilt)],
+                      [cx + s * (1 + tilt / 4), cy + s * (1 - tilt)], [cx - s * (1 - tilt / 2), cy + s]])
+    dst += rng.uniform(-10, 10, dst.shape).astype(np.float32)
+    warp = cv2.getPerspectiveTransform(src, dst)
+    frame = cv2.warpPerspective(canvas, warp, (width, height), borderValue=90)
+    frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+    return frame, to_mm @ np.linalg.inv(warp)
+
+
+def bench_homography(args):
+    from board_homography import BoardRectifier, DEFAULT_MARKERS, _transform
+    from classifier import classify_ring, classify_sector, classify_field
+    from fusion import score_board
+
+    rectifier = BoardRectifier(marker_size=args.marker_size)
+    frame, true_H = _synthetic_board_view(args.width, args.height, DEFAULT_MARKERS, args.marker_size)
+
+    t_detect = _timeit(lambda: rectifier.detect(frame), repeat=args.repeat)
+    corners = rectifier.detect(frame)
+    t_solve = _timeit(lambda: rectifier.solve(corners), repeat=args.repeat)
+    rectifier.update(frame)
+    homography = rectifier.homography
+    print(f"Frame {args.width}x{args.height}, {len(corners)} markers found")
+    if homography is None:
+        print("  no homography")
+        return
+    t_recheck = _timeit(lambda: rectifier.update(frame), repeat=args.repeat)
+    print(f"  detect markers:  {t_detect * 1000:7.2f} ms")
+    print(f"  solve:           {t_solve * 1000:7.2f} ms  (marker fit {homography.error:.3f} mm RMS)")
+    print(f"  update, unmoved: {t_recheck * 1000:7.2f} ms  ({rectifier.solves} solve)")
+
+    # Points on the board, mapped through the solved and the true homography
+    rng = np.random.default_rng(0)
+    r = np.sqrt(rng.uniform(0, 1, args.points)) * 180
+    a = rng.uniform(0, 2 * np.pi, args.points)
+    xs, ys = _transform(np.linalg.inv(true_H), r * np.cos(a), r * np.sin(a)).T
+    solved = np.array([homography.to_board_mm(x, y) for x, y in zip(xs, ys)])
+    err = np.hypot(*(solved - np.stack([r * np.cos(a), r * np.sin(a)], axis=1)).T)
+    print(f"  mapping error:   mean {err.mean():.3f} mm  max {err.max():.3f} mm")
+
+    true_scores = [score_board(rr, (np.degrees(aa) - 9.0) % 360) for rr, aa in zip(r, a)]
+    scores = [homography.score(x, y) for x, y in zip(xs, ys)]
+    print(f"  scores differing from the true position: {sum(s != t for s, t in zip(scores, true_scores))}/{args.points}")
+
+    def ellipses():
+        return [classify_field(classify_ring(x, y), classify_sector(x, y)) for x, y in zip(xs, ys)]
+
+    def polar():
+        return [score_board(*homography.to_board(x, y)) for x, y in zip(xs, ys)]
+
+    t_ellipses = _timeit(ellipses, repeat=args.repeat) / args.points
+    t_polar = _timeit(polar, repeat=args.repeat) / args.points
+    print(f"  classify_* (ellipses):     {t_ellipses * 1e6:6.2f} us/point")
+    print(f"  homography + polar lookup: {t_polar * 1e6:6.2f} us/point  ({t_ellipses / t_polar:.1f}x)")
+
+
+_STARTUP_PHASES = """
+import json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+main.get_detector()
+import background, board_homography, calibration, calibration_monitor, classifier, frame_pool, frame_ring, \\
+    pipeline, process_pipeline, profiler, recorder, scheduler, score_table
+calibration.current()
+t2 = time.perf_counter()
+main.probe_cameras(timeout={timeout}, first=True)
+t3 = time.perf_counter()
+import numpy as np
+frame = np.full(({height}, {width}, 3), 90, dtype=np.uint8)
+main.canvas_size = (frame.shape[1], frame.shape[0])
+t4 = time.perf_counter()
+builder = score_table.prepare_score_table(frame.shape)
+main.detector.update(frame, **main.get_detector_args(frame.shape))
+t5 = time.perf_counter()
+# What a dart before the table is ready costs, then the table build the first frame no longer waits for
+score_table.score_point(frame.shape[1] // 2, frame.shape[0] // 2, frame.shape)
+t6 = time.perf_counter()
+builder.join()
+t7 = time.perf_counter()
+print(json.dumps({{"import": t1 - t0, "detector": t2 - t1, "probe": t3 - t2, "first_frame": t5 - t4,
+                  "score_fallback": t6 - t5, "table": t7 - t4}}))
+"""
+
+
+def bench_startup(args):
+    import json
+    import os
+    import socket
+    import subprocess
+    import sys
+    import urllib.request
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def free_port():
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+    serving = []
+    for _ in range(args.runs):
+        port = free_port()
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "main.py", "--port", str(port)], cwd=here,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while time.perf_counter() - start < args.max_wait:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=0.5) as r:
+                        if r.status == 200:
+                            serving.append(time.perf_counter() - start)
+                            break
+                except OSError:
+                    time.sleep(0.005)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    phases = []
+    for _ in range(args.runs):
+        script = _STARTUP_PHASES.format(timeout=args.probe_timeout, width=args.width, height=args.height)
+        out = subprocess.run([sys.executable, "-c", script], cwd=here, capture_output=True, text=True,
+                             check=True).stdout
+        phases.append(json.loads(out.strip().splitlines()[-1]))
+
+    def ms(values):
+        values = np.asarray(values) * 1000
+        return f"mean {values.mean():7.1f} ms  min {values.min():7.1f} ms"
+
+    print(f"{args.runs} runs")
+    print(f"  process start -> GET / answered:   {ms(serving) if serving else 'never'}")
+    print(f"  import main:                       {ms([p['import'] for p in phases])}")
+    print(f"  detector and detection modules:   {ms([p['detector'] for p in phases])}  (first /start, on its thread)")
+    print(f"  parallel camera probe:             {ms([p['probe'] for p in phases])}  (without camera_index)")
+    print(f"  first frame through detection:     {ms([p['first_frame'] for p in phases])}  "
+          f"({args.width}x{args.height}, after the capture's first read)")
+    print(f"  score table, background thread:    {ms([p['table'] for p in phases])}  (no longer before the first frame)")
+    print(f"  dart scored before it is ready:    {ms([p['score_fallback'] for p in phases])}")
+    # Plus probing and opening the camera, which depend on the hardware
+    first = [p["detector"] + p["first_frame"] for p in phases]
+    print(f"  /start -> first scored frame:      {ms(first)}  (plus probe and camera open)")
+    first = [p["import"] + p["detector"] + p["first_frame"] for p in phases]
+    print(f"  process start -> first scored:     {ms(first)}  (with /start right away)")
+
+
+class _FakeCapture:
+    """Stands in for cv2.VideoCapture: "decodes" by copying a stored frame, into image if given."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.i = 0
+
+    def read(self, image=None):
+        src = self.frames[self.i % len(self.frames)]
+        self.i += 1
+        if image is not None and image.shape == src.shape:
+            np.copyto(image, src)
+            return True, image
+        return True, src.copy()
+
+
+class _NullWriter:
+    def write(self, frame, ts, motion_level):
+        pass
+
+    def close(self):
+        pass
+
+
+def bench_frames(args):
+    from detector import DartDetector
+    from frame_pool import build_frame_pool
+    from pipeline import FrameGrabber
+    from recorder import MotionRecorder
+
+    if args.frames:
+        from replay import ReplaySource
+        frames = [frame for _, frame in ReplaySource(args.frames, limit=args.limit)]
+    else:
+        frames = _synthetic_frames(args.limit or 30, args.width, args.height)
+    h, w = frames[0].shape[:2]
+    frame_mb = frames[0].nbytes / 1e6
+    print(f"{len(frames)} frames at {w}x{h} ({frame_mb:.1f} MB each), recorder on every frame")
+
+    def run(name, pool_count, legacy_copies):
+        detector = DartDetector()
+        detector.recorder = MotionRecorder(_NullWriter(), pre_frames=args.pre_frames, motion_only=False,
+                                           max_queue=4)
+        pool = build_frame_pool(pool_count, detector.recorder)
+        grabber = FrameGrabber(_FakeCapture(frames), pool=pool)
+
+        def step():
+            _, frame, buf = grabber._grab()
+            grabber._shape = frame.shape
+            held = []
+            if legacy_copies:
+                # What main() used to do: separate frames for detection, preview and the motion dump
+                frame = frame.copy()
+                held = [frame.copy(), frame.copy()]
+            detector.update(frame)
+            del held
+            if buf is not None:
+                buf.release()
+
+        peak = _traced(step, args.iterations)
+        elapsed = _timeit(lambda: [step() for _ in range(args.iterations)], repeat=3) / args.iterations
+        detector.cleanup()
+        extra = f", pool {pool.stats()}" if pool is not None else ""
+        print(f"  {name:8s} {elapsed * 1000:7.2f} ms/frame  {peak / 1e6:7.2f} MB allocated per frame "
+              f"({peak / 1e6 / frame_mb:.1f} frames){extra}")
+
+    run("legacy", 0, legacy_copies=True)
+    run("alloc", 0, legacy_copies=False)
+    run("pooled", args.pool, legacy_copies=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the detection backend")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("classifier", help="Scalar classifier vs precomputed score table")
+    p.add_argument("--width", type=int, default=1920)
+    p.add_argument("--height", type=int, default=1080)
+    p.add_argument("--points", type=int, default=20000)
+    p.set_defaults(func=bench_classifier)
+
+    # Equivalence with the scalar path is checked by test_classifier.py
+    p = sub.add_parser("batch", help="Array classifier throughput")
+    p.add_argument("--width", type=int, default=1920)
+    p.add_argument("--height", type=int, default=1080)
+    p.add_argument("--points", type=int, default=2_000_000)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=bench_batch)
+
+    p = sub.add_parser("masks", help="Per-frame board overlay / ignore mask cost, legacy vs cached")
+    p.add_argument("--width", type=int, default=1920)
+    p.add_argument("--height", type=int, default=1080)
+    p.add_argument("--frames", type=int, default=20)
+    p.set_defaults(func=bench_masks)
+
+    p = sub.add_parser("filters", help="Filter pipeline presets: ms/frame and tip deviation from the reference")
+    p.add_argument("--frames", help="directory of recorded frames (e.g. motion_frames/) or a video file; "
+                                    "the first frame is the background. Synthetic frames if omitted")
+    p.add_argument("--limit", type=int, default=None)
+    p.add_argument("--width", type=int, default=1920)
+    p.add_argument("--height", type=int, default=1080)
+    p.set_defaults(func=bench_filters)
+
+    p = sub.add_parser("blobs", help="Blob analysis and tip estimate: the pre-blobs.py path vs each of blobs.BLOB_FINDERS")
+    p.add_argument("--frames", help="directory of recorded frames or a video file, synthetic frames if omitted")
+    p.add_argument("--limit", type=int, default=None)
+    p.add_argument("--width", type=int, default=1920)
+    p.add_argument("--height", type=int, default=1080)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_blobs)
+
+    p = sub.add_parser("tips", help="Tip localisation: leftmost hull point vs principal axis with sub-pixel refinement")
+    p.add_argument("--frames", help="directory of recorded frames or a video file, the first frame is the "
+                                    "background; synthetic darts with known tips if omitted")
+    p.add_argument("--limit", type=int, default=None)
+    p.add_argument("--width", type=int, default=1920)
+    p.add_argument("--height", type=int, default=1080)
+    p.add_argument("--direction", default="left", help="which way darts point, see tip.DIRECTIONS")
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_tips)
+
+    p = sub.add_parser("homography", help="ArUco board homography: marker detection cost, mapping accuracy, polar scoring")
+    p.add_argument("--width", type=int, default=1920)
+    p.add_argument("--height", type=int, default=1080)
+    p.add_argument("--marker-size", type=float, default=40.0, help="marker side in mm")
+    p.add_argument("--points", type=int, default=20000)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_homography)
+
+    p = sub.add_parser("startup", help="Time until main.py answers HTTP, and the cost of each lazy startup phase")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--max-wait", type=float, default=30.0, help="seconds to wait for the server")
+    p.add_argument("--probe-timeout", type=float, default=2.0)
+    p.add_argument("--width", type=int, default=1920)
+    p.add_argument("--height", type=int, default=1080)
+    p.set_defaults(func=bench_startup)
+
+    p = sub.add_parser("frames", help="Per-frame allocations of capture -> detection -> recorder, with and without a FramePool")
+    p.add_argument("--frames", help="directory of recorded frames or a video file, synthetic frames if omitted")
+    p.add_argument("--limit", type=int, default=None)
+    p.add_argument("--width", type=int, default=1920)
+    p.add_argument("--height", type=int, default=1080)
+    p.add_argument("--iterations", type=int, default=60)
+    p.add_argument("--pool", type=int, default=8, help="buffers in the pool, at least what the recorder keeps")
+    p.add_argument("--pre-frames", type=int, default=15, help="frames the recorder keeps before a trigger")
+    p.set_defaults(func=bench_frames)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# One connected component of a thresh image. area in pixels, bbox = (x, y, w, h) and
+# centroid = (x, y) in the pixels of the image it was found in. contour is its outline
+# from find_contour_blobs, None for components from find_blobs
+Blob = namedtuple("Blob", "label area bbox centroid contour", defaults=(None,))
+
+
+def find_blobs(thresh, min_area=0):
+    """
+    Connected components of thresh with at least min_area pixels, largest first, plus
+    the label image they refer to and its (x, y) offset in thresh. Area, bounding box
+    and centroid of every component come out of one cv2.connectedComponentsWithStats
+    pass, which only labels the bounding box of the nonzero pixels: labelling a whole
+    frame costs far more than the handful of blobs in it.
+    """
+    x0, y0, w, h = cv2.boundingRect(thresh)
+    if w == 0 or h == 0:
+        return [], None, (0, 0)
+    crop = thresh[y0:y0 + h, x0:x0 + w]
+    # With 8-connectivity there are at most one component per 2x2 cell
+    ltype = cv2.CV_16U if ((w + 1) // 2) * ((h + 1) // 2) < 65535 else cv2.CV_32S
+    count, labels, stats, centroids = cv2.connectedComponentsWithStats(crop, connectivity=8, ltype=ltype)
+
+    # Noise can leave thousands of specks, only the survivors become records
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    kept = np.flatnonzero(areas >= min_area)
+    kept = kept[np.argsort(-areas[kept], kind="stable")] + 1
+
+    blobs = []
+    for label in kept.tolist():
+        x, y, bw, bh, area = stats[label].tolist()
+        cx, cy = centroids[label].tolist()
+        blobs.append(Blob(label, area, (x + x0, y + y0, bw, bh), (cx + x0, cy + y0)))
+    return blobs, labels, (x0, y0)
+
+
+def find_contour_blobs(thresh, min_area=0):
+    """
+    find_blobs from the outer contours of thresh, one cv2.findContours pass over the
+    whole image, which stays cheaper than labelling once motion spreads across the
+    frame. Areas are contour areas, as before find_blobs. There is no label image
+    (None): blob_hull takes the contours as they are and blob_mask fills them.
+    """
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    kept = [(cv2.contourArea(c), c) for c in contours]
+    kept = [k for k in kept if k[0] >= min_area]
+    if not kept:
+        return [], None, (0, 0)
+    kept.sort(key=lambda k: k[0], reverse=True)
+
+    blobs = []
+    for label, (area, c) in enumerate(kept, 1):
+        bbox = cv2.boundingRect(c)
+        m = cv2.moments(c)
+        if m["m00"] > 0:
+            centroid = (m["m10"] / m["m00"], m["m01"] / m["m00"])
+        else:
+            centroid = (bbox[0] + bbox[2] / 2, bbox[1] + bbox[3] / 2)
+        blobs.append(Blob(label, area, bbox, centroid, c))
+    return blobs, None, (0, 0)
+
+
+# How DartDetector(blob_finder=...) finds blobs. Both return (blobs, labels, origin)
+BLOB_FINDERS = {"contours": find_contour_blobs, "components": find_blobs}
+
+
+def make_blob_finder(finder):
+    """A blob finder function from a name in BLOB_FINDERS, or finder itself."""
+    if isinstance(finder, str):
+        if finder not in BLOB_FINDERS:
+            raise ValueError(f"Unknown blob finder '{finder}', expected one of {sorted(BLOB_FINDERS)}")
+        return BLOB_FINDERS[finder]
+    return finder
+
+
+def union_bbox(blobs):
+    x0 = min(b.bbox[0] for b in blobs)
+    y0 = min(b.bbox[1] for b in blobs)
+    x1 = max(b.bbox[0] + b.bbox[2] for b in blobs)
+    y1 = max(b.bbox[1] + b.bbox[3] for b in blobs)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def blob_mask(labels, blobs, origin=(0, 0)):
+    """
+    (mask, (x, y)): 1 where one of blobs is, 0 elsewhere, over their joint bounding box
+    whose corner is (x, y) in thresh pixels. labels and origin are what find_blobs returned.
+    """
+    x, y, w, h = union_bbox(blobs)
+    if labels is None:
+        mask = np.zeros((h, w), dtype=np.uint8)
+        cv2.drawContours(mask, [b.contour for b in blobs], -1, 1, cv2.FILLED, offset=(-x, -y))
+        return mask, (x, y)
+    lx, ly = x - origin[0], y - origin[1]
+    crop = labels[ly:ly + h, lx:lx + w]
+    if len(blobs) == 1:
+        mask = crop == blobs[0].label
+    else:
+        mask = np.isin(crop, [b.label for b in blobs])
+    return mask.view(np.uint8), (x, y)
+
+
+def mask_hull(mask, corner=(0, 0)):
+    """Convex hull (float32, as cv2.convexHull returns it) of the outlines in mask, offset by corner."""
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    pts = np.vstack([c.reshape(-1, 2) for c in contours]).astype(np.float32)
+    pts += corner
+    return cv2.convexHull(pts.reshape(-1, 1, 2))
+
+
+def blob_hull(labels, blobs, origin=(0, 0)):
+    """Convex hull around the outlines of blobs together, in thresh pixels, or None without blobs."""
+    if not blobs:
+        return None
+    if blobs[0].contour is not None:
+        pts = np.vstack([b.contour.reshape(-1, 2) for b in blobs]).astype(np.float32)
+        return cv2.convexHull(pts.reshape(-1, 1, 2))
+    return mask_hull(*blob_mask(labels, blobs, origin))
+
+
+def to_frame_blob(blob, scale=1, offset=(0, 0)):
+    """blob of a (downscaled, cropped) thresh image in full-frame pixels, without its contour"""
+    x, y, w, h = blob.bbox
+    cx, cy = blob.centroid
+    ox, oy = offset
+    return Blob(blob.label, blob.area * scale * scale,
+                (x * scale + ox, y * scale + oy, w * scale, h * scale),
+                (cx * scale + ox, cy * scale + oy))
@@ -0,0 +1,88 @@
+import cv2
+import numpy as np
+
+from draw_canvas import draw_ellipses, draw_sector_lines
+
+# Extra pixels around the board crop so the blurs and the 35px closing kernel
+# see the same neighbourhood at the board edge as on the full frame
+ROI_MARGIN = 24
+
+
+def calibration_key(ring_data, sector_config):
+    rings = tuple(tuple(float(v) for v in ring) for ring in ring_data)
+    return rings, tuple(float(v) for v in sector_config)
+
+
+def build_board_ignore_mask(frame_shape, ring_data, padding=20):
+    """
+    Returns a mask where True = IGNORE (outside the dartboard).
+    Everything outside the outermost ring + padding is masked out.
+    """
+    h, w = frame_shape[:2]
+    mask = np.ones((h, w), dtype=np.uint8)  # Start: ignore everything
+
+    if ring_data is None or len(ring_data) == 0:
+        return mask.astype(bool)
+
+    outer_ring = ring_data[0]  # ring_data[0] is the outermost ring
+    cx, cy = int(outer_ring[0]), int(outer_ring[1])
+    # Add padding to axes so the board edge itself isn't masked
+    ax = int(outer_ring[2] * outer_ring[3]) + padding
+    ay = int(outer_ring[2] * outer_ring[4]) + padding
+
+    cv2.ellipse(mask, (cx, cy), (ax, ay), 0, 0, 360, 0, -1)
+
+    return mask.astype(bool)
+
+
+def board_roi(frame_shape, center, axes, margin=ROI_MARGIN):
+    """Bounding box (x, y, w, h) of the non-ignored ellipse plus margin, clipped to the frame."""
+    h, w = frame_shape[:2]
+    x0 = max(0, center[0] - axes[0] - margin)
+    y0 = max(0, center[1] - axes[1] - margin)
+    x1 = min(w, center[0] + axes[0] + margin + 1)
+    y1 = min(h, center[1] + axes[1] + margin + 1)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+
+class BoardImages:
+    """Everything derived from one calibration and frame size. Treat as read-only."""
+
+    def __init__(self, ring_data, sector_config, frame_shape, padding):
+        h, w = frame_shape[:2]
+
+        self.overlay = np.zeros((h, w, 3), dtype=np.uint8)
+        draw_ellipses(self.overlay, ring_data)
+        draw_sector_lines(self.overlay, ring_data[0], *sector_config)
+        self.overlay_mask = (self.overlay[:, :, 1] > 0)[:, :, None]
+
+        self.ignore_mask = build_board_ignore_mask(frame_shape, ring_data, padding=padding)
+
+        outer = ring_data[0]
+        self.ignore_center = (int(outer[0]), int(outer[1]))
+        self.ignore_axes = (int(outer[2] * outer[3]) + padding, int(outer[2] * outer[4]) + padding)
+
+        self.roi = board_roi(frame_shape, self.ignore_center, self.ignore_axes)
+
+
+class BoardCache:
+    """Hands out the same BoardImages until the calibration or the frame size changes."""
+
+    def __init__(self, padding=80):
+        self.padding = padding
+        self.builds = 0
+        self._key = None
+        self._images = None
+
+    def get(self, ring_data, sector_config, frame_shape):
+        key = (calibration_key(ring_data, sector_config), tuple(frame_shape[:2]))
+        if key != self._key:
+            self._images = BoardImages(ring_data, sector_config, frame_shape, self.padding)
+            self._key = key
+            self.builds += 1
+        return self._images
+
+    def invalidate(self):
+        self._key = None
@@ -0,0 +1,208 @@
+import math
+
+import cv2
+import numpy as np
+
+from fusion import BOARD_RADII_MM, score_board
+
+# The dictionary aruco_markers.py prints its markers from
+ARUCO_DICTIONARY = cv2.aruco.DICT_4X4_50
+
+# Marker centres in mm from the bull by id, in canonical board coordinates: x to the
+# right, y down, 20 at the top. Every marker is mounted upright, its top edge towards the 20
+DEFAULT_MARKERS = {0: (-220.0, -220.0), 1: (220.0, -220.0), 2: (220.0, 220.0), 3: (-220.0, 220.0)}
+
+# Canonical angle (0 = towards the 6, 90 = down) at which sector 0 of
+# classifier.DARTBOARD_NUMBERS starts: the 6 is centred on 0, the 10 follows clockwise
+SECTOR_START_DEG = 9.0
+
+# Points per ring when projecting the board circles into the image
+_CIRCLE = np.linspace(0, 2 * np.pi, 72, endpoint=False)
+
+
+def marker_board_corners(center, size):
+    """The corners of a marker in board mm, in the order ArUco reports them in the image."""
+    cx, cy = center
+    h = size / 2
+    return np.array([[cx - h, cy - h], [cx + h, cy - h], [cx + h, cy + h], [cx - h, cy + h]], dtype=np.float64)
+
+
+def _transform(H, xs, ys):
+    pts = np.stack([np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)], axis=-1)
+    return cv2.perspectiveTransform(pts.reshape(-1, 1, 2), H).reshape(pts.shape)
+
+
+def relative_coords(r, angle):
+    """Board coordinates for dart_hit, the outer edge of the double at distance 100 like the frontend draws it."""
+    a = math.radians(angle + SECTOR_START_DEG)
+    length = r / BOARD_RADII_MM[0] * 100.0
+    return length * math.cos(a), length * math.sin(a)
+
+
+class BoardHomography:
+    """
+    One solved board pose. H maps image pixels to canonical board mm (bull at the origin,
+    x to the right, y down, 20 at the top), so perspective and lens tilt are gone and a
+    tip scores with a fixed polar lookup, fusion.score_board, instead of six ellipse
+    tests and a stretched atan2.
+
+    Has the interface of fusion.CameraGeometry: to_board(x, y) gives (r, angle) with r
+    in mm and angle in degrees from the start of sector 0. ring_data and sector_config
+    are axis-aligned ellipses and sector lines around the projected board in the
+    rings.json/sectors.json format, for BoardCache's overlay, ignore mask and ROI. Under
+    perspective they are approximate, scoring never uses them. Treat as read-only,
+    BoardRectifier replaces it as a whole when the markers move.
+    """
+
+    def __init__(self, H, corners, error):
+        self.H = H
+        self.H_inv = np.linalg.inv(H)
+        self.corners = corners
+        self.error = error
+        # Plain floats, one point is cheaper in Python than through cv2.perspectiveTransform
+        self._h = tuple(float(v) for v in H.ravel())
+        self.ring_data, self.sector_config = self._board_calibration()
+
+    def to_board_mm(self, x, y):
+        h = self._h
+        w = h[6] * x + h[7] * y + h[8]
+        return (h[0] * x + h[1] * y + h[2]) / w, (h[3] * x + h[4] * y + h[5]) / w
+
+    def to_image(self, u, v):
+        x, y = _transform(self.H_inv, u, v)
+        return float(x), float(y)
+
+    def to_board(self, x, y):
+        u, v = self.to_board_mm(x, y)
+        return math.hypot(u, v), (math.degrees(math.atan2(v, u)) - SECTOR_START_DEG) % 360
+
+    def angle(self, x, y):
+        return self.to_board(x, y)[1]
+
+    def score(self, x, y):
+        """Same string as classifier.classify_field."""
+        return score_board(*self.to_board(x, y))
+
+    def to_relative(self, r, angle):
+        return relative_coords(r, angle)
+
+    def moved(self, corners):
+        """Largest corner displacement in pixels of the markers in corners, None if none of them was solved from."""
+        common = [i for i in corners if i in self.corners]
+        if not common:
+            return None
+        return max(float(np.abs(corners[i] - self.corners[i]).max()) for i in common)
+
+    def _board_calibration(self):
+        rings = []
+        for radius in BOARD_RADII_MM:
+            pts = _transform(self.H_inv, radius * np.cos(_CIRCLE), radius * np.sin(_CIRCLE))
+            lo, hi = pts.min(axis=0), pts.max(axis=0)
+            (cx, cy), (ax, ay) = (lo + hi) / 2, (hi - lo) / 2
+            rings.append(np.array([cx, cy, ax, 1.0, ay / ax], dtype=np.float32))
+
+        # Sector lines start at the projected bull and point where sector 0 starts
+        outer = rings[0]
+        bull_x, bull_y = self.to_image(0.0, 0.0)
+        a = math.radians(SECTOR_START_DEG)
+        x, y = self.to_image(100 * math.cos(a), 100 * math.sin(a))
+        rotation = math.degrees(math.atan2((y - bull_y) / float(outer[4]), x - bull_x))
+        sectors = (rotation, bull_x - float(outer[0]), bull_y - float(outer[1]), 1.0, 1.0, 1.0)
+        return rings, sectors
+
+
+class BoardRectifier:
+    """
+    Finds the ArUco markers of aruco_markers.py and solves a BoardHomography from their
+    corners, all of them at once with RANSAC so one misread marker is dropped. markers
+    maps id to its centre in board mm (see DEFAULT_MARKERS), marker_size is the printed
+    side length in mm and rotation the angle in degrees by which the 20 is turned
+    clockwise from the top of the marker layout.
+
+    update() solves again only when a marker moved more than move_tolerance pixels; with
+    markers hidden (a player in front of the board) the last homography stays.
+    """
+
+    def __init__(self, markers=None, marker_size=40.0, min_markers=3, move_tolerance=2.0, rotation=0.0,
+                 max_error=3.0):
+        markers = DEFAULT_MARKERS if markers is None else markers
+        self.markers = {int(i): (float(c[0]), float(c[1])) for i, c in markers.items()}
+        self.marker_size = marker_size
+        self.min_markers = min_markers
+        self.move_tolerance = move_tolerance
+        self.rotation = rotation
+        self.max_error = max_error
+        self.homography = None
+        self.checks = 0
+        self.solves = 0
+        self.last_found = 0
+
+        params = cv2.aruco.DetectorParameters()
+        params.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_SUBPIX
+        self._detector = cv2.aruco.ArucoDetector(cv2.aruco.getPredefinedDictionary(ARUCO_DICTIONARY), params)
+
+    def detect(self, frame):
+        """{id: (4, 2) image corners} of the known markers in frame."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        corners, ids, _ = self._detector.detectMarkers(gray)
+        if ids is None:
+            return {}
+        return {int(i): c.reshape(4, 2).astype(np.float64)
+                for c, i in zip(corners, ids.ravel()) if int(i) in self.markers}
+
+    def solve(self, corners):
+        """BoardHomography from detected corners, or None with fewer than min_markers or a fit off by more than max_error mm."""
+        if len(corners) < self.min_markers:
+            return None
+        ids = sorted(corners)
+        image_pts = np.concatenate([corners[i] for i in ids])
+        board_pts = np.concatenate([marker_board_corners(self.markers[i], self.marker_size) for i in ids])
+        H, inliers = cv2.findHomography(image_pts, board_pts, cv2.RANSAC, self.max_error)
+        if H is None:
+            return None
+        inliers = inliers.ravel().astype(bool)
+        residuals = np.hypot(*(_transform(H, *image_pts.T) - board_pts)[inliers].T)
+        error = float(np.sqrt((residuals ** 2).mean()))
+        if error > self.max_error:
+            return None
+        if self.rotation:
+            a = math.radians(self.rotation)
+            turn = np.array([[math.cos(a), math.sin(a), 0.0], [-math.sin(a), math.cos(a), 0.0], [0.0, 0.0, 1.0]])
+            H = turn @ H
+        used = {i: corners[i] for n, i in enumerate(ids) if inliers[4 * n:4 * n + 4].all()}
+        return BoardHomography(H, used, error)
+
+    def update(self, frame):
+        """Detects the markers in frame and solves again if they moved. True if self.homography changed."""
+        self.checks += 1
+        corners = self.detect(frame)
+        self.last_found = len(corners)
+        if self.homography is not None:
+            moved = self.homography.moved(corners)
+            if moved is None or moved <= self.move_tolerance:
+                return False
+        homography = self.solve(corners)
+        if homography is None:
+            return False
+        self.homography = homography
+        self.solves += 1
+        return True
+
+    def stats(self):
+        return {
+            "solved": self.homography is not None,
+            "markers": self.last_found,
+            "checks": self.checks,
+            "solves": self.solves,
+            "error_mm": self.homography.error if self.homography is not None else None,
+        }
+
+
+def build_rectifier(config):
+    """BoardRectifier from the 'aruco' section of config.json, or None if it is off."""
+    if not config.get("enabled", False):
+        return None
+    return BoardRectifier(markers=config.get("markers"), marker_size=config.get("marker_size_mm", 40.0),
+                          min_markers=config.get("min_markers", 3),
+                          move_tolerance=config.get("move_tolerance_px", 2.0),
+                          rotation=config.get("rotation", 0.0), max_error=config.get("max_error_mm", 3.0))
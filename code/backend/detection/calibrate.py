@@ -1,4 +1,5 @@
 import cv2
+import numpy as np
 from file_handler import *
 from draw_canvas import draw_ellipses, draw_sector_lines
 
@@ -0,0 +1,137 @@
+import os
+from threading import Thread, Event, Lock
+
+import numpy as np
+
+from file_handler import calibration_paths, load_rings, load_lines
+
+
+class Calibration:
+    """
+    Immutable snapshot of one camera's ring ellipses (rings.json) and sector lines
+    (sectors.json). The ring arrays are read-only and nothing changes in place: a
+    recalibration builds a new Calibration and swaps the reference, so a reader that
+    takes the snapshot once at the start of a call sees one consistent calibration
+    without a lock. key identifies the values for caches (ScoreTable, BoardCache).
+    """
+
+    def __init__(self, ring_data, sector_config, loaded=True):
+        rings = []
+        for ring in ring_data:
+            ring = np.array(ring, dtype=np.float32)
+            ring.setflags(write=False)
+            rings.append(ring)
+        self.ring_data = tuple(rings)
+        self.sector_config = tuple(sector_config)
+        self.loaded = loaded
+        self.key = (tuple(tuple(float(v) for v in ring) for ring in self.ring_data),
+                    tuple(float(v) for v in self.sector_config))
+
+    @classmethod
+    def load(cls, camera=None):
+        """Reads the camera's files, see file_handler.calibration_paths. loaded is False if rings.json was missing or broken."""
+        rings_path, sectors_path = calibration_paths(camera)
+        ring_data, loaded = load_rings(rings_path)
+        return cls(ring_data, load_lines(sectors_path), loaded)
+
+    def __eq__(self, other):
+        return isinstance(other, Calibration) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+_current = None
+_swap_lock = Lock()
+
+
+def current():
+    """The default camera's Calibration, read from the files on first use."""
+    calibration = _current
+    if calibration is None:
+        with _swap_lock:
+            if _current is None:
+                _set(Calibration.load())
+            calibration = _current
+    return calibration
+
+
+def _set(calibration):
+    global _current
+    _current = calibration
+
+
+def swap(calibration):
+    """Makes calibration the default camera's, from the next current() on."""
+    with _swap_lock:
+        _set(calibration)
+    return calibration
+
+
+def reload():
+    """Reads the default camera's files again and swaps the result in."""
+    return swap(Calibration.load())
+
+
+class CalibrationWatcher:
+    """
+    Polls the modification time of a camera's rings/sectors files every interval seconds
+    on its own thread. When either changed (calibrate.py saved, the frontend posted) the
+    files are loaded into a new Calibration and on_change(calibration) is called on that
+    thread. on_change defaults to swap(), i.e. the default camera.
+    """
+
+    def __init__(self, camera=None, interval=1.0, on_change=None):
+        self.camera = camera
+        self.interval = interval
+        self.on_change = on_change if on_change is not None else swap
+        self.reloads = 0
+        self._stamps = self._file_stamps()
+        self._stop = Event()
+        self._thread = None
+
+    def _file_stamps(self):
+        stamps = []
+        for path in calibration_paths(self.camera):
+            try:
+                st = os.stat(path)
+                stamps.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamps.append(None)
+        return stamps
+
+    def start(self):
+        self._stop.clear()
+        self._thread = Thread(target=self._worker, name="calibration-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def _worker(self):
+        while not self._stop.wait(self.interval):
+            stamps = self._file_stamps()
+            if stamps == self._stamps:
+                continue
+            self._stamps = stamps
+            try:
+                calibration = Calibration.load(self.camera)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[WARN] Failed to reload calibration: {e}")
+                calibration = None
+            if calibration is None or not calibration.loaded:
+                # Probably caught mid-write: keep the old one and try again on the next poll
+                self._stamps = None
+                continue
+            self.reloads += 1
+            self.on_change(calibration)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+
+def build_watcher(interval, camera=None, on_change=None):
+    """CalibrationWatcher polling every interval seconds (calibration_watch in config.json), or None for 0."""
+    if not interval:
+        return None
+    return CalibrationWatcher(camera=camera, interval=interval, on_change=on_change)
@@ -0,0 +1,121 @@
+import time
+from threading import Thread, Condition
+
+import cv2
+
+
+class CalibrationMonitor:
+    """
+    Notices a bumped camera without slowing detection down. offer(frame) is called for
+    every frame on the detection thread and only counts; every check_every-th frame is
+    converted to gray and handed to a worker thread, which runs rectifier.update() on it
+    (board_homography.BoardRectifier: ArUco detection, ~20 ms at 1080p). When the
+    markers moved more than the rectifier's move_tolerance it solves a new
+    BoardHomography and swaps it in as a whole, so readers of rectifier.homography see
+    either the old board or the new one. on_change(homography) is then called on the
+    worker thread, and changed() returns True once on the detection thread, which
+    starts the detector over on the moved board.
+
+    A frame offered while the worker is still busy is skipped, the next one is tried.
+    """
+
+    def __init__(self, rectifier, check_every=30, on_change=None):
+        self.rectifier = rectifier
+        self.check_every = check_every
+        self.on_change = on_change
+        self.checks = 0
+        self.skipped = 0
+        self.drifts = 0
+        self.last_check_ms = None
+        self._count = 0
+        self._pending = None
+        self._busy = False
+        self._version = 0
+        self._seen_version = 0
+        self._cond = Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = Thread(target=self._worker, name="calibration-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def offer(self, frame):
+        """Called with every frame. True if this one was taken for a check."""
+        self._count += 1
+        if self._count < self.check_every:
+            return False
+        with self._cond:
+            if self._busy or self._pending is not None:
+                self.skipped += 1
+                return False
+            self._count = 0
+            # A copy, frame goes back to the pool after this call
+            self._pending = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame.copy()
+            self._cond.notify()
+        return True
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                gray, self._pending = self._pending, None
+                self._busy = True
+            try:
+                start = time.perf_counter()
+                changed = self.rectifier.update(gray)
+                self.last_check_ms = (time.perf_counter() - start) * 1000
+                self.checks += 1
+                if changed:
+                    self.drifts += 1
+                    self._version += 1
+                    if self.on_change is not None:
+                        self.on_change(self.rectifier.homography)
+            except Exception as e:
+                print(f"[WARN] Calibration check failed: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+
+    def changed(self):
+        """True once after every homography swap, for the thread that owns the detector."""
+        version = self._version
+        if version == self._seen_version:
+            return False
+        self._seen_version = version
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._pending = None
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def stats(self):
+        stats = self.rectifier.stats()
+        stats.update({
+            "monitor_checks": self.checks,
+            "skipped": self.skipped,
+            "drifts": self.drifts,
+            "last_check_ms": self.last_check_ms,
+        })
+        return stats
+
+
+def build_monitor(rectifier, config, on_change=None):
+    """
+    CalibrationMonitor for rectifier (from build_rectifier) with check_every from the
+    'aruco' section of config.json, or None if there are no markers to watch or
+    check_every is 0.
+    """
+    check_every = config.get("check_every", 30)
+    if rectifier is None or not check_every:
+        return None
+    return CalibrationMonitor(rectifier, check_every=check_every, on_change=on_change)
@@ -1,48 +1,28 @@
 import math
 
-from file_handler import load_rings, load_lines
-
-Y_OFFSET = 0
-
-ring_data, _ = load_rings()
-print(ring_data)
-sector_config = load_lines()
-print(sector_config)
-
-for ring in ring_data:
-    ring[1] -= Y_OFFSET
-
-new_sectors = []
-for sector in sector_config:
-    if isinstance(sector, (tuple, list)) and len(sector) >= 4:
-        if len(sector) == 6:
-            x1, y1, x2, y2, sx, sy = sector
-            new_sectors.append((x1, y1 - Y_OFFSET, x2, y2 - Y_OFFSET, sx, sy))
-        elif len(sector) == 4:
-            x1, y1, x2, y2 = sector
-            new_sectors.append((x1, y1 - Y_OFFSET, x2, y2 - Y_OFFSET))
-        else:
-            new_sectors.append(sector)
-    else:
-        new_sectors.append(sector)
-
-sector_config = new_sectors
+import numpy as np
+
+from calibration import current
 
 NUM_SECTORS = 20
 DARTBOARD_NUMBERS = [10, 15, 2, 17, 3, 19, 7, 16, 8, 11,
                      14, 9, 12, 5, 20, 1, 18, 4, 13, 6]
 
-NUM_RINGS = len(ring_data)
+# Every function below reads the calibration once, from calibration.current() unless one
+# is passed in, so a recalibration swapped in meanwhile never mixes into a result. The
+# number of rings is that of the calibration's ring data
 
 
-def classify_ring(x, y):
-    for i in range(NUM_RINGS - 1):
+def classify_ring(x, y, calibration=None):
+    ring_data = (calibration or current()).ring_data
+    num_rings = len(ring_data)
+    for i in range(num_rings - 1):
         outer = ring_data[i]
         inner = ring_data[i + 1]
         if point_in_ellipse(x, y, outer) and not point_in_ellipse(x, y, inner):
             return [i, i + 1]
     if point_in_ellipse(x, y, ring_data[-1]):
-        return [NUM_RINGS - 1]
+        return [num_rings - 1]
     return [0]
 
 
@@ -54,8 +34,10 @@ def point_in_ellipse(x, y, ring):
     return nx ** 2 + ny ** 2 <= 1
 
 
-def classify_sector(x, y):
-    rotation_deg, offset_x, offset_y, scale, stretch_x, stretch_y = sector_config
+def classify_sector(x, y, calibration=None):
+    calibration = calibration or current()
+    ring_data = calibration.ring_data
+    rotation_deg, offset_x, offset_y, scale, stretch_x, stretch_y = calibration.sector_config
 
     cx, cy = ring_data[0][0], ring_data[0][1]
     ring_sx = ring_data[0][3]
@@ -77,8 +59,10 @@ def classify_sector(x, y):
     return sector_index
 
 
-def get_relative_coords(x, y):
-    rotation_deg, offset_x, offset_y, scale, stretch_x, stretch_y = sector_config
+def get_relative_coords(x, y, calibration=None):
+    calibration = calibration or current()
+    ring_data = calibration.ring_data
+    rotation_deg, offset_x, offset_y, scale, stretch_x, stretch_y = calibration.sector_config
 
     cx, cy = ring_data[0][0], ring_data[0][1]
     ring_sx = ring_data[0][3]
@@ -93,6 +77,89 @@ def get_relative_coords(x, y):
     return rel_x, rel_y
 
 
+# Array versions of the functions above. They take array-likes of x and y, compute in
+# float32 like the scalar path does for Python numbers, and return the same results
+# element-wise.
+
+def classify_ring_array(xs, ys, calibration=None):
+    """
+    Returns (outer, inner) int arrays. inner is -1 where classify_ring would return a
+    single id, so [outer] or [outer, inner] is exactly the scalar result.
+    """
+    ring_data = (calibration or current()).ring_data
+    num_rings = len(ring_data)
+    xs = np.asarray(xs, dtype=np.float32)
+    ys = np.asarray(ys, dtype=np.float32)
+
+    inside = [point_in_ellipse(xs, ys, ring) for ring in ring_data]
+
+    outer = np.full(xs.shape, -1, dtype=np.int8)
+    for i in range(num_rings - 2, -1, -1):
+        outer[inside[i] & ~inside[i + 1]] = i
+    inner = np.where(outer >= 0, outer + 1, -1).astype(np.int8)
+
+    single = outer == -1
+    outer[single] = np.where(inside[-1][single], num_rings - 1, 0)
+    return outer, inner
+
+
+def classify_sector_array(xs, ys, calibration=None):
+    calibration = calibration or current()
+    rel_x, rel_y = get_relative_coords_array(xs, ys, calibration)
+
+    raw_angle = np.degrees(np.arctan2(rel_y.astype(np.float64), rel_x.astype(np.float64))) % 360
+
+    adjusted_angle = (raw_angle - calibration.sector_config[0] + 360) % 360
+
+    sector_size = 360 / NUM_SECTORS
+    return (adjusted_angle // sector_size).astype(np.int8)
+
+
+def get_relative_coords_array(xs, ys, calibration=None):
+    calibration = calibration or current()
+    ring_data = calibration.ring_data
+    rotation_deg, offset_x, offset_y, scale, stretch_x, stretch_y = calibration.sector_config
+
+    cx, cy = ring_data[0][0], ring_data[0][1]
+    ring_sx = ring_data[0][3]
+    ring_sy = ring_data[0][4]
+
+    dx = np.asarray(xs, dtype=np.float32) - (cx + offset_x)
+    dy = np.asarray(ys, dtype=np.float32) - (cy + offset_y)
+
+    rel_x = dx / (ring_sx * scale * stretch_x)
+    rel_y = dy / (ring_sy * scale * stretch_y)
+
+    return rel_x, rel_y
+
+
+def field_lookup_table(calibration=None):
+    """
+    Returns (fields, lut) where lut[outer, inner + 1, sector] indexes into fields, sized
+    for the calibration's rings. Built from classify_field so the array path can never
+    disagree with it.
+    """
+    num_rings = len((calibration or current()).ring_data)
+    fields = []
+    lut = np.zeros((num_rings, num_rings + 1, NUM_SECTORS), dtype=np.uint8)
+    for outer in range(num_rings):
+        for inner in range(-1, num_rings):
+            ring_ids = [outer] if inner < 0 else [outer, inner]
+            for sector_id in range(NUM_SECTORS):
+                field = classify_field(ring_ids, sector_id)
+                if field not in fields:
+                    fields.append(field)
+                lut[outer, inner + 1, sector_id] = fields.index(field)
+    return fields, lut
+
+
+def classify_field_array(outer, inner, sector_ids, calibration=None):
+    fields, lut = field_lookup_table(calibration)
+    labels = lut[np.asarray(outer, dtype=np.intp), np.asarray(inner, dtype=np.intp) + 1,
+                 np.asarray(sector_ids, dtype=np.intp)]
+    return np.asarray(fields, dtype=object)[labels]
+
+
 def classify_field(ring_ids, sector_id):
     if 0 in ring_ids and len(ring_ids) == 1:
         return "0"
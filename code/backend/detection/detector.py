@@ -1,90 +1,124 @@
 import cv2
 import numpy as np
 import time
-import os
-from threading import Thread
-from queue import Queue
 
-groups = []
-
-def _estimate_tip(contour, frame_debug=None):
-    if contour is None or len(contour) < 3:
-        return None, None
-
-    hull = cv2.convexHull(contour)
-    pts = hull.reshape(-1, 2)
-
-    centroid = np.mean(pts, axis=0)
+from artifact_sink import ArtifactSink
+from background import make_background
+from blobs import make_blob_finder, to_frame_blob
+from filters import FilterPipeline
+from known_darts import KnownDarts
+from tip import TipLocator
 
-    left_idx = np.argmin(pts[:, 0])
-    tip = tuple(pts[left_idx].astype(int))
-
-    if frame_debug is not None:
-        debug_img = cv2.cvtColor(frame_debug.copy(), cv2.COLOR_GRAY2BGR)
-        cv2.circle(debug_img, tip, 6, (0, 0, 255), -1)
-        cv2.circle(debug_img, (int(centroid[0]), int(centroid[1])), 5, (255, 0, 0), -1)
-        cv2.imwrite("last_detected_dart.png", debug_img)
+groups = []
 
-    return tip, centroid
+def _tip_debug_image(thresh, tip, centroid, size):
+    """thresh as BGR with the tip and centroid marked, scaled to size = (w, h) of the processed frame"""
+    if thresh.shape[:2] != (size[1], size[0]):
+        thresh = cv2.resize(thresh, size, interpolation=cv2.INTER_NEAREST)
+    debug_img = cv2.cvtColor(thresh, cv2.COLOR_GRAY2BGR)
+    cv2.circle(debug_img, (int(tip[0]), int(tip[1])), 6, (0, 0, 255), -1)
+    cv2.circle(debug_img, (int(centroid[0]), int(centroid[1])), 5, (255, 0, 0), -1)
+    return debug_img
 
 class DartDetector:
-    def __init__(self, still_time=0.4, motion_thresh=18, min_blob_area=50, debug=False):
-        self.bg_frame = None
-        self.last_movement = time.time()
+    def __init__(self, still_time=0.4, motion_thresh=18, min_blob_area=50, debug=False, filter_pipeline="reference",
+                 pyramid_levels=0, clock=time.time, artifact_sink=None,
+                 recorder=None, frame_ring=None, background="snapshot", scheduler=None, tip_direction="left",
+                 preview=True, blob_finder="contours"):
+        # Every time-based decision (still_time, motion history, cooldowns) reads this,
+        # so a replay can drive the detector with recorded timestamps
+        self.clock = clock
+        # What diffs are taken against, a model from background.BACKGROUNDS or its name
+        self.background = make_background(background)
+        self.last_movement = self.clock()
         self.still_time = still_time
         self.motion_thresh = motion_thresh
         self.min_blob_area = min_blob_area
+        # How thresh is split into blobs, a function or a name from blobs.BLOB_FINDERS
+        self.find_blobs = make_blob_finder(blob_finder)
         self.detected_positions = []
-        self.known_darts = []
+        self._known_darts = KnownDarts()
+        # Pixels around a known tip that are masked out of thresh
+        self.known_dart_radius = 12
+        # A tip this close to a known one is that dart again, e.g. its blob grew just
+        # past the masked circle, and is not reported
+        self.duplicate_radius = 16
+        self.duplicates = 0
         self.ready_to_analyze = False
+        # Which way darts point in the image, see tip.DIRECTIONS
+        self.tip_locator = TipLocator(tip_direction)
+
+        # Smoothing of the background diff, a FilterPipeline or a preset name from filters.PRESETS
+        if isinstance(filter_pipeline, str):
+            filter_pipeline = FilterPipeline.preset(filter_pipeline)
+        self.filter_pipeline = filter_pipeline
+
+        # Motion gating and the stillness check run on a 1/2**pyramid_levels image, only the
+        # tip is refined at full resolution around the blob, see _refine_tip
+        self.pyramid_levels = pyramid_levels
+        # Full-resolution pixels around the blob. Must exceed the 35px closing kernel in
+        # _connect_dart_parts, which otherwise grows blobs into the crop border
+        self.refine_margin = 40
+        self.bg_full = None
 
         self.motion_history = []
         self.motion_history_duration = 0.5
         self.motion_min_level = 30
         self.motion_max_jump = 60
 
+        # Something shows the thresh image and debug_tip (main.render_view). Without a preview
+        # update() returns None for thresh and no tip image is drawn
+        self.preview = preview
         self.debug_tip = None
         self.debug_merged = None
         self.debug = debug
+        # Where _debug_save sends images, created on first use if not given
+        self.artifacts = artifact_sink
         self.debug_frame_id = 0
+
+        # Derived from the ignore mask and known_darts, see _get_keep_mask
+        self._keep_mask = None
+        self._keep_mask_key = None
+        self._ignore_mask_src = None
+        self._keep_mask_full = None
+        self._keep_mask_darts = (None, None, 0)
+        self._keep_mask_samples = None
+
+        # Set to a profiler.StageProfiler to time each stage of update()
+        self.profiler = None
+
+        # Region of interest (x, y, w, h) in full-frame pixels, see update()
+        self.roi = None
+        self._frame_buffers = {}
+        # Blobs of the last update() as blobs.Blob records in full-frame pixels, largest first
+        self.blobs = []
         
         # Camera auto-adjustment detection
         self.global_motion_thresh = 0.15  # If >15% of frame has significant motion, it's likely auto-adjustment
         self.camera_adjustment_cooldown = 0.5  # Ignore detections for 0.5s after auto-adjustment
         self.last_camera_adjustment = 0
+        self.camera_adjustments = 0
         self.auto_adjustment_history = []
 
-        # Motion frame capture on separate thread
-        self.motion_frame_id = 0
-        self.save_motion_frames = True
-        self.motion_frames_dir = "motion_frames"
-        self.motion_frame_queue = Queue()
-        self.motion_writer_thread = None
-        self.stop_motion_writer = False
+        # Optional recorder.MotionRecorder. Without one nothing is copied or written
+        self.recorder = recorder
+        # Optional frame_ring.FrameRing, flushed as a clip on every new dart or via request_clip()
+        self.frame_ring = frame_ring
+        # Optional scheduler.MotionScheduler. Without one every frame gets the full chain
+        self.scheduler = scheduler
 
-        # Create motion_frames directory if it doesn't exist
-        if self.save_motion_frames and not os.path.exists(self.motion_frames_dir):
-            os.makedirs(self.motion_frames_dir)
+    def _apply_filter_pipeline(self, diff, bufs=None):
+        """bufs: a dict of arrays to reuse like _frame_buffers, the result is its "thresh". None allocates."""
+        bufs = {} if bufs is None else bufs
+        gray = self.filter_pipeline(diff, bufs)
 
-        # Start motion frame writer thread
-        self._start_motion_writer_thread()
-
-    def _apply_filter_pipeline(self, diff):
-        blur = cv2.GaussianBlur(diff, (5, 5), 0)
-
-        for i in range(10):
-            blur = cv2.GaussianBlur(blur, (9, 9), 1)
-
-        blur = cv2.bilateralFilter(blur, 9, 75, 75)
-
-        gray = blur
-
-        _, thresh = cv2.threshold(gray, self.motion_thresh, 255, 0)
+        _, thresh = cv2.threshold(gray, self.motion_thresh, 255, 0, dst=bufs.get("thresh"))
+        bufs["thresh"] = thresh
         return thresh
 
     def create_filter_images(self, diff):
         if self.debug:
-            self._debug_save("10_diff_input", diff)
+            self._debug_save("10_diff_input", diff, copy=True)
 
         blur = cv2.GaussianBlur(diff, (5, 5), 0)
         if self.debug:
@@ -107,15 +141,20 @@ class DartDetector:
         if self.debug:
             self._debug_save("15_thresh_raw", thresh)
 
-    def _connect_dart_parts(self, thresh):
-        kernel_long = cv2.getStructuringElement(cv2.MORPH_RECT, (35, 5))
-        connected = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel_long)
+    def _connect_dart_parts(self, thresh, scale=1, bufs=None, out=None):
+        bufs = {} if bufs is None else bufs
+        long_size = (max(1, round(35 / scale)), max(1, round(5 / scale)))
+        kernel_long = cv2.getStructuringElement(cv2.MORPH_RECT, long_size)
+        connected = bufs["connected"] = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel_long,
+                                                         dst=bufs.get("connected"))
 
-        kernel_small = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (7, 7))
-        connected = cv2.morphologyEx(connected, cv2.MORPH_CLOSE, kernel_small)
+        small_size = max(3, round(7 / scale))
+        kernel_small = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (small_size, small_size))
+        connected = cv2.morphologyEx(connected, cv2.MORPH_CLOSE, kernel_small, dst=out)
 
         if self.debug:
-            self._debug_save("18_connected", connected)
+            # Without a preview connected is the reused thresh buffer, see update()
+            self._debug_save("18_connected", connected, copy=True)
 
         return connected
 
@@ -126,7 +165,9 @@ class DartDetector:
         Returns True if camera adjustment detected, False if it's localized motion (dart).
         """
         # Threshold the diff to get motion areas
-        _, thresh = cv2.threshold(diff, 30, 255, 0)
+        bufs = self._frame_buffers
+        _, thresh = cv2.threshold(diff, 30, 255, 0, dst=bufs.get("adjustment"))
+        bufs["adjustment"] = thresh
         
         # Calculate what percentage of the frame has motion
         total_pixels = thresh.shape[0] * thresh.shape[1]
@@ -141,220 +182,471 @@ class DartDetector:
         
         return False
 
-    def _start_motion_writer_thread(self):
-        """Start the background thread that saves motion frames"""
-        self.stop_motion_writer = False
-        self.motion_writer_thread = Thread(target=self._motion_writer_worker, daemon=True)
-        self.motion_writer_thread.start()
-        print("Motion writer thread started.")
-
-    def _motion_writer_worker(self):
-        """Worker thread that continuously saves motion frames from the queue"""
-        while not self.stop_motion_writer:
-            try:
-                # Get frame from queue with timeout to allow stopping
-                frame, motion_level = self.motion_frame_queue.get(timeout=0.5)
-
-                if frame is None:  # Sentinel value to stop thread
-                    break
+    def _set_roi(self, roi, frame_shape):
+        if roi is not None:
+            x, y, w, h = roi
+            x, y = max(0, int(x)), max(0, int(y))
+            w = min(int(w), frame_shape[1] - x)
+            h = min(int(h), frame_shape[0] - y)
+            roi = (x, y, w, h) if w > 0 and h > 0 else None
+        if roi != self.roi:
+            # Background and masks are crop-sized, start over
+            self.roi = roi
+            self.bg_frame = None
+            self._keep_mask = None
+        return roi
+
+    def _to_frame(self, thresh, frame_shape):
+        """
+        Places a crop-sized (or downscaled crop) result back into a full-frame image for
+        display. A new image every call: it is drawn on the render thread while the next
+        frame is processed. None without a preview.
+        """
+        if not self.preview:
+            return None
+        if self.roi is None:
+            return thresh
+        full = np.zeros(frame_shape[:2], dtype=np.uint8)
+        x, y, w, h = self.roi
+        if thresh.shape != (h, w):
+            thresh = cv2.resize(thresh, (w, h), interpolation=cv2.INTER_NEAREST)
+        full[y:y + h, x:x + w] = thresh
+        return full
+
+    @property
+    def scale(self):
+        return 2 ** self.pyramid_levels
+
+    def _work_size(self, shape):
+        """(width, height) of the image motion detection runs on."""
+        return max(1, shape[1] // self.scale), max(1, shape[0] // self.scale)
+
+    @property
+    def known_darts(self):
+        return self._known_darts
+
+    @known_darts.setter
+    def known_darts(self, points):
+        self._known_darts.clear()
+        self._known_darts.extend(points)
+
+    @property
+    def bg_frame(self):
+        return self.background.frame
+
+    @bg_frame.setter
+    def bg_frame(self, img):
+        # Setting None (e.g. the 'r' key) starts over with the next frame. A scheduler's
+        # reference is as stale as the background, so it goes back to full processing
+        if img is None:
+            self.background.clear()
+            if self.scheduler is not None:
+                self.scheduler.wake()
+        else:
+            self.background.reset(img)
+
+    def _set_background(self, blurred, gray):
+        self.background.reset(blurred)
+        self.bg_full = cv2.GaussianBlur(gray, (9, 9), 0) if self.pyramid_levels > 0 else None
+
+    def _refine_tip(self, gray, hull):
+        """
+        Re-runs diff, filters and tip estimation at full resolution, but only inside the
+        bounding box of the downscaled hull. Returns (tip, centroid, hull) in crop pixels,
+        or (None, None, None) if nothing survives at full resolution.
+        """
+        s = self.scale
+        bx, by, bw, bh = cv2.boundingRect(hull.astype(np.int32))
+        m = self.refine_margin
+        x0, y0 = max(0, bx * s - m), max(0, by * s - m)
+        x1 = min(gray.shape[1], (bx + bw) * s + m)
+        y1 = min(gray.shape[0], (by + bh) * s + m)
+        if x1 <= x0 or y1 <= y0 or self.bg_full is None:
+            return None, None, None
+
+        blurred = cv2.GaussianBlur(gray[y0:y1, x0:x1], (9, 9), 0)
+        diff = cv2.absdiff(self.bg_full[y0:y1, x0:x1], blurred)
 
-                # Save the frame
-                filename = f"{self.motion_frames_dir}/{self.motion_frame_id:06d}_motion_{motion_level:.0f}.png"
-                cv2.imwrite(filename, frame)
-                self.motion_frame_id += 1
+        thresh = self._apply_filter_pipeline(diff)
+        thresh = cv2.dilate(thresh, None, iterations=2)
+        thresh = cv2.erode(thresh, None, iterations=1)
+        thresh = self._connect_dart_parts(thresh)
+        if self._keep_mask_full is not None:
+            thresh = cv2.bitwise_and(thresh, self._keep_mask_full[y0:y1, x0:x1], dst=thresh)
 
-            except Exception:
-                # Queue timeout or other error, just continue
-                pass
+        blobs, labels, origin = self.find_blobs(thresh, self.min_blob_area)
+        if not blobs:
+            return None, None, None
 
-    def queue_motion_frame(self, frame, motion_level):
-        """Queue a motion frame for async saving (non-blocking)"""
-        if not self.save_motion_frames:
-            return
+        tip, centroid, merged = self.tip_locator.locate(labels, blobs, origin, diff)
+        merged += (x0, y0)
+        return tip + (x0, y0), centroid + (x0, y0), merged
 
-        try:
-            # Only queue if queue isn't too full (max 30 frames in queue)
-            if self.motion_frame_queue.qsize() < 30:
-                self.motion_frame_queue.put((frame.copy(), motion_level), block=False)
-        except Exception as e:
-            print(f"Error queuing motion frame: {e}")
-
-    def stop_motion_writer_thread(self):
-        """Stop the motion writer thread gracefully"""
-        self.stop_motion_writer = True
-        if self.motion_writer_thread and self.motion_writer_thread.is_alive():
-            # Send sentinel value to wake up thread
-            try:
-                self.motion_frame_queue.put((None, 0), block=False)
-            except:
-                pass
-            self.motion_writer_thread.join(timeout=2.0)
+    def update(self, frame, ignore_mask=None, roi=None):
+        """
+        roi = (x, y, w, h) limits all processing to that part of the frame, e.g. the board
+        bounding box. Returned tips and the thresh image are in full-frame coordinates.
+        """
+        prof = self.profiler
+        if prof is None:
+            return self._update(frame, ignore_mask, roi)
+        prof.start()
+        result = self._update(frame, ignore_mask, roi)
+        prof.end()
+        return result
+
+    def _update(self, frame, ignore_mask, roi):
+        self.blobs = []
+        roi = self._set_roi(roi, frame.shape)
+        if roi is not None:
+            ox, oy, w, h = roi
+            full_frame = frame
+            frame = frame[oy:oy + h, ox:ox + w]
+        else:
+            ox, oy = 0, 0
+            full_frame = frame
+
+        sched = self.scheduler
+        if sched is None:
+            return self._detect(frame, full_frame, ox, oy, ignore_mask)
+        if self.bg_frame is not None and not sched.wants_full(frame, self.clock()):
+            return self._idle(frame, full_frame)
+        result = self._detect(frame, full_frame, ox, oy, ignore_mask)
+        quiet = self.bg_frame is not None and result[3] <= self.motion_min_level
+        if sched.observe(frame, quiet, self.known_darts.version, self.clock()):
+            # Diffs during the next probe-only stretch start from the frame the probes compare with
+            bufs = self._frame_buffers
+            self._set_background(bufs["blurred"], bufs["gray"])
+        return result
+
+    def _idle(self, frame, full_frame):
+        """
+        A frame the scheduler only probed: no diff, no filters. Keeps the frame ring,
+        recorder and motion history going as if it had been processed with no motion.
+        """
+        prof = self.profiler
+        now = self.clock()
+        if self.frame_ring is not None:
+            bufs = self._frame_buffers
+            gray = bufs["gray"] = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=bufs.get("gray"))
+            self.frame_ring.push(gray if self.frame_ring.source == "gray" else self._blur(gray), now)
+        if self.recorder is not None:
+            self.recorder.record(full_frame, 0, now)
+        self._track_motion(now, 0)
+        if prof:
+            prof.lap("probe")
+        return [], None, [], 0
+
+    def _blur(self, gray):
+        """gray downscaled to the pyramid level and blurred, what diffs are taken of"""
+        bufs = self._frame_buffers
+        if self.pyramid_levels > 0:
+            work = bufs["work"] = cv2.resize(gray, self._work_size(gray.shape), dst=bufs.get("work"),
+                                             interpolation=cv2.INTER_AREA)
+        else:
+            work = gray
+        ksize = (9, 9) if self.scale == 1 else (5, 5)
+        blurred = bufs["blurred"] = cv2.GaussianBlur(work, ksize, 0, dst=bufs.get("blurred"))
+        return blurred
+
+    def _track_motion(self, now, motion_level):
+        self.motion_history.append((now, motion_level))
+        self.motion_history = [(t, l) for (t, l) in self.motion_history if now - t <= self.motion_history_duration]
 
-    def update(self, frame, ignore_mask=None):
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(gray, (9, 9), 0)
+        if len(self.motion_history) >= 3:
+            levels = [l for (_, l) in self.motion_history]
+            spread = max(levels) - min(levels)
+            if spread < self.motion_max_jump:
+                self.last_movement = now
+                self.ready_to_analyze = True
 
-        if self.bg_frame is None:
-            self.bg_frame = blurred.copy()
+    def _detect(self, frame, full_frame, ox, oy, ignore_mask):
+        prof = self.profiler
+        # Per-frame intermediates are written into the previous frame's arrays. Nothing
+        # keeps them past this call, _set_background and the frame ring copy
+        bufs = self._frame_buffers
+        gray = bufs["gray"] = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=bufs.get("gray"))
+        blurred = self._blur(gray)
+        s = self.scale
+        if self.frame_ring is not None:
+            self.frame_ring.push(gray if self.frame_ring.source == "gray" else blurred, self.clock())
+        if prof:
+            prof.lap("gray_blur")
+
+        if self.bg_frame is None or self.bg_frame.shape != blurred.shape:
+            self._set_background(blurred, gray)
             return [], None, [], 0
 
-        diff = cv2.absdiff(self.bg_frame, blurred)
-        
+        diff = bufs["diff"] = cv2.absdiff(self.bg_frame, blurred, dst=bufs.get("diff"))
+        if prof:
+            prof.lap("absdiff")
+
         # Check for camera auto-adjustment (focus/brightness change)
-        now = time.time()
-        if self._detect_camera_adjustment(diff):
+        now = self.clock()
+        camera_adjusted = self._detect_camera_adjustment(diff)
+        if prof:
+            prof.lap("camera_adjustment")
+        if camera_adjusted:
             # Reset background to adapt to new conditions
-            self.bg_frame = blurred.copy()
+            self._set_background(blurred, gray)
             self.last_camera_adjustment = now
+            self.camera_adjustments += 1
             self.motion_history.clear()
             self.ready_to_analyze = False
-            self.known_darts.clear()
+            # A snapshot background cannot tell lighting from a board that was cleared.
+            # The running model absorbs slow changes, so what trips this is the camera
+            # itself and the darts are still where they were
+            if self.background.kind == "snapshot":
+                self.known_darts.clear()
             if self.debug:
-                self._debug_save("20_camera_adjustment", diff)
+                self._debug_save("20_camera_adjustment", diff, copy=True)
             # Return early - don't process during adjustment
-            return [], np.zeros_like(diff), [], 0
-
-        thresh = self._apply_filter_pipeline(diff)
-
-        thresh = cv2.dilate(thresh, None, iterations=2)
-        thresh = cv2.erode(thresh, None, iterations=1)
-
-        thresh = self._connect_dart_parts(thresh)
+            return [], self._to_frame(np.zeros_like(diff), full_frame.shape), [], 0
+
+        thresh = self._apply_filter_pipeline(diff, bufs)
+        if prof:
+            prof.lap("filter_pipeline")
+
+        thresh = bufs["dilated"] = cv2.dilate(thresh, None, dst=bufs.get("dilated"), iterations=2)
+        thresh = bufs["thresh"] = cv2.erode(thresh, None, dst=bufs.get("thresh"), iterations=1)
+        if prof:
+            prof.lap("dilate_erode")
+
+        # For a preview the last step allocates: thresh leaves update() and is drawn on the
+        # render thread while the next frame is processed
+        thresh = self._connect_dart_parts(thresh, scale=s, bufs=bufs, out=None if self.preview else thresh)
+        if prof:
+            prof.lap("connect_parts")
+
+        keep_mask = self._get_keep_mask(ignore_mask, full_frame.shape[:2])
+        thresh = cv2.bitwise_and(thresh, keep_mask, dst=thresh)
+        if prof:
+            prof.lap("known_dart_mask")
+
+        # In full-resolution pixels, so the motion thresholds do not depend on pyramid_levels
+        motion_level = np.sum(thresh) / 255 * s * s
+
+        # Only adapt while nothing is going on. Adapting around a blob that is still
+        # settling changes its size every frame and the stillness check never passes
+        if motion_level <= self.motion_min_level:
+            self.background.update(blurred, thresh)
+            if self.bg_full is not None and self.background.kind == "running":
+                # What _refine_tip diffs against has to follow the model, or a tip found on
+                # the adapted work image is refined against the light of the last reset
+                cv2.GaussianBlur(gray, (9, 9), 0, dst=self.bg_full)
+        if prof:
+            prof.lap("background")
+
+        # A blob needs min_blob_area pixels, below that there is nothing to label
+        blobs, labels, origin = [], None, (0, 0)
+        if motion_level >= self.min_blob_area:
+            blobs, labels, origin = self.find_blobs(thresh, self.min_blob_area / (s * s))
+        self.blobs = [to_frame_blob(b, s, (ox, oy)) for b in blobs]
+        contour_boxes = [b.bbox for b in self.blobs]
+        if prof:
+            prof.lap("blobs")
 
-        if ignore_mask is not None:
-            try:
-                mask = ignore_mask
-                if not isinstance(mask, np.ndarray):
-                    mask = np.array(mask)
-                if mask.dtype != np.bool_:
-                    mask = mask.astype(np.uint8)
-                    mask = mask != 0
-
-                if mask.shape != thresh.shape:
-                    mask_resized = cv2.resize(mask.astype('uint8'), (thresh.shape[1], thresh.shape[0]), interpolation=cv2.INTER_NEAREST)
-                    mask = mask_resized != 0
-
-                if mask.any():
-                    thresh = thresh.copy()
-                    thresh[mask] = 0
-            except Exception:
-                pass
-
-        known_mask = np.ones_like(thresh) * 255
-        for (x, y) in self.known_darts:
-            cv2.circle(known_mask, (int(x), int(y)), 12, (0,), -1)
-        thresh = cv2.bitwise_and(thresh, thresh, mask=known_mask)
-
-        motion_level = np.sum(thresh) / 255
         new_darts = []
-        contour_boxes = []
-        now = time.time()
+        now = self.clock()
 
-        # Queue motion frame for async saving if motion detected
-        if motion_level > self.motion_min_level:
-            self.queue_motion_frame(frame, motion_level)
+        if self.recorder is not None:
+            self.recorder.record(full_frame, motion_level, now)
 
-        self.motion_history.append((now, motion_level))
-        self.motion_history = [(t, l) for (t, l) in self.motion_history if now - t <= self.motion_history_duration]
-
-        if len(self.motion_history) >= 3:
-            levels = [l for (_, l) in self.motion_history]
-            spread = max(levels) - min(levels)
-            if spread < self.motion_max_jump:
-                self.last_movement = now
-                self.ready_to_analyze = True
+        self._track_motion(now, motion_level)
+        if prof:
+            prof.lap("motion_history")
 
         if motion_level > 8000:
             self.ready_to_analyze = False
-            self.bg_frame = blurred.copy()
+            self._set_background(blurred, gray)
             self.known_darts.clear()
-            return [], thresh, contour_boxes, motion_level
+            return [], self._to_frame(thresh, full_frame.shape), contour_boxes, motion_level
 
         if self.ready_to_analyze and (now - self.last_movement > self.still_time):
-            self._debug_save("01_input", frame)
-            self._debug_save("02_diff_global", diff)
-            self._debug_save("03_thresh_global", thresh)
-
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-            contours = [c for c in contours if cv2.contourArea(c) >= self.min_blob_area]
-            contours = sorted(contours, key=cv2.contourArea, reverse=True)
+            self._debug_save("01_input", frame, copy=True)
+            self._debug_save("02_diff_global", diff, copy=True)
+            self._debug_save("03_thresh_global", thresh, copy=True)
 
             if self.debug:
                 dbg = frame.copy()
-                for c in contours[:3]:
-                    if c is not None and len(c) > 0:
-                        cv2.drawContours(dbg, [c], -1, (0, 255, 0), 2)
+                for b in self.blobs[:3]:
+                    x, y, w, h = b.bbox
+                    cv2.rectangle(dbg, (x - ox, y - oy), (x - ox + w, y - oy + h), (0, 255, 0), 2)
                 self._debug_save("04_largest_contours", dbg)
 
-            if contours:
-                try:
-                    all_pts = np.vstack([c.reshape(-1, 2) for c in contours])
-                    all_pts = all_pts.astype(np.float32)
-                except Exception:
-                    all_pts = None
-
-                merged_contour = None
-                tip = None
-                centroid = None
-
-                if all_pts is not None and len(all_pts) >= 3:
-                    merged_contour = cv2.convexHull(all_pts.reshape(-1, 1, 2))
-                    tip, centroid = _estimate_tip(merged_contour, frame_debug=thresh)
-
-                if (tip is None or centroid is None) and isinstance(all_pts, np.ndarray) and all_pts.shape[0] > 0:
-                    left_idx = int(np.argmin(all_pts[:, 0]))
-                    x = float(all_pts[left_idx, 0].tolist())
-                    y = float(all_pts[left_idx, 1].tolist())
-                    tip = (int(x), int(y))
-                    centroid = np.mean(all_pts, axis=0)
+            if blobs:
+                # At full resolution the diff is there to refine the tip on, a downscaled
+                # tip is only the starting point for _refine_tip
+                tip, centroid, merged_contour = self.tip_locator.locate(labels, blobs, origin,
+                                                                        diff if s == 1 else None)
+
+                if s > 1:
+                    refined_tip, refined_centroid, refined_hull = self._refine_tip(gray, merged_contour)
+                    if refined_tip is not None:
+                        tip, centroid, merged_contour = refined_tip, refined_centroid, refined_hull
+                    else:
+                        tip = tip * s
+                        centroid = centroid * s
+                        merged_contour = merged_contour * s
+                if prof:
+                    prof.lap("hull_tip")
 
                 if tip is not None and centroid is not None:
-                    if tip[0] >= centroid[0]:
-                        return [], thresh, contour_boxes, motion_level
+                    if not self.tip_locator.faces_forward(tip, centroid):
+                        return [], self._to_frame(thresh, full_frame.shape), contour_boxes, motion_level
+                    if self.known_darts.near(tip[0] + ox, tip[1] + oy, self.duplicate_radius) is not None:
+                        self.duplicates += 1
+                        tip = None
 
-                    self.known_darts.append(tip)
-                    new_darts.append(tip)
+                if tip is not None and centroid is not None:
+                    dart = (float(tip[0] + ox), float(tip[1] + oy))
+                    self.known_darts.append(dart)
+                    new_darts.append(dart)
                     self.ready_to_analyze = False
+                    if self.recorder is not None:
+                        self.recorder.trigger()
+                    if self.frame_ring is not None:
+                        self.frame_ring.flush("dart")
+
+                    # Handed to the renderer in memory, see main.render_view
+                    if self.preview:
+                        self.debug_tip = _tip_debug_image(thresh, tip, centroid, (frame.shape[1], frame.shape[0]))
+
+                    if self.debug:
+                        tip_px = (int(tip[0]), int(tip[1]))
+                        debug_final = frame.copy()
+                        cv2.circle(debug_final, tip_px, 8, (0, 0, 255), -1)
+                        cv2.circle(debug_final, tip_px, 22, (0, 255, 255), 2)
+                        cv2.putText(debug_final, "DART", (tip_px[0] + 10, tip_px[1] - 10),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+                        try:
+                            if merged_contour is not None and merged_contour.shape[0] > 0:
+                                dbg_merged = frame.copy()
+                                cv2.drawContours(dbg_merged, [merged_contour.astype(np.int32)], -1, (255, 0, 0), 2)
+                                cv2.circle(dbg_merged, tip_px, 6, (0, 0, 255), -1)
+                                self._debug_save("04_largest_contours_merged", dbg_merged)
+                        except Exception:
+                            print("Error drawing merged contour for debug")
+                            pass
+
+                        self._debug_save("05_final_tip", debug_final)
+
+                        self.create_filter_images(diff)
 
-                    debug_final = frame.copy()
-                    cv2.circle(debug_final, tip, 8, (0, 0, 255), -1)
-                    cv2.circle(debug_final, tip, 22, (0, 255, 255), 2)
-                    cv2.putText(debug_final, "DART", (tip[0] + 10, tip[1] - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+                    self.debug_frame_id += 1
+                    self.motion_history.clear()
 
-                    try:
-                        if merged_contour is not None and merged_contour.shape[0] > 0:
-                            dbg_merged = frame.copy()
-                            cv2.drawContours(dbg_merged, [merged_contour], -1, (255, 0, 0), 2)
-                            cv2.circle(dbg_merged, tip, 6, (0, 0, 255), -1)
-                            self._debug_save("04_largest_contours_merged", dbg_merged)
-                    except Exception:
-                        print("Error drawing merged contour for debug")
-                        pass
+            # With nothing on the board to absorb, a running background is already up to date
+            if blobs or self.background.kind == "snapshot":
+                self._set_background(blurred, gray)
+            self.ready_to_analyze = False
 
-                    self._debug_save("05_final_tip", debug_final)
+        return new_darts, self._to_frame(thresh, full_frame.shape), contour_boxes, motion_level
 
-                    self.create_filter_images(diff)
+    def _get_keep_mask(self, ignore_mask, shape):
+        """
+        255 where blobs count, 0 outside the board and around known darts, cropped to the
+        roi if one is set and downscaled to the pyramid level. shape is the full frame shape.
+        Only rebuilt when a different ignore mask object is passed in or darts were removed,
+        so callers should hand over the same (cached) mask every frame. A new dart is only
+        stamped into the cached masks, see _stamp_known_dart.
+        """
+        key = (shape, self.roi, self.pyramid_levels)
+        darts = self.known_darts
+        if self._keep_mask is not None and ignore_mask is self._ignore_mask_src and key == self._keep_mask_key:
+            version, generation, count = self._keep_mask_darts
+            if darts.version == version:
+                return self._keep_mask
+            if darts.generation == generation:
+                for (x, y) in darts[count:]:
+                    self._stamp_known_dart(x, y)
+                self._keep_mask_darts = (darts.version, darts.generation, len(darts))
+                return self._keep_mask
+
+        keep = np.full(shape, 255, dtype=np.uint8)
 
-                    self.debug_frame_id += 1
-                    self.motion_history.clear()
+        if ignore_mask is not None:
+            try:
+                mask = ignore_mask
+                if not isinstance(mask, np.ndarray):
+                    mask = np.array(mask)
+                if mask.dtype != np.bool_:
+                    mask = mask.astype(np.uint8)
+                    mask = mask != 0
 
-            self.bg_frame = blurred.copy()
-            self.ready_to_analyze = False
+                if mask.shape != shape:
+                    mask_resized = cv2.resize(mask.astype('uint8'), (shape[1], shape[0]), interpolation=cv2.INTER_NEAREST)
+                    mask = mask_resized != 0
 
-        return new_darts, thresh, contour_boxes, motion_level
+                keep[mask] = 0
+            except Exception:
+                pass
+
+        for (x, y) in darts:
+            cv2.circle(keep, (int(x), int(y)), self.known_dart_radius, (0,), -1)
+
+        if self.roi is not None:
+            x, y, w, h = self.roi
+            keep = np.ascontiguousarray(keep[y:y + h, x:x + w])
+
+        self._keep_mask_full = keep
+        if self.pyramid_levels > 0:
+            size = self._work_size(keep.shape)
+            keep = cv2.resize(keep, size, interpolation=cv2.INTER_NEAREST)
+            # Source column and row of every work pixel, as cv2.resize picked them
+            h, w = self._keep_mask_full.shape
+            self._keep_mask_samples = (
+                cv2.resize(np.arange(w, dtype=np.float32)[None, :], (size[0], 1), interpolation=cv2.INTER_NEAREST)[0].astype(int),
+                cv2.resize(np.arange(h, dtype=np.float32)[:, None], (1, size[1]), interpolation=cv2.INTER_NEAREST)[:, 0].astype(int))
+
+        self._keep_mask = keep
+        self._keep_mask_key = key
+        self._keep_mask_darts = (darts.version, darts.generation, len(darts))
+        self._ignore_mask_src = ignore_mask
+        return keep
+
+    def _stamp_known_dart(self, x, y):
+        """Masks one more known dart in the cached keep masks without rebuilding them."""
+        r = self.known_dart_radius
+        ox, oy = (self.roi[0], self.roi[1]) if self.roi is not None else (0, 0)
+        cx, cy = int(x) - ox, int(y) - oy
+        full = self._keep_mask_full
+        cv2.circle(full, (cx, cy), r, (0,), -1)
+        if self._keep_mask is full:
+            return
+
+        # Redo the INTER_NEAREST downscale, but only for the work pixels the circle can reach
+        xs, ys = self._keep_mask_samples
+        x0, x1 = np.searchsorted(xs, cx - r), np.searchsorted(xs, cx + r, side="right")
+        y0, y1 = np.searchsorted(ys, cy - r), np.searchsorted(ys, cy + r, side="right")
+        if x1 > x0 and y1 > y0:
+            self._keep_mask[y0:y1, x0:x1] = full[np.ix_(ys[y0:y1], xs[x0:x1])]
 
     def get_groups(self):
         return groups
 
-    def _debug_save(self, name, img):
+    def _debug_save(self, name, img, copy=False):
+        """Queues a debug image on the artifact sink, never writes on the detection thread"""
         if not self.debug:
             return
-        filename = f"debug/{self.debug_frame_id:05d}_{name}.png"
-        cv2.imwrite(filename, img)
+        if self.artifacts is None:
+            self.artifacts = ArtifactSink(base_dir="debug")
+        self.artifacts.submit(f"{self.debug_frame_id:05d}_{name}", img, copy=copy)
+
+    def request_clip(self, reason="manual"):
+        """Safe from any thread: the pre-trigger ring is written as a clip on the next update()"""
+        if self.frame_ring is None:
+            return False
+        self.frame_ring.request_flush(reason)
+        return True
 
     def cleanup(self):
         """Cleanup resources - call this before shutting down the detector"""
-        self.stop_motion_writer_thread()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.frame_ring is not None:
+            self.frame_ring.close()
+        if self.artifacts is not None:
+            self.artifacts.close()
 
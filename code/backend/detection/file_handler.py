@@ -1,15 +1,112 @@
 import os
 import json
-import numpy as np
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 RINGS_SAVE_PATH = os.path.join(BASE_DIR, "rings.json")
 LINES_SAVE_PATH = os.path.join(BASE_DIR, "sectors.json")
+CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
+
+DEFAULT_CONFIG = {
+    "camera_index": None,
+    # Seconds to wait for cameras 0-4 to open when camera_index is not set, they are probed in parallel
+    "camera_probe_timeout": 2.0,
+    "headless": False,
+    # Per-stage timing of DartDetector.update, see GET/POST /profile
+    "profile": False,
+    # Seconds between detector_stats Socket.IO events
+    "stats_interval": 2.0,
+    # Background model of DartDetector, "snapshot" or "running", see background.BACKGROUNDS
+    "background": "snapshot",
+    # How DartDetector splits the thresh image into blobs, "contours" or "components", see blobs.BLOB_FINDERS
+    "blob_finder": "contours",
+    # Seconds between checks of rings.json/sectors.json for changes, which take effect with the next
+    # frame, see calibration.CalibrationWatcher. 0 only reads them when a camera starts or on POST /calibrate
+    "calibration_watch": 1.0,
+    # Which way darts point in the camera image: "left", "right", "up", "down" or degrees
+    # (0 = right, 90 = down), see tip.TipLocator
+    "tip_direction": "left",
+    # Preallocated frame buffers the camera decodes into, see frame_pool.build_frame_pool. 0 allocates
+    # per frame. With a recorder the pool holds at least its pre_frames on top of the pipeline's frames
+    "frame_pool": 8,
+    # Capture and detection in their own process, see process_pipeline.ProcessPipeline
+    "detector_process": False,
+    # Only probe frames at 1/scale resolution while the board is idle, see scheduler.MotionScheduler.
+    # While idle, a full pass every refresh_every seconds keeps the background up with slow lighting drift
+    "scheduler": {
+        "enabled": False,
+        "scale": 4,
+        "thresh": 18,
+        "min_changed": 64,
+        "idle_after": 1.0,
+        "refresh_every": 5.0,
+    },
+    # Board homography from the ArUco markers of aruco_markers.py, see board_homography.BoardRectifier.
+    # markers: centre of each marker id in mm from the bull (x right, y down, 20 at the top), every
+    # marker upright. rotation: degrees the 20 is turned clockwise from the top of that layout.
+    # When the markers are found, scoring, masks and dart_hit coordinates come from the homography
+    # instead of rings.json/sectors.json. Every check_every-th frame the markers are looked for again
+    # on a worker thread (0: only at start), a marker moving more than move_tolerance_px swaps in a
+    # new homography, see calibration_monitor.CalibrationMonitor
+    "aruco": {
+        "enabled": False,
+        "markers": {"0": [-220.0, -220.0], "1": [220.0, -220.0], "2": [220.0, 220.0], "3": [-220.0, 220.0]},
+        "marker_size_mm": 40.0,
+        "min_markers": 3,
+        "move_tolerance_px": 2.0,
+        "max_error_mm": 3.0,
+        "rotation": 0.0,
+        "check_every": 30,
+    },
+    # Motion/dart clips, see recorder.build_recorder. mode is "off", "video" or "jpeg"
+    "recording": {
+        "mode": "off",
+        "dir": "motion_frames",
+        "max_mb": 500,
+        "max_age_hours": 24,
+        "pre_frames": 15,
+        "post_frames": 30,
+    },
+    # In-memory ring of the last frames, written to dir as a clip per dart or on POST /clip, 60 PNGs
+    # each. source is "gray" (full resolution) or "blurred" (detection resolution). Up to queue clips
+    # wait for the writer, each holding a ring-sized buffer until it is written
+    "clips": {
+        "enabled": False,
+        "frames": 60,
+        "source": "gray",
+        "dir": "clips",
+        "max_clips": 50,
+        "queue": 2,
+    },
+    # Two or more cameras switch main() to multicam.MultiCameraPipeline, one detector process
+    # per camera. Each entry: {"name": "left", "source": 0, "weight": 1.0} where source is a camera
+    # index or video path/URL, calibrated through rings_<name>.json and sectors_<name>.json or, with
+    # an "aruco" section like the one above, through its view of the markers
+    "cameras": [],
+    # Tips from different cameras within window seconds are one dart. Estimates further than
+    # max_spread_mm from the median are dropped before averaging. A tip up to late seconds after the
+    # window, from a camera that missed it and within max_spread_mm of that dart, is dropped as the same dart
+    "fusion": {
+        "window": 0.3,
+        "max_spread_mm": 12.0,
+        "late": 0.3,
+    },
+}
 
 NUM_RINGS = 6
 
-def save_rings(rings):
+def calibration_paths(camera=None):
+    """
+    (rings, sectors) file paths. The default camera uses rings.json and sectors.json,
+    a named camera rings_<name>.json and sectors_<name>.json, both next to this file.
+    """
+    if camera is None:
+        return RINGS_SAVE_PATH, LINES_SAVE_PATH
+    return (os.path.join(BASE_DIR, f"rings_{camera}.json"),
+            os.path.join(BASE_DIR, f"sectors_{camera}.json"))
+
+
+def save_rings(rings, path=RINGS_SAVE_PATH):
     print(rings)
     json_rings = [
         {
@@ -24,16 +121,16 @@ def save_rings(rings):
     print(json_rings)
 
     try:
-        with open(RINGS_SAVE_PATH, "w") as f:
+        with open(path, "w") as f:
             json.dump(json_rings, f, indent=2)
-            with open(RINGS_SAVE_PATH, "r") as f:
+            with open(path, "r") as f:
                 print(f.read())
         return True
     except Exception as e:
         print(e)
         return False
 
-def save_lines(rotation, offset_x, offset_y, scale, stretch_x, stretch_y):
+def save_lines(rotation, offset_x, offset_y, scale, stretch_x, stretch_y, path=LINES_SAVE_PATH):
     lines_data = {
         "rotation": rotation,
         "offset_x": offset_x,
@@ -42,17 +139,20 @@ def save_lines(rotation, offset_x, offset_y, scale, stretch_x, stretch_y):
         "stretch_x": stretch_x,
         "stretch_y": stretch_y
     }
-    with open(LINES_SAVE_PATH, "w") as f:
+    with open(path, "w") as f:
         json.dump(lines_data, f, indent=2)
     return True
 
-def load_rings():
-    if os.path.exists(RINGS_SAVE_PATH):
+def load_rings(path=RINGS_SAVE_PATH):
+    # Not at import, main.py imports this module before it has to answer requests
+    import numpy as np
+
+    if os.path.exists(path):
         try:
-            with open(RINGS_SAVE_PATH, "r") as f:
+            with open(path, "r") as f:
                 content = f.read().strip()
                 if not content:
-                    raise ValueError("rings.json is empty")
+                    raise ValueError(f"{os.path.basename(path)} is empty")
                 data = json.loads(content)
                 rings = [np.array([
                     ring["cx"],
@@ -63,15 +163,15 @@ def load_rings():
                 ], dtype=np.float32) for ring in data]
                 return rings, True
         except (json.JSONDecodeError, ValueError) as e:
-            print("[WARN] Failed to load rings.json:", e)
+            print(f"[WARN] Failed to load {os.path.basename(path)}:", e)
             return [np.array([250, 250, 80, 1.0, 1.0], dtype=np.float32) for _ in range(6)], False
     else:
         return [np.array([250, 250, 80, 1.0, 1.0], dtype=np.float32) for _ in range(6)], False
 
 
-def load_lines():
-    if os.path.exists(LINES_SAVE_PATH):
-        with open(LINES_SAVE_PATH, "r") as f:
+def load_lines(path=LINES_SAVE_PATH):
+    if os.path.exists(path):
+        with open(path, "r") as f:
             lines_data = json.load(f)
             return (
                 lines_data.get("rotation", 0.0),
@@ -83,3 +183,19 @@ def load_lines():
             )
     else:
         return 0.0, 0, 0, 1.0, 1.0, 1.0
+
+
+def load_config():
+    """DEFAULT_CONFIG with config.json on top. A section in config.json only overrides the keys it has."""
+    config = {key: dict(value) if isinstance(value, dict) else value for key, value in DEFAULT_CONFIG.items()}
+    if os.path.exists(CONFIG_PATH):
+        try:
+            with open(CONFIG_PATH, "r") as f:
+                for key, value in json.load(f).items():
+                    if isinstance(value, dict) and isinstance(config.get(key), dict):
+                        config[key].update(value)
+                    else:
+                        config[key] = value
+        except (json.JSONDecodeError, ValueError) as e:
+            print("[WARN] Failed to load config.json:", e)
+    return config
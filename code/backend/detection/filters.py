@@ -0,0 +1,109 @@
+import math
+
+import cv2
+
+# Each stage is (kind, params). "mode" picks how the stage is computed:
+#   exact   - the original OpenCV call(s)
+#   single  - iterated Gaussians collapsed into one Gaussian with the combined sigma
+#   box     - box filter approximation (cv2.blur is O(1) per pixel in the kernel size)
+#   skip    - stage is left out
+REFERENCE_STAGES = [
+    ("gaussian", {"ksize": 5, "sigma": 0, "iterations": 1, "mode": "exact"}),
+    ("gaussian", {"ksize": 9, "sigma": 1, "iterations": 10, "mode": "exact"}),
+    ("bilateral", {"d": 9, "sigma_color": 75, "sigma_space": 75, "mode": "exact"}),
+]
+
+PRESETS = {
+    "reference": {},
+    "fast": {1: "single", 2: "box"},
+    "fastest": {0: "skip", 1: "box", 2: "skip"},
+}
+
+
+def _kernel_sigma(ksize, sigma):
+    # Same rule OpenCV uses when sigma <= 0
+    if sigma > 0:
+        return sigma
+    return 0.3 * ((ksize - 1) * 0.5 - 1) + 0.8
+
+
+def _odd(n):
+    n = max(1, int(math.ceil(n)))
+    return n if n % 2 == 1 else n + 1
+
+
+class FilterPipeline:
+    """
+    Smoothing chain applied to the background diff before thresholding. Built from a
+    stage list like REFERENCE_STAGES so single stages can be swapped for cheaper
+    equivalents without touching DartDetector.
+    """
+
+    def __init__(self, stages=None):
+        self.stages = [(kind, dict(params)) for kind, params in (stages or REFERENCE_STAGES)]
+        # One op(img, dst) per OpenCV call, a stage of n passes is n ops
+        self._ops = [op for kind, params in self.stages for op in self._build(kind, params)]
+
+    @classmethod
+    def preset(cls, name):
+        if name not in PRESETS:
+            raise ValueError(f"Unknown filter preset '{name}', expected one of {sorted(PRESETS)}")
+        stages = [(kind, dict(params)) for kind, params in REFERENCE_STAGES]
+        for index, mode in PRESETS[name].items():
+            stages[index][1]["mode"] = mode
+        return cls(stages)
+
+    def _build(self, kind, params):
+        mode = params.get("mode", "exact")
+        if mode == "skip":
+            return []
+        if kind == "gaussian":
+            return self._build_gaussian(params["ksize"], params.get("sigma", 0), params.get("iterations", 1), mode)
+        if kind == "bilateral":
+            return self._build_bilateral(params["d"], params["sigma_color"], params["sigma_space"], mode)
+        raise ValueError(f"Unknown filter stage '{kind}'")
+
+    @staticmethod
+    def _build_gaussian(ksize, sigma, iterations, mode):
+        if mode == "exact":
+            return [lambda img, dst: cv2.GaussianBlur(img, (ksize, ksize), sigma, dst=dst)] * iterations
+
+        # n Gaussian passes equal one Gaussian with sigma * sqrt(n)
+        total_sigma = _kernel_sigma(ksize, sigma) * math.sqrt(iterations)
+        if mode == "single":
+            size = _odd(6 * total_sigma)
+            return [lambda img, dst: cv2.GaussianBlur(img, (size, size), total_sigma, dst=dst)]
+        if mode == "box":
+            # Three box passes of width w have variance 3 * (w^2 - 1) / 12
+            size = _odd(math.sqrt(4 * total_sigma ** 2 + 1))
+            return [lambda img, dst: cv2.blur(img, (size, size), dst=dst)] * 3
+        raise ValueError(f"Unknown mode '{mode}' for gaussian stage")
+
+    @staticmethod
+    def _build_bilateral(d, sigma_color, sigma_space, mode):
+        if mode == "exact":
+            return [lambda img, dst: cv2.bilateralFilter(img, d, sigma_color, sigma_space, dst=dst)]
+        # With sigma_space well above d the spatial weights are flat, and on an already
+        # smoothed diff image the range weights rarely matter, so a plain d x d mean is close
+        if mode == "box":
+            return [lambda img, dst: cv2.blur(img, (d, d), dst=dst)]
+        if mode == "single":
+            return [lambda img, dst: cv2.GaussianBlur(img, (d, d), 0, dst=dst)]
+        raise ValueError(f"Unknown mode '{mode}' for bilateral stage")
+
+    def __call__(self, img, buffers=None):
+        """
+        img smoothed by every stage. With a buffers dict the passes alternate between its
+        "filter_0" and "filter_1" arrays, kept there for the next call, and the result is
+        one of them. Without, every pass allocates.
+        """
+        for i, op in enumerate(self._ops):
+            if buffers is None:
+                img = op(img, None)
+            else:
+                key = f"filter_{i % 2}"
+                img = buffers[key] = op(img, buffers.get(key))
+        return img
+
+    def describe(self):
+        return ", ".join(f"{kind}:{params.get('mode', 'exact')}" for kind, params in self.stages)
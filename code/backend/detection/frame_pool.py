@@ -0,0 +1,154 @@
+import weakref
+from threading import Lock
+
+import numpy as np
+
+# Every FramePool, so retain() can find the buffer behind a view
+_pools = weakref.WeakSet()
+
+# Frames a pipeline.Pipeline holds at once: one being decoded, the grabber's newest, one
+# in detection, two in the render queue, one being rendered and two on their way to a
+# recorder's writer
+PIPELINE_FRAMES = 8
+
+
+class FrameBuffer:
+    """
+    One preallocated frame of a FramePool. array is writable and only meant for the
+    producer (cap.read(buf.array)), frame is a read-only view of it for everyone else.
+    The buffer goes back to the pool when the last reference is released.
+    """
+
+    def __init__(self, pool, generation, array):
+        self.pool = pool
+        self.generation = generation
+        self.array = array
+        self.frame = array.view()
+        self.frame.flags.writeable = False
+        self.refs = 0
+
+    def retain(self):
+        self.pool._retain(self)
+        return self
+
+    def release(self):
+        self.pool._release(self)
+
+
+class FramePool:
+    """
+    Reference-counted frame buffers, allocated once per frame shape. acquire() hands out
+    a free buffer with one reference or None when all are in use, in which case the
+    caller falls back to allocating and the miss is counted. A new shape reallocates;
+    buffers of the old shape still in use are dropped once released.
+    """
+
+    def __init__(self, count=8):
+        self.count = count
+        self.shape = None
+        self.dtype = None
+        self.acquired = 0
+        self.exhausted = 0
+        self.allocations = 0
+        self._generation = 0
+        self._buffers = []
+        self._free = []
+        self._span = (0, 0, 1)
+        self._lock = Lock()
+        _pools.add(self)
+
+    def acquire(self, shape, dtype=np.uint8):
+        with self._lock:
+            if self.shape != tuple(shape) or self.dtype != np.dtype(dtype):
+                self._allocate(tuple(shape), np.dtype(dtype))
+            if not self._free:
+                self.exhausted += 1
+                return None
+            buf = self._free.pop()
+            buf.refs = 1
+            self.acquired += 1
+            return buf
+
+    def _allocate(self, shape, dtype):
+        self._drop_buffers()
+        self.shape = shape
+        self.dtype = dtype
+        self._generation += 1
+        self.allocations += 1
+        block = np.empty((self.count,) + shape, dtype=dtype)
+        self._buffers = [FrameBuffer(self, self._generation, block[i]) for i in range(self.count)]
+        self._free = list(self._buffers)
+        start = block.__array_interface__["data"][0]
+        self._span = (start, start + block.nbytes, max(1, block.nbytes // self.count))
+
+    def _drop_buffers(self):
+        self._buffers = []
+        self._free = []
+        self._span = (0, 0, 1)
+
+    def _find(self, address):
+        """Retained buffer containing address, or None."""
+        with self._lock:
+            start, end, step = self._span
+            if not start <= address < end:
+                return None
+            buf = self._buffers[(address - start) // step]
+            if buf.refs == 0:
+                return None
+            buf.refs += 1
+            return buf
+
+    def _retain(self, buf):
+        with self._lock:
+            buf.refs += 1
+
+    def _release(self, buf):
+        with self._lock:
+            buf.refs -= 1
+            if buf.refs == 0 and buf.generation == self._generation:
+                self._free.append(buf)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "count": self.count,
+                "free": len(self._free),
+                "acquired": self.acquired,
+                "exhausted": self.exhausted,
+                "allocations": self.allocations,
+            }
+
+    def close(self):
+        with self._lock:
+            self._drop_buffers()
+            self.shape = None
+            self.dtype = None
+
+
+def build_frame_pool(count, recorder=None):
+    """
+    FramePool for config["frame_pool"], or None for 0. A recorder.MotionRecorder pins its
+    last pre_frames frames on top of what the pipeline holds, so the pool grows to cover
+    both; smaller, it would run dry on every frame and only add overhead to allocating.
+    """
+    if not count:
+        return None
+    if recorder is not None:
+        count = max(count, recorder.pre_frames + PIPELINE_FRAMES)
+    return FramePool(count)
+
+
+def retain(frame):
+    """
+    The pooled FrameBuffer that frame is a view of, with one more reference, or None if
+    frame does not come from a FramePool. Lets consumers such as the recorder keep a
+    frame past the call that handed it to them without copying it.
+    """
+    if not isinstance(frame, np.ndarray) or frame.size == 0:
+        return None
+    address = frame.__array_interface__["data"][0]
+    for pool in list(_pools):
+        buf = pool._find(address)
+        if buf is not None:
+            return buf
+    return None
@@ -0,0 +1,201 @@
+import json
+import os
+import shutil
+import time
+from queue import Queue, Full, Empty
+from threading import Thread, Lock
+
+import cv2
+import numpy as np
+
+SOURCES = ("gray", "blurred")
+
+
+class ClipWriter:
+    """
+    Writes clips on one background thread, each into its own directory as 000000.png,
+    000001.png, ... plus timestamps.json, which replay.ReplaySource picks up. Keeps at
+    most max_clips directories, deleting the oldest. A full queue drops the clip.
+    frames is read on the writer thread, on_written() is called once it has been.
+    """
+
+    def __init__(self, base_dir="clips", max_clips=50, max_queue=4):
+        self.base_dir = base_dir
+        self.max_clips = max_clips
+        self.max_queue = max_queue
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._lock = Lock()
+        os.makedirs(base_dir, exist_ok=True)
+        self._queue = Queue(maxsize=max_queue)
+        self._thread = Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def submit(self, name, frames, timestamps, on_written=None):
+        """Returns the directory the clip will be written to, or None if it was dropped."""
+        path = os.path.join(self.base_dir, name)
+        try:
+            self._queue.put((path, frames, timestamps, on_written), block=False)
+        except Full:
+            with self._lock:
+                self.dropped += 1
+            return None
+        return path
+
+    def _worker(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except Empty:
+                continue
+            if item is None:
+                break
+            path, frames, timestamps, on_written = item
+            try:
+                os.makedirs(path, exist_ok=True)
+                for i, frame in enumerate(frames):
+                    cv2.imwrite(os.path.join(path, f"{i:06d}.png"), frame, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+                with open(os.path.join(path, "timestamps.json"), "w") as f:
+                    json.dump([float(t) for t in timestamps], f)
+                with self._lock:
+                    self.written += 1
+                self._enforce_retention()
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"[WARN] Failed to write clip {path}: {e}")
+            finally:
+                if on_written is not None:
+                    on_written()
+
+    def _enforce_retention(self):
+        clips = sorted(d for d in os.listdir(self.base_dir) if os.path.isdir(os.path.join(self.base_dir, d)))
+        for name in clips[:max(0, len(clips) - self.max_clips)]:
+            shutil.rmtree(os.path.join(self.base_dir, name), ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            return {"written": self.written, "dropped": self.dropped, "failed": self.failed,
+                    "queue_depth": self._queue.qsize()}
+
+    def close(self, timeout=5.0):
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+
+
+class FrameRing:
+    """
+    The last `capacity` single-channel frames DartDetector saw, in one preallocated
+    (capacity, h, w) array. push() copies into the next slot, so steady state allocates
+    nothing. The array is (re)allocated on the first frame and whenever the frame size
+    changes, e.g. a new roi, together with one spare per clip the writer can hold (its
+    queue plus the one it is writing). flush() hands the array itself to the ClipWriter
+    and goes on in a spare, which the writer gives back when the clip is written, so
+    back-to-back flushes neither block nor allocate. Only the thread calling push() may
+    call flush(), others use request_flush().
+
+    source picks what DartDetector pushes: "gray" is the full-resolution grayscale of the
+    roi, "blurred" the smaller smoothed image the motion detection works on.
+    """
+
+    def __init__(self, capacity=60, source="gray", writer=None):
+        if source not in SOURCES:
+            raise ValueError(f"Unknown frame source '{source}', expected one of {SOURCES}")
+        self.capacity = capacity
+        self.source = source
+        self.writer = writer
+        self.frames = None
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+        self._next = 0
+        self.clips = 0
+        self.dropped = 0
+        self._requested = None
+        # Arrays the writer is done with, flush() continues in one of them
+        self._spares = []
+        self.spares = 0 if writer is None else writer.max_queue + 1
+
+    def push(self, img, ts):
+        if self.frames is None or self.frames.shape[1:] != img.shape:
+            self.frames = np.empty((self.capacity,) + img.shape, dtype=img.dtype)
+            # np.empty only maps pages: a spare costs memory once a clip was recorded into it
+            self._spares = [np.empty_like(self.frames) for _ in range(self.spares)]
+            self.count = 0
+            self._next = 0
+        np.copyto(self.frames[self._next], img)
+        self.timestamps[self._next] = ts
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        if self._requested is not None:
+            reason, self._requested = self._requested, None
+            self.flush(reason)
+
+    def request_flush(self, reason="manual"):
+        """flush() from another thread: happens on the next push(), so no frame is copied mid-write."""
+        self._requested = reason
+
+    def __len__(self):
+        return self.count
+
+    def clip(self):
+        """(timestamps, frames) oldest first, as copies."""
+        if self.count == 0:
+            return self.timestamps[:0].copy(), None
+        order = (np.arange(self.count) + self._next - self.count) % self.capacity
+        return self.timestamps[order], self.frames[order]
+
+    def flush(self, reason="manual"):
+        """
+        Sends the buffered frames to the writer as a clip named <time>_<reason>. Returns the
+        clip directory, or None if the ring is empty, has no writer or the writer is busy.
+        Nothing is copied: the writer reads the frames from the ring's array on its thread
+        while pushes go to a spare, so the ring starts empty and clips never overlap.
+        """
+        if self.count == 0 or self.writer is None:
+            return None
+        ring = self.frames
+        spare = None
+        while spare is None and self._spares:
+            # Arrays written before a frame size change come back too, they are dropped here
+            spare = self._spares.pop()
+            if spare.shape != ring.shape:
+                spare = None
+        if spare is None:
+            # Every spare is with the writer, its queue is full
+            self.dropped += 1
+            return None
+        order = (np.arange(self.count) + self._next - self.count) % self.capacity
+        self.clips += 1
+        name = f"{time.strftime('%Y%m%d_%H%M%S')}_{self.clips:04d}_{reason}"
+        path = self.writer.submit(name, (ring[i] for i in order), self.timestamps[order],
+                                  on_written=lambda: self._spares.append(ring))
+        if path is None:
+            self._spares.append(spare)
+            return None
+        self.frames = spare
+        self.count = 0
+        self._next = 0
+        return path
+
+    def stats(self):
+        stats = {"capacity": self.capacity, "buffered": self.count, "source": self.source,
+                 "bytes": 0 if self.frames is None else self.frames.nbytes, "spares": len(self._spares),
+                 "dropped": self.dropped}
+        if self.writer is not None:
+            stats["writer"] = self.writer.stats()
+        return stats
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def build_frame_ring(config):
+    """FrameRing from the 'clips' section of config.json, or None if it is off or frames is 0."""
+    capacity = config.get("frames", 0)
+    if not config.get("enabled", False) or not capacity:
+        return None
+    writer = ClipWriter(config.get("dir", "clips"), max_clips=config.get("max_clips", 50),
+                        max_queue=config.get("queue", 2))
+    return FrameRing(capacity, source=config.get("source", "gray"), writer=writer)
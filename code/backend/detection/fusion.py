@@ -0,0 +1,214 @@
+import math
+
+import numpy as np
+
+NUM_SECTORS = 20
+
+# Radii of the ring edges on a regulation board in mm, in ring_data order: outer and
+# inner edge of the double, outer and inner edge of the triple, outer bull, bull
+BOARD_RADII_MM = (170.0, 162.0, 107.0, 99.0, 15.9, 6.35)
+
+
+class CameraGeometry:
+    """
+    Maps pixels of one camera to board coordinates: (r, angle) with r in mm from the
+    bull and angle in degrees from the start of sector 0, using that camera's ring
+    ellipses and sector lines. Between two ellipses r is interpolated between their
+    BOARD_RADII_MM, so score_board(*to_board(x, y)) is the field classifier.classify_field
+    gives for (x, y) under the same calibration, and tips from different cameras can be
+    averaged.
+    """
+
+    def __init__(self, ring_data, sector_config):
+        rings = np.asarray(ring_data, dtype=np.float64)
+        if len(rings) != len(BOARD_RADII_MM):
+            raise ValueError(f"Expected {len(BOARD_RADII_MM)} rings, got {len(rings)}")
+        self.centers = rings[:, :2]
+        self.axes = np.stack([rings[:, 2] * rings[:, 3], rings[:, 2] * rings[:, 4]], axis=1)
+        self.ring_data = ring_data
+        self.sector_config = tuple(float(v) for v in sector_config)
+
+    def _ellipse_distances(self, x, y):
+        """Per ring, 1.0 on the ellipse, < 1 inside it."""
+        n = (np.array([x, y], dtype=np.float64) - self.centers) / self.axes
+        return np.sqrt((n * n).sum(axis=1))
+
+    def to_board(self, x, y):
+        d = self._ellipse_distances(x, y)
+        radii = BOARD_RADII_MM
+
+        if d[0] > 1:
+            r = radii[0] * d[0]
+        else:
+            r = None
+            # Same search order as classifier.classify_ring
+            for i in range(len(radii) - 1):
+                if d[i] <= 1 < d[i + 1]:
+                    t = (d[i + 1] - 1) / ((d[i + 1] - 1) + (1 - d[i]))
+                    r = radii[i + 1] + t * (radii[i] - radii[i + 1])
+                    break
+            if r is None:
+                if d[-1] <= 1:
+                    r = radii[-1] * d[-1]
+                else:
+                    # Overlapping ellipses, classify_ring calls this a miss
+                    r = math.nextafter(radii[0], math.inf)
+        return float(r), self.angle(x, y)
+
+    def angle(self, x, y):
+        rotation_deg, offset_x, offset_y, scale, stretch_x, stretch_y = self.sector_config
+        cx, cy, _, ring_sx, ring_sy = (float(v) for v in self.ring_data[0])
+        dx = (x - (cx + offset_x)) / (ring_sx * scale * stretch_x)
+        dy = (y - (cy + offset_y)) / (ring_sy * scale * stretch_y)
+        raw_angle = math.degrees(math.atan2(dy, dx)) % 360
+        return (raw_angle - rotation_deg + 360) % 360
+
+    def to_relative(self, r, angle):
+        """Board coordinates as classifier.get_relative_coords would report them for this camera."""
+        raw = math.radians(angle + self.sector_config[0])
+        length = r / BOARD_RADII_MM[0] * float(self.ring_data[0][2])
+        return length * math.cos(raw), length * math.sin(raw)
+
+
+# classifier.classify_ring results from the outside in, indexed by board_ring_slot()
+RING_IDS = ([0], [0, 1], [1, 2], [2, 3], [3, 4], [4, 5], [5])
+
+_fields = None
+
+
+def board_ring_slot(r):
+    """Index into RING_IDS for a radius in mm."""
+    radii = BOARD_RADII_MM
+    if r > radii[0]:
+        return 0
+    for i in range(len(radii) - 1):
+        if radii[i + 1] < r <= radii[i]:
+            return i + 1
+    return len(radii)
+
+
+def board_ring_ids(r):
+    """classifier.classify_ring for a radius in mm."""
+    return list(RING_IDS[board_ring_slot(r)])
+
+
+def score_board(r, angle):
+    """
+    classifier.classify_field for board coordinates. A fixed polar lookup: the field
+    strings per ring slot and sector are built once, scoring is a radius comparison,
+    one division and two indexes.
+    """
+    global _fields
+    if _fields is None:
+        from classifier import classify_field
+
+        _fields = [[classify_field(list(ring_ids), sector_id) for sector_id in range(NUM_SECTORS)]
+                   for ring_ids in RING_IDS]
+    sector_id = int(angle // (360 / NUM_SECTORS)) % NUM_SECTORS
+    return _fields[board_ring_slot(r)][sector_id]
+
+
+def to_cartesian(r, angle):
+    a = math.radians(angle)
+    return r * math.cos(a), r * math.sin(a)
+
+
+def to_polar(u, v):
+    return math.hypot(u, v), math.degrees(math.atan2(v, u)) % 360
+
+
+def fuse(estimates, max_spread=12.0):
+    """
+    estimates: [(r, angle, weight)] of one dart from different cameras. Drops estimates
+    further than max_spread mm from the median point and returns the weighted mean as
+    (r, angle, used) where used are the indices that were kept.
+    """
+    if not estimates:
+        raise ValueError("fuse() needs at least one estimate")
+    points = np.array([to_cartesian(r, a) for r, a, _ in estimates])
+    weights = np.array([w for _, _, w in estimates], dtype=np.float64)
+
+    median = np.median(points, axis=0)
+    used = np.flatnonzero(np.hypot(*(points - median).T) <= max_spread)
+    if len(used) == 0:
+        # Nothing agrees, trust the camera with the highest weight
+        used = np.array([int(np.argmax(weights))])
+
+    w = weights[used]
+    if w.sum() <= 0:
+        w = np.ones_like(w)
+    u, v = (points[used] * w[:, None]).sum(axis=0) / w.sum()
+    r, angle = to_polar(u, v)
+    return r, angle, [int(i) for i in used]
+
+
+class TipFuser:
+    """
+    Groups tips from different cameras into darts. A dart is complete once every camera
+    reported a tip or window seconds after the first one, whichever comes first. A
+    camera reporting twice within one window starts a new dart.
+
+    A tip from a camera that missed the last dart's window, up to late seconds after it
+    closed and within max_spread mm of where that dart was scored, is the same throw
+    arriving late. It is counted and dropped, not scored as a second dart.
+    """
+
+    def __init__(self, cameras, window=0.3, max_spread=12.0, late=None):
+        self.cameras = list(cameras)
+        self.window = window
+        self.max_spread = max_spread
+        self.late = window if late is None else late
+        self._pending = {}
+        self._started = None
+        # (started, (u, v) in mm, cameras that reported) of the last dart
+        self._last = None
+        self.fused = 0
+        self.rejected = 0
+        self.late_tips = 0
+
+    def _is_late(self, camera, ts, r, angle):
+        if self._last is None:
+            return False
+        started, point, reported = self._last
+        if camera in reported or ts - started > self.window + self.late:
+            return False
+        u, v = to_cartesian(r, angle)
+        return math.hypot(u - point[0], v - point[1]) <= self.max_spread
+
+    def add(self, camera, ts, r, angle, weight=1.0):
+        """Returns the darts completed by this tip, see poll()."""
+        if camera not in self._pending and self._is_late(camera, ts, r, angle):
+            self.late_tips += 1
+            return []
+        done = []
+        if camera in self._pending:
+            done.append(self._finish())
+        if self._started is None:
+            self._started = ts
+        self._pending[camera] = (r, angle, weight)
+        if len(self._pending) == len(self.cameras):
+            done.append(self._finish())
+        return done
+
+    def poll(self, now):
+        """Darts whose window ran out: [{"r", "angle", "field", "cameras", "estimates"}]"""
+        if self._started is not None and now - self._started >= self.window:
+            return [self._finish()]
+        return []
+
+    def _finish(self):
+        names = list(self._pending)
+        estimates = [self._pending[name] for name in names]
+        r, angle, used = fuse(estimates, self.max_spread)
+        self.fused += 1
+        self.rejected += len(estimates) - len(used)
+        self._last = (self._started, to_cartesian(r, angle), set(names))
+        self._pending = {}
+        self._started = None
+        return {
+            "r": r,
+            "angle": angle,
+            "field": score_board(r, angle),
+            "cameras": [names[i] for i in used],
+            "estimates": {name: {"r": e[0], "angle": e[1]} for name, e in zip(names, estimates)},
+        }
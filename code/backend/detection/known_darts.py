@@ -0,0 +1,69 @@
+import math
+
+
+class KnownDarts:
+    """
+    Tips of the darts already on the board, in full-frame pixels. Iterates, indexes and
+    counts like the list it replaces, and also files every tip in a uniform grid of
+    cell_size pixels so near() only looks at the cells around a point instead of at
+    every dart or at an image.
+
+    version changes with every change and generation only when darts are removed, so a
+    cache built from the tips can tell "some were added" (darts[built_count:] are new)
+    from "start over".
+    """
+
+    def __init__(self, points=(), cell_size=32):
+        self.cell_size = cell_size
+        self.version = 0
+        self.generation = 0
+        self._points = []
+        self._grid = {}
+        self.extend(points)
+
+    def _cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def append(self, point):
+        x, y = point
+        point = (x, y)
+        self._points.append(point)
+        self._grid.setdefault(self._cell(x, y), []).append(point)
+        self.version += 1
+
+    def extend(self, points):
+        for point in points:
+            self.append(point)
+
+    def clear(self):
+        if not self._points:
+            return
+        self._points = []
+        self._grid = {}
+        self.version += 1
+        self.generation += 1
+
+    def near(self, x, y, radius):
+        """The known tip closest to (x, y) within radius, or None."""
+        reach = int(math.ceil(radius / self.cell_size))
+        cx, cy = self._cell(x, y)
+        best, best_d = None, radius
+        for gx in range(cx - reach, cx + reach + 1):
+            for gy in range(cy - reach, cy + reach + 1):
+                for point in self._grid.get((gx, gy), ()):
+                    d = math.hypot(point[0] - x, point[1] - y)
+                    if d <= best_d:
+                        best, best_d = point, d
+        return best
+
+    def __iter__(self):
+        return iter(self._points)
+
+    def __len__(self):
+        return len(self._points)
+
+    def __getitem__(self, index):
+        return self._points[index]
+
+    def __repr__(self):
+        return f"KnownDarts({self._points!r})"
@@ -1,60 +1,129 @@
-import os
-from threading import Thread
-from time import sleep
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Thread, Lock
+from time import monotonic, perf_counter, sleep
 
-import cv2
-import numpy as np
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_socketio import SocketIO
 
-from classifier import classify_ring, classify_sector, classify_field, get_relative_coords
-from detector import DartDetector
-from draw_canvas import draw_ellipses, draw_sector_lines
-from file_handler import load_rings, load_lines, save_rings, save_lines
+from file_handler import save_rings, save_lines, load_config
+
+# Importing this module only sets up Flask, so the server accepts requests within a few
+# hundred ms. OpenCV, numpy and the detection modules are imported by the functions that
+# need them, the first time is on /start or /calibrate (see main()), off the request thread.
 
 hover_pos = None
 camera_focus = 540
 
-ring_data = load_rings()
-sector_config = load_lines()
-NUM_RINGS = len(ring_data)
-detector = DartDetector(debug=False)
+# Built on first use by get_detector()
+detector = None
+board_cache = None
+_detector_lock = Lock()
+# board_homography.BoardRectifier when the aruco section of config.json is enabled, and the
+# calibration_monitor.CalibrationMonitor that keeps its homography up to date
+rectifier = None
+monitor = None
 
 clicked_points = []
 canvas_size = None
 
 camera_active = False
+# perf_counter() when main() started and seconds from there to the first frame detection handed back
+startup = {"started": None, "first_frame": None}
 current_cap = None
+current_pipeline = None
 stop_camera_flag = False
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
 
 
+def get_detector():
+    """The DartDetector, built with its BoardCache on the first call"""
+    global detector, board_cache
+    with _detector_lock:
+        if detector is None:
+            from board_cache import BoardCache
+            from detector import DartDetector
+
+            board_cache = BoardCache(padding=80)
+            detector = DartDetector(debug=False)
+    return detector
+
+
+def _process_pipeline_running():
+    # process_pipeline is already imported whenever a pipeline runs
+    from process_pipeline import ProcessPipeline
+    return isinstance(current_pipeline, ProcessPipeline)
+
+
 def hover_callback(event, x, y, flags, param):
+    import cv2
+
     global hover_pos
     if event == cv2.EVENT_MOUSEMOVE:
         hover_pos = (x, y)
 
 
 def focus_callback(val):
+    import cv2
+
     global camera_focus, current_cap
     camera_focus = val
     if current_cap is not None:
         current_cap.set(cv2.CAP_PROP_FOCUS, val)
+    elif _process_pipeline_running():
+        current_pipeline.send("focus", val)
+
+
+def probe_cameras(max_cams=5, timeout=2.0, first=False):
+    """
+    Opens camera indices 0..max_cams-1 all at once instead of one after another, each
+    open can take a second or more. Returns [(index, cap)] of those open after timeout
+    seconds, sorted by index. A camera that opens later is released by its probe thread.
+    With first, returns as soon as the lowest index that opens is known.
+    """
+    import cv2
+
+    opened = {}
+    lock = Lock()
+    timed_out = False
 
-def select_camera(max_cams=5):
-    caps = []
-    for i in range(max_cams):
+    def probe(i):
         cap = cv2.VideoCapture(i)
-        if cap.isOpened():
-            caps.append((i, cap))
-        else:
-            cap.release()
+        with lock:
+            if cap.isOpened() and not timed_out:
+                opened[i] = cap
+                return
+        cap.release()
+
+    pool = ThreadPoolExecutor(max_workers=max_cams, thread_name_prefix="camera-probe")
+    futures = [pool.submit(probe, i) for i in range(max_cams)]
+    if first:
+        # Once an index opened, higher ones cannot win: stop waiting for them
+        deadline = monotonic() + timeout
+        for i, future in enumerate(futures):
+            wait([future], timeout=max(0.0, deadline - monotonic()))
+            if not future.done() or i in opened:
+                break
+    else:
+        wait(futures, timeout=timeout)
+    with lock:
+        timed_out = True
+        caps = sorted(opened.items())
+    # Stuck opens keep their thread until the driver gives up, nobody waits for them
+    pool.shutdown(wait=False)
+    return caps
+
+
+def select_camera(max_cams=5, timeout=2.0):
+    """(index, cap) of the camera picked in the preview windows, the cap still open, or (None, None)"""
+    import cv2
+
+    caps = probe_cameras(max_cams, timeout)
     if not caps:
         print("No cameras found.")
-        return None
+        return None, None
 
     print("Press the number key for the camera you want to use.")
     while True:
@@ -69,80 +138,93 @@ def select_camera(max_cams=5):
             break
 
     for i, cap in caps:
-        cap.release()
+        if i != cam_idx:
+            cap.release()
         cv2.destroyWindow(f"Camera {i}")
-    return cam_idx
+    return cam_idx, dict(caps)[cam_idx]
+
+
+def first_available_camera(max_cams=5, timeout=2.0):
+    """Headless replacement for select_camera: no preview windows, just the lowest index that opens"""
+    caps = probe_cameras(max_cams, timeout, first=True)
+    for _, cap in caps[1:]:
+        cap.release()
+    if caps:
+        return caps[0]
+    print("No cameras found.")
+    return None, None
+
+
+def board_homography():
+    """The BoardHomography of the markers, or None to score through rings.json/sectors.json"""
+    return rectifier.homography if rectifier is not None else None
+
+
+def board_calibration():
+    """(ring_data, sector_config) for the overlay and masks, from the markers when they were found"""
+    import calibration
+
+    homography = board_homography()
+    if homography is not None:
+        return homography.ring_data, homography.sector_config
+    snapshot = calibration.current()
+    return snapshot.ring_data, snapshot.sector_config
+
+
+def score_tip(x, y, frame_shape):
+    """(field, (rel_x, rel_y)) of a tip in frame pixels"""
+    import calibration
+    from classifier import get_relative_coords
+    from fusion import score_board
+    from score_table import score_point
+
+    homography = board_homography()
+    if homography is not None:
+        r, angle = homography.to_board(float(x), float(y))
+        return score_board(r, angle), homography.to_relative(r, angle)
+    # Tips are sub-pixel, the score table is per pixel
+    snapshot = calibration.current()
+    return (score_point(int(round(x)), int(round(y)), frame_shape, snapshot),
+            get_relative_coords(float(x), float(y), snapshot))
 
 
 def mouse_callback(event, x, y, flags, param):
+    import cv2
+    import calibration
+    from classifier import classify_ring, classify_sector, classify_field, get_relative_coords
+
     if event == cv2.EVENT_LBUTTONDOWN:
         clicked_points.append((x, y))
-        ring_ids = classify_ring(x, y)
-        sector_id = classify_sector(x, y)
-        field = classify_field(ring_ids, sector_id)
-        rel_x, rel_y = get_relative_coords(x, y)
+        if board_homography() is not None:
+            field, (rel_x, rel_y) = score_tip(x, y, None)
+        else:
+            snapshot = calibration.current()
+            field = classify_field(classify_ring(x, y, snapshot), classify_sector(x, y, snapshot))
+            rel_x, rel_y = get_relative_coords(x, y, snapshot)
         print(f"[Click] Point at ({x}, {y}) → {field}")
 
         data = {"score": field, "coords": {"x": float(rel_x), "y": float(rel_y)}}
         socketio.emit("dart_hit", data)
         print(f"[WS] Sent click data: {data}")
 
-def draw_virtual_canvas():
-    canvas = np.zeros((
-        canvas_size[1],
-        canvas_size[0],
-        3
-    ), dtype=np.uint8)
-
-    draw_ellipses(canvas, ring_data)
-
-    draw_sector_lines(
-        canvas,
-        ring_data[0],
-        sector_config[0],
-        sector_config[1],
-        sector_config[2],
-        sector_config[3],
-        sector_config[4],
-        sector_config[5]
-    )
-
-    return canvas
-
-def build_board_ignore_mask(frame_shape, ring_data, padding=20):
-    """
-    Returns a mask where True = IGNORE (outside the dartboard).
-    Everything outside the outermost ring + padding is masked out.
-    """
-    h, w = frame_shape[:2]
-    mask = np.ones((h, w), dtype=np.uint8)  # Start: ignore everything
-
-    if ring_data is None or len(ring_data) == 0:
-        return mask.astype(bool)
-
-    outer_ring = ring_data[0]  # ring_data[0] is the outermost ring
-    cx, cy = int(outer_ring[0]), int(outer_ring[1])
-    # Add padding to axes so the board edge itself isn't masked
-    ax = int(outer_ring[2] * outer_ring[3]) + padding
-    ay = int(outer_ring[2] * outer_ring[4]) + padding
-
-    cv2.ellipse(mask, (cx, cy), (ax, ay), 0, 0, 360, 0, -1)
-
-    return mask.astype(bool)
-
 @app.route("/")
 def index():
     return "Dart detection backend running"
 
 @app.post("/reset")
 def reset():
-    detector.bg_frame = None
+    if _process_pipeline_running():
+        current_pipeline.send("reset_background")
+    elif detector is not None:
+        detector.bg_frame = None
     clicked_points.clear()
     print("[DEBUG] Background reset")
     return "Background reset"
 
 @app.post("/calibrate")
 def calibrate():
+    import calibration
+
     try:
         # data = request.get_json(force=True)
         # rings = data.get("rings", [])
@@ -195,10 +277,13 @@ def calibrate():
         #     float(lines.get("stretchY", 1.0)),
         # )
 
+        # A running camera picks the new calibration up with its next frame, its score
+        # table is built here first instead of on the detection thread at the next dart
+        adopt_calibration(calibration.Calibration.load())
         print("[POST] Calibration saved")
-        sleep(3)
 
-        Thread(target=main, daemon=True).start()
+        if not camera_active:
+            start_detection_thread(request.args)
 
         return jsonify({"type": "saved", "msg": "Calibration saved"})
     except Exception as e:
@@ -206,6 +291,23 @@ def calibrate():
         return jsonify({"type": "error", "msg": f"Failed to save calibration: {e}"}), 500
 
 
+@app.post("/start")
+def start():
+    if camera_active:
+        return jsonify({"status": "already_running"})
+    start_detection_thread(request.args)
+    return jsonify({"status": "started"})
+
+
+def start_detection_thread(params):
+    """Starts main() on a daemon thread. ?camera=<index>&headless=1 override config.json"""
+    camera_index = params.get("camera", type=int)
+    headless = params.get("headless")
+    if headless is not None:
+        headless = headless.lower() in ("1", "true", "yes")
+    Thread(target=main, kwargs={"camera_index": camera_index, "headless": headless}, daemon=True).start()
+
+
 @app.get("/close_camera")
 def close_camera():
     global current_cap, stop_camera_flag, camera_active
@@ -226,6 +328,7 @@ def close_camera():
 
     # Close any OpenCV windows
     try:
+        import cv2
         cv2.destroyAllWindows()
     except:
         pass
@@ -233,11 +336,87 @@ def close_camera():
     return jsonify({"status": "camera_closed"})
 
 
+@app.get("/pipeline_stats")
+def pipeline_stats():
+    if current_pipeline is None:
+        return jsonify({"status": "no_camera_active"})
+    # The detection process sends its recorder and clips stats with the pipeline's
+    stats = current_pipeline.stats()
+    if not _process_pipeline_running() and detector is not None:
+        if detector.recorder is not None:
+            stats["recorder"] = detector.recorder.stats()
+        if detector.frame_ring is not None:
+            stats["clips"] = detector.frame_ring.stats()
+    if monitor is not None:
+        stats["markers"] = monitor.stats()
+    elif rectifier is not None and "markers" not in stats:
+        stats["markers"] = rectifier.stats()
+    stats["first_frame"] = startup["first_frame"]
+    return jsonify(stats)
+
+
+@app.get("/profile")
+def get_profile():
+    if _process_pipeline_running():
+        stages = current_pipeline.stats().get("stages")
+    elif detector is not None and detector.profiler is not None:
+        stages = detector.profiler.summary()
+    else:
+        stages = None
+    if stages is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, "stages": stages})
+
+
+@app.post("/profile")
+def set_profile():
+    """?enabled=1 turns per-stage timing of DartDetector.update on, ?enabled=0 off"""
+    from profiler import StageProfiler
+
+    enabled = request.args.get("enabled", "1").lower() in ("1", "true", "yes")
+    if _process_pipeline_running():
+        current_pipeline.send("profile", enabled)
+        return jsonify({"enabled": enabled})
+    detector = get_detector()
+    if enabled and detector.profiler is None:
+        detector.profiler = StageProfiler()
+    elif not enabled:
+        detector.profiler = None
+    return jsonify({"enabled": enabled})
+
+
+@app.post("/clip")
+def save_clip():
+    """Writes the last frames the detector saw to clips/, e.g. after a mis-scored dart"""
+    reason = request.args.get("reason", "manual")
+    if _process_pipeline_running():
+        current_pipeline.send("clip", reason)
+    elif detector is None or not detector.request_clip(reason):
+        return jsonify({"status": "clips_disabled"})
+    return jsonify({"status": "clip_requested"})
+
+
+def stats_emitter(pipeline, interval):
+    """Sends pipeline and, when profiling is on, per-stage timings to the frontend every interval seconds"""
+    while current_pipeline is pipeline and pipeline.running:
+        data = {"pipeline": pipeline.stats()}
+        # From the detection process they come with the pipeline stats
+        stages = data["pipeline"].pop("stages", None)
+        if stages is None and detector is not None and detector.profiler is not None:
+            stages = detector.profiler.summary()
+        if stages is not None:
+            data["stages"] = stages
+        socketio.emit("detector_stats", data)
+        socketio.sleep(interval)
+
+
 @app.get("/last_calibration")
 def get_last_calibration():
+    import calibration
+
     try:
-        rings, _ = load_rings()
-        lines = load_lines()
+        snapshot = calibration.current()
+        rings, lines = snapshot.ring_data, snapshot.sector_config
         return jsonify({
             "rings": [
                 {
@@ -261,16 +440,187 @@ def get_last_calibration():
         return jsonify({"error": f"Failed to load calibration {e}"}), 500
 
 
-def main():
-    Y_OFFSET = 0
-    global canvas_size, current_cap, camera_active, stop_camera_flag
+def get_detector_args(frame_shape):
+    if monitor is not None and monitor.changed():
+        # The camera moved, the background no longer lines up with the frame
+        detector.bg_frame = None
+    # Only ignore outside the board, and only process the board's bounding box
+    board = board_cache.get(*board_calibration(), frame_shape)
+    return {"ignore_mask": board.ignore_mask, "roi": board.roi}
+
+
+def handle_detection(frame, result):
+    """Runs on the detection thread, so dart_hit goes out without waiting for the preview"""
+    if startup["first_frame"] is None and startup["started"] is not None:
+        startup["first_frame"] = perf_counter() - startup["started"]
+        print(f"[Startup] First frame through detection {startup['first_frame'] * 1000:.0f} ms after start")
+    if monitor is not None:
+        monitor.offer(frame)
+    new_darts = result[0]
+    for (x, y) in new_darts:
+        score, (rel_x, rel_y) = score_tip(x, y, frame.shape)
+        data = {"score": score, "coords": {"x": float(rel_x), "y": float(rel_y)}}
+        socketio.emit("dart_hit", data)
+        print(f"[Auto] Sent: {data}")
+
+
+def report_drift(homography):
+    """CalibrationMonitor.on_change, runs on the monitor thread"""
+    print(f"[Markers] Board moved, new homography from {len(homography.corners)} markers, "
+          f"fit {homography.error:.2f} mm")
+
+
+def adopt_calibration(snapshot):
+    """CalibrationWatcher.on_change: the score table is rebuilt here, off the detection thread, before the swap"""
+    import calibration
+    from score_table import get_score_table
+
+    if canvas_size is not None:
+        get_score_table((canvas_size[1], canvas_size[0]), snapshot)
+    calibration.swap(snapshot)
+    print("[Calibration] Reloaded rings/sectors")
+
+
+def adopt_homography(homography):
+    """ProcessPipeline on_markers: the detection process saw the board move"""
+    report_drift(homography)
+    if rectifier is not None:
+        rectifier.homography = homography
+
+
+def render_view(raw_frame, result, view):
+    """view is the pipeline.View the detection thread handed over with result"""
+    import cv2
+    import numpy as np
+
+    new_darts, thresh_img, boxes, motion_level = result
+    vis_frame = raw_frame.copy()
+
+    board = board_cache.get(*board_calibration(), raw_frame.shape)
+    np.copyto(vis_frame, board.overlay, where=board.overlay_mask)
+
+    if hover_pos is not None:
+        hx, hy = hover_pos
+
+        if 0 <= hx < raw_frame.shape[1] and 0 <= hy < raw_frame.shape[0]:
+            field, _ = score_tip(hx, hy, raw_frame.shape)
+
+            print(f"[Hover] ({hx}, {hy}) -> {field}")
+
+            cv2.putText(
+                vis_frame,
+                f"Hover Score: {field}",
+                (10, 60),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.8,
+                (0, 255, 0),
+                2
+            )
+
+    cv2.putText(vis_frame, f"Motion Level: {motion_level:.0f}", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+
+    for (x, y, w, h) in boxes:
+        cv2.rectangle(vis_frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
+        cv2.putText(vis_frame, "Blob", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+
+    for (x, y) in clicked_points:
+        cv2.circle(vis_frame, (x, y), 3, (255, 0, 255), -1)
+
+    for (x, y) in view.known_darts:
+        cv2.circle(vis_frame, (int(x), int(y)), 3, (255, 0, 0), -1)
+
+    ignore_overlay = vis_frame.copy()
+    ignore_overlay[board.ignore_mask] = (0, 0, 60)
+    cv2.addWeighted(ignore_overlay, 0.4, vis_frame, 0.6, 0, vis_frame)
+    cv2.ellipse(vis_frame, board.ignore_center, board.ignore_axes, 0.0, 0.0, 360.0, (0, 0, 255), 2)
+
+    thresh_display = cv2.cvtColor(thresh_img, cv2.COLOR_GRAY2BGR) if thresh_img is not None else np.zeros_like(vis_frame)
+    thresh_display = cv2.resize(thresh_display, (vis_frame.shape[1], vis_frame.shape[0]))
+
+    debug_merged = vis_frame.copy()
+    for group in detector.get_groups():
+        cv2.drawContours(debug_merged, group, -1, (0, 255, 255), 2)
+
+    debug_tip = view.debug_tip
+    if debug_tip is None:
+        debug_tip = np.zeros_like(debug_merged)
+    else:
+        debug_tip = cv2.resize(debug_tip, (debug_merged.shape[1], debug_merged.shape[0]))
+    top_row = np.hstack((vis_frame, thresh_display))
+    bottom_row = np.hstack((debug_tip, debug_merged))
+
+    return np.vstack((top_row, bottom_row))
+
+
+def main(camera_index=None, headless=None):
+    """
+    Runs detection until /close_camera or 'q'. camera_index and headless fall back to
+    config.json. In headless mode no HighGUI window is created and nothing is drawn,
+    the loop only emits dart_hit events.
+    """
+    global canvas_size, current_cap, camera_active, stop_camera_flag, current_pipeline, rectifier, monitor
+
+    startup.update(started=perf_counter(), first_frame=None)
+    import cv2
+    import calibration
+    from background import make_background
+    from blobs import make_blob_finder
+    from board_homography import build_rectifier
+    from calibration import build_watcher
+    from calibration_monitor import build_monitor
+    from frame_pool import build_frame_pool
+    from frame_ring import build_frame_ring
+    from pipeline import Pipeline
+    from process_pipeline import ProcessPipeline
+    from profiler import StageProfiler
+    from recorder import build_recorder
+    from scheduler import build_scheduler
+    from score_table import prepare_score_table
+
+    config = load_config()
+    if camera_index is None:
+        camera_index = config["camera_index"]
+    if headless is None:
+        headless = bool(config["headless"])
 
     stop_camera_flag = False
-    cam_index = select_camera()
+    if len(config["cameras"]) > 1:
+        # Each camera process builds its own detector, this one would never see a frame
+        run_multicam(config)
+        return
+
+    detector = get_detector()
+    # In process mode the detection process builds these for its own detector
+    if not config["detector_process"]:
+        # Headless, nothing shows the thresh image or the tip debug image
+        detector.preview = not headless
+        if config["profile"] and detector.profiler is None:
+            detector.profiler = StageProfiler()
+        detector.tip_locator.direction = config["tip_direction"]
+        if detector.background.kind != config["background"]:
+            detector.background = make_background(config["background"])
+        detector.find_blobs = make_blob_finder(config["blob_finder"])
+        if detector.recorder is None:
+            detector.recorder = build_recorder(config["recording"])
+        if detector.frame_ring is None:
+            detector.frame_ring = build_frame_ring(config["clips"])
+        if detector.scheduler is None:
+            detector.scheduler = build_scheduler(config["scheduler"])
+
+    # The probe's capture stays open, a second open of the same camera costs as much again
+    cap = None
+    if camera_index is not None:
+        cam_index = camera_index
+    elif headless:
+        cam_index, cap = first_available_camera(timeout=config["camera_probe_timeout"])
+    else:
+        cam_index, cap = select_camera(timeout=config["camera_probe_timeout"])
     if cam_index is None:
         return
 
-    cap = cv2.VideoCapture(cam_index)
+    if cap is None:
+        cap = cv2.VideoCapture(cam_index)
     cap.set(cv2.CAP_PROP_AUTOFOCUS, 0)
 
     current_cap = cap
@@ -282,158 +632,153 @@ def main():
         camera_active = False
         return
 
-    global ring_data, sector_config
-    ring_data, _ = load_rings()
-    sector_config = load_lines()
-
-    for ring in ring_data:
-        ring[1] -= Y_OFFSET
-
-    new_sectors = []
-    for sector in sector_config:
-        if isinstance(sector, (tuple, list)) and len(sector) >= 4:
-            if len(sector) == 6:
-                x1, y1, x2, y2, sx, sy = sector
-                new_sectors.append((x1, y1 - Y_OFFSET, x2, y2 - Y_OFFSET, sx, sy))
-            elif len(sector) == 4:
-                x1, y1, x2, y2 = sector
-                new_sectors.append((x1, y1 - Y_OFFSET, x2, y2 - Y_OFFSET))
-            else:
-                new_sectors.append(sector)
-        else:
-            new_sectors.append(sector)
+    # Fresh from the files, they may have been edited while no camera was running
+    calibration.reload()
+    watcher = build_watcher(config["calibration_watch"], on_change=adopt_calibration)
 
-    sector_config = new_sectors
+    rectifier = build_rectifier(config["aruco"])
+    if rectifier is not None:
+        if rectifier.update(frame):
+            print(f"[Markers] Board homography from {len(rectifier.homography.corners)} markers, "
+                  f"fit {rectifier.homography.error:.2f} mm")
+        else:
+            print(f"[WARN] Board markers not found ({rectifier.last_found}), scoring with rings.json")
+    # In process mode the detection process watches the markers and sends new homographies back
+    if not config["detector_process"]:
+        monitor = build_monitor(rectifier, config["aruco"], on_change=report_drift)
 
     canvas_size = (frame.shape[1], frame.shape[0])
+    if board_homography() is None:
+        # ~0.3 s at 1080p, next to the first frames instead of before them. Darts scored
+        # before it is done go through the classifier, see score_table.score_point
+        prepare_score_table(frame.shape)
+
+    if config["detector_process"]:
+        # The detection process opens the camera itself
+        cap.release()
+        current_cap = cap = None
+
+    def make_pipeline(render):
+        if config["detector_process"]:
+            return ProcessPipeline(cam_index, config, handle_detection, render=render, on_markers=adopt_homography)
+        pool = build_frame_pool(config["frame_pool"], detector.recorder)
+        return Pipeline(cap, detector, handle_detection, get_update_args=get_detector_args, render=render, pool=pool)
+
+    def set_motion_thresh(val):
+        detector.motion_thresh = val
+        if isinstance(current_pipeline, ProcessPipeline):
+            current_pipeline.send("set", "motion_thresh", val)
+
+    if headless:
+        print("Running headless. Throw darts and watch for results...")
+        pipeline = make_pipeline(render=False)
+        if monitor is not None:
+            monitor.start()
+        if watcher is not None:
+            watcher.start()
+        current_pipeline = pipeline.start()
+        socketio.start_background_task(stats_emitter, pipeline, config["stats_interval"])
+        while not stop_camera_flag and pipeline.running:
+            sleep(0.1)
+        pipeline.stop()
+        if monitor is not None:
+            monitor.stop()
+        if watcher is not None:
+            watcher.stop()
+        current_pipeline = None
+        if cap is not None:
+            cap.release()
+        current_cap = None
+        camera_active = False
+        return
+
     print("Press 'q' to quit. Throw darts and watch for results...")
 
     cv2.namedWindow("Dartboard View")
     #cv2.setMouseCallback("Dartboard View", mouse_callback)
     cv2.setMouseCallback("Dartboard View", mouse_callback)
     cv2.createTrackbar("Threshold", "Dartboard View", detector.motion_thresh, 100,
-                       lambda val: setattr(detector, "motion_thresh", val))
+                       set_motion_thresh)
     cv2.createTrackbar("Focus", "Dartboard View", camera_focus, 2056, focus_callback)
-    while not stop_camera_flag:
-        ret, raw_frame = cap.read()
-        if not ret:
-            break
-
-        proc_frame = raw_frame.copy()
-        vis_frame = raw_frame.copy()
-
-        virtual_canvas = draw_virtual_canvas()
-        # Build board ignore mask FIRST
-        outer = ring_data[0]
-        board_ignore_mask = np.ones(raw_frame.shape[:2], dtype=np.uint8)
-        cx, cy = int(outer[0]), int(outer[1])
-        ax = int(outer[2] * outer[3]) + 80
-        ay = int(outer[2] * outer[4]) + 80
-        cv2.ellipse(board_ignore_mask, (cx, cy), (ax, ay), 0.0, 0.0, 360.0, (0,), -1)
-
-        # Canvas mask for vis only — not used in ignore anymore
-        canvas_mask = np.any(virtual_canvas != 0, axis=2).astype(np.uint8)
-
-        # Only ignore outside the board
-        combined_ignore = board_ignore_mask.astype(bool)
-
-        mask = virtual_canvas[:, :, 1] > 0
-        vis_frame[mask] = virtual_canvas[mask]
-
-        if hover_pos is not None:
-            hx, hy = hover_pos
-
-            if 0 <= hx < frame.shape[1] and 0 <= hy < frame.shape[0]:
-                ring_ids = classify_ring(hx, hy)
-                sector_id = classify_sector(hx, hy)
-                field = classify_field(ring_ids, sector_id)
-
-                print(f"[Hover] ({hx}, {hy}) -> {field}")
-
-                cv2.putText(
-                    vis_frame,
-                    f"Hover Score: {field}",
-                    (10, 60),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.8,
-                    (0, 255, 0),
-                    2
-                )
-
-        new_darts, thresh_img, boxes, motion_level = detector.update(proc_frame, ignore_mask=combined_ignore)
-
-        cv2.putText(vis_frame, f"Motion Level: {motion_level:.0f}", (10, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-
-        for (x, y, w, h) in boxes:
-            cv2.rectangle(vis_frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
-            cv2.putText(vis_frame, "Blob", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
-
-        for (x, y) in clicked_points:
-            cv2.circle(vis_frame, (x, y), 3, (255, 0, 255), -1)
-
-        for (x, y) in new_darts:
-            ring_ids = classify_ring(int(x), int(y))
-            sector_id = classify_sector(int(x), int(y))
-            score = classify_field(ring_ids, sector_id)
-            rel_x, rel_y = get_relative_coords(int(x), int(y))
-            data = {"score": score, "coords": {"x": float(rel_x), "y": float(rel_y)}}
-            socketio.emit("dart_hit", data)
-            print(f"[Auto] Sent: {data}")
-
-        for (x, y) in detector.known_darts:
-            cv2.circle(vis_frame, (int(x), int(y)), 3, (255, 0, 0), -1)
-
-        ignore_overlay = vis_frame.copy()
-        ignore_overlay[board_ignore_mask.astype(bool)] = (0, 0, 60)
-        cv2.addWeighted(ignore_overlay, 0.4, vis_frame, 0.6, 0, vis_frame)
-        cv2.ellipse(vis_frame, (cx, cy), (ax, ay), 0.0, 0.0, 360.0, (0, 0, 255), 2)
-
-        thresh_display = cv2.cvtColor(thresh_img, cv2.COLOR_GRAY2BGR) if thresh_img is not None else np.zeros_like(vis_frame)
-        thresh_display = cv2.resize(thresh_display, (vis_frame.shape[1], vis_frame.shape[0]))
-
-        debug_merged = vis_frame.copy()
-        for group in detector.get_groups():
-            cv2.drawContours(debug_merged, group, -1, (0, 255, 255), 2)
-
-        if os.path.exists("last_detected_dart.png"):
-            debug_tip = cv2.imread("last_detected_dart.png", cv2.IMREAD_COLOR)
-            if debug_tip is None:
-                debug_tip = np.zeros_like(debug_merged)
-            else:
-                debug_tip = cv2.resize(
-                    debug_tip,
-                    (debug_merged.shape[1], debug_merged.shape[0])
-                )
-        else:
-            debug_tip = np.zeros_like(debug_merged)
-
-        debug_tip = cv2.resize(debug_tip, (debug_merged.shape[1],
-                                           debug_merged.shape[0])) if debug_tip is not None else np.zeros_like(
-            debug_merged)
-        top_row = np.hstack((vis_frame, thresh_display))
-        bottom_row = np.hstack((debug_tip, debug_merged))
-
-        combined_view = np.vstack((top_row, bottom_row))
-
-        cv2.imshow("Dartboard View", combined_view)
-
-        key = cv2.waitKey(30)
+    pipeline = make_pipeline(render=True)
+    if monitor is not None:
+        monitor.start()
+    if watcher is not None:
+        watcher.start()
+    current_pipeline = pipeline.start()
+    socketio.start_background_task(stats_emitter, pipeline, config["stats_interval"])
+
+    while not stop_camera_flag and pipeline.running:
+        item = pipeline.next_render()
+        if item is not None:
+            _, raw_frame, result, view = item
+            cv2.imshow("Dartboard View", render_view(raw_frame, result, view))
+
+        key = cv2.waitKey(1)
         if key == ord('r'):
             detector.bg_frame = None
+            if isinstance(pipeline, ProcessPipeline):
+                pipeline.send("reset_background")
             clicked_points.clear()
             print("[DEBUG] Background reset")
         elif key == ord('q'):
             break
 
-    cap.release()
+    pipeline.stop()
+    if monitor is not None:
+        monitor.stop()
+    if watcher is not None:
+        watcher.stop()
+    current_pipeline = None
+    if cap is not None:
+        cap.release()
     current_cap = None
     camera_active = False
     cv2.destroyAllWindows()
-    if os.path.exists("last_detected_dart.png"):
-        os.remove("last_detected_dart.png")
+
+def run_multicam(config):
+    """Headless detection with one process per configured camera, see multicam.MultiCameraPipeline"""
+    global camera_active, current_pipeline
+
+    from board_homography import relative_coords
+    from calibration import Calibration
+    from fusion import CameraGeometry
+    from multicam import MultiCameraPipeline
+
+    # dart_hit coords are reported in the first camera's relative coordinates
+    first = config["cameras"][0]
+    if first.get("aruco", {}).get("enabled", False):
+        to_relative = relative_coords
+    else:
+        snapshot = Calibration.load(first["name"])
+        to_relative = CameraGeometry(snapshot.ring_data, snapshot.sector_config).to_relative
+
+    def on_hit(hit):
+        rel_x, rel_y = to_relative(hit["r"], hit["angle"])
+        data = {"score": hit["field"], "coords": {"x": float(rel_x), "y": float(rel_y)},
+                "cameras": hit["cameras"]}
+        socketio.emit("dart_hit", data)
+        print(f"[MultiCam] Sent: {data}")
+
+    fusion = config["fusion"]
+    pipeline = MultiCameraPipeline(config["cameras"], on_hit, window=fusion.get("window", 0.3),
+                                   max_spread=fusion.get("max_spread_mm", 12.0), late=fusion.get("late"))
+    print(f"Running {len(config['cameras'])} cameras headless. Throw darts and watch for results...")
+    camera_active = True
+    current_pipeline = pipeline.start()
+    socketio.start_background_task(stats_emitter, pipeline, config["stats_interval"])
+    while not stop_camera_flag and pipeline.running:
+        sleep(0.1)
+    pipeline.stop()
+    current_pipeline = None
+    camera_active = False
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Dart detection backend")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
     #main()
-    socketio.run(app, host="0.0.0.0", port=5000, allow_unsafe_werkzeug=True)
+    socketio.run(app, host="0.0.0.0", port=args.port, allow_unsafe_werkzeug=True)
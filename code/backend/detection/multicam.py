@@ -0,0 +1,204 @@
+import multiprocessing as mp
+import time
+from queue import Empty
+from threading import Thread, Lock
+
+from fusion import CameraGeometry, TipFuser
+
+# Seconds between the stats each camera process sends back
+STATS_INTERVAL = 2.0
+
+
+def camera_worker(camera, results, stop):
+    """
+    Body of one camera process: its own capture, DartDetector and calibration. Sends
+    ("tip", name, ts, (x, y), r, angle) for every dart, ("stats", name, dict) every
+    STATS_INTERVAL seconds, and ("exit", name, reason) when it stops.
+    """
+    import cv2
+    from board_cache import BoardCache
+    from board_homography import build_rectifier
+    from calibration import Calibration, build_watcher
+    from calibration_monitor import build_monitor
+    from detector import DartDetector
+    from file_handler import calibration_paths
+    from frame_pool import FramePool
+    from pipeline import Pipeline
+    from scheduler import build_scheduler
+
+    name = camera["name"]
+    cap = cv2.VideoCapture(camera["source"])
+    if not cap.isOpened():
+        results.put(("exit", name, f"could not open {camera['source']}"))
+        return
+    cap.set(cv2.CAP_PROP_AUTOFOCUS, 0)
+
+    # The camera's view of the board markers, else its rings/sectors files
+    rectifier = build_rectifier(camera.get("aruco", {}))
+    if rectifier is not None:
+        ret, frame = cap.read()
+        if ret:
+            rectifier.update(frame)
+    monitor = watcher = None
+    # (Calibration, CameraGeometry) from the files, swapped as a whole when they change
+    calibrated = None
+    if rectifier is not None and rectifier.homography is not None:
+        monitor = build_monitor(rectifier, camera["aruco"])
+    else:
+        snapshot = Calibration.load(name)
+        if not snapshot.loaded:
+            cap.release()
+            reason = "board markers not found and " if rectifier is not None else ""
+            results.put(("exit", name, f"{reason}no calibration in {calibration_paths(name)[0]}"))
+            return
+        calibrated = (snapshot, CameraGeometry(snapshot.ring_data, snapshot.sector_config))
+
+        def adopt(snapshot):
+            nonlocal calibrated
+            calibrated = (snapshot, CameraGeometry(snapshot.ring_data, snapshot.sector_config))
+
+        watcher = build_watcher(camera.get("calibration_watch", 1.0), camera=name, on_change=adopt)
+
+    detector = DartDetector(filter_pipeline=camera.get("filter", "reference"),
+                            pyramid_levels=camera.get("pyramid_levels", 0),
+                            background=camera.get("background", "snapshot"),
+                            tip_direction=camera.get("tip_direction", "left"),
+                            scheduler=build_scheduler(camera.get("scheduler", {})), preview=False,
+                            blob_finder=camera.get("blob_finder", "contours"))
+    board_cache = BoardCache(padding=80)
+
+    def get_update_args(frame_shape):
+        if calibrated is None:
+            if monitor is not None and monitor.changed():
+                detector.bg_frame = None
+            homography = rectifier.homography
+            board = board_cache.get(homography.ring_data, homography.sector_config, frame_shape)
+        else:
+            snapshot = calibrated[0]
+            board = board_cache.get(snapshot.ring_data, snapshot.sector_config, frame_shape)
+        return {"ignore_mask": board.ignore_mask, "roi": board.roi}
+
+    def on_result(frame, result):
+        if monitor is not None:
+            monitor.offer(frame)
+        # The homography the monitor last swapped in, or the rings
+        board_geometry = rectifier.homography if calibrated is None else calibrated[1]
+        for (x, y) in result[0]:
+            r, angle = board_geometry.to_board(float(x), float(y))
+            results.put(("tip", name, detector.clock(), (float(x), float(y)), r, angle))
+
+    if monitor is not None:
+        monitor.start()
+    if watcher is not None:
+        watcher.start()
+    pipeline = Pipeline(cap, detector, on_result, get_update_args=get_update_args, render=False,
+                        pool=FramePool()).start()
+    try:
+        while not stop.is_set() and pipeline.running:
+            stop.wait(STATS_INTERVAL)
+            stats = pipeline.stats()
+            if monitor is not None:
+                stats["markers"] = monitor.stats()
+            results.put(("stats", name, stats))
+    finally:
+        pipeline.stop()
+        if monitor is not None:
+            monitor.stop()
+        if watcher is not None:
+            watcher.stop()
+        cap.release()
+        detector.cleanup()
+        results.put(("exit", name, "stopped"))
+
+
+class MultiCameraPipeline:
+    """
+    One process per camera running capture and detection, so cameras scale across cores
+    instead of sharing one GIL. Only tips travel back. A collector thread here groups
+    them per dart with a TipFuser and calls on_hit(hit) with the fused, scored result,
+    see TipFuser._finish for its fields.
+
+    cameras: [{"name", "source", "weight", "filter", "pyramid_levels", "background", "blob_finder",
+    "scheduler", "tip_direction", "aruco", "calibration_watch"}] where source is a camera index or a
+    video path/URL and name selects rings_<name>.json/sectors_<name>.json (reloaded when they change),
+    unless the camera's aruco section finds the board markers.
+    """
+
+    def __init__(self, cameras, on_hit, window=0.3, max_spread=12.0, late=None):
+        names = [c["name"] for c in cameras]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Camera names must be unique, got {names}")
+        self.cameras = cameras
+        self.weights = {c["name"]: float(c.get("weight", 1.0)) for c in cameras}
+        self.on_hit = on_hit
+        self.fuser = TipFuser(names, window=window, max_spread=max_spread, late=late)
+
+        # spawn, not fork: the parent runs Flask and capture threads
+        self._ctx = mp.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._stop = self._ctx.Event()
+        self._processes = {}
+        self._collector = None
+        self._lock = Lock()
+        self._camera_stats = {name: {"alive": False, "tips": 0, "pipeline": None, "exit": None} for name in names}
+
+    def start(self):
+        for camera in self.cameras:
+            p = self._ctx.Process(target=camera_worker, args=(camera, self._results, self._stop),
+                                  name=f"camera-{camera['name']}", daemon=True)
+            p.start()
+            self._processes[camera["name"]] = p
+            self._camera_stats[camera["name"]]["alive"] = True
+        self._collector = Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        return self
+
+    def _collect(self):
+        while not self._stop.is_set() or any(p.is_alive() for p in self._processes.values()):
+            try:
+                msg = self._results.get(timeout=0.05)
+            except Empty:
+                msg = None
+
+            hits = []
+            if msg is not None:
+                kind, name = msg[0], msg[1]
+                with self._lock:
+                    stats = self._camera_stats[name]
+                    if kind == "tip":
+                        stats["tips"] += 1
+                    elif kind == "stats":
+                        stats["pipeline"] = msg[2]
+                    elif kind == "exit":
+                        stats["alive"] = False
+                        stats["exit"] = msg[2]
+                        print(f"[MultiCam] Camera {name} exited: {msg[2]}")
+                if kind == "tip":
+                    _, _, ts, _, r, angle = msg
+                    hits.extend(self.fuser.add(name, ts, r, angle, self.weights[name]))
+            hits.extend(self.fuser.poll(time.time()))
+
+            for hit in hits:
+                try:
+                    self.on_hit(hit)
+                except Exception as e:
+                    print(f"[MultiCam] on_hit failed: {e}")
+
+    @property
+    def running(self):
+        return not self._stop.is_set() and any(p.is_alive() for p in self._processes.values())
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        for p in self._processes.values():
+            p.join(timeout=timeout)
+            if p.is_alive():
+                p.terminate()
+        if self._collector is not None:
+            self._collector.join(timeout=timeout)
+
+    def stats(self):
+        with self._lock:
+            cameras = {name: dict(s) for name, s in self._camera_stats.items()}
+        return {"cameras": cameras, "fused": self.fuser.fused, "rejected": self.fuser.rejected,
+                "late": self.fuser.late_tips}
@@ -0,0 +1,329 @@
+import time
+import traceback
+from collections import deque, namedtuple
+from queue import Queue, Empty, Full
+from threading import Thread, Condition, Lock
+
+# What the render stage draws besides the frame and result, as the detection thread left it:
+# known_darts a tuple of (x, y), debug_tip the detector's tip image or None
+View = namedtuple("View", "known_darts debug_tip")
+
+
+class StageStats:
+    """Rolling frames-per-second counter for one pipeline stage."""
+
+    def __init__(self, name, window=2.0):
+        self.name = name
+        self.window = window
+        self.frames = 0
+        self.dropped = 0
+        self.errors = 0
+        self._stamps = deque()
+        self._lock = Lock()
+
+    def tick(self):
+        now = time.perf_counter()
+        with self._lock:
+            self.frames += 1
+            self._stamps.append(now)
+            while self._stamps and now - self._stamps[0] > self.window:
+                self._stamps.popleft()
+
+    def fps(self):
+        with self._lock:
+            if len(self._stamps) < 2:
+                return 0.0
+            span = self._stamps[-1] - self._stamps[0]
+            return (len(self._stamps) - 1) / span if span > 0 else 0.0
+
+    def snapshot(self, queue_depth=0):
+        return {
+            "fps": round(self.fps(), 1),
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "queue_depth": queue_depth,
+        }
+
+
+class LatestQueue:
+    """
+    Bounded queue that drops the oldest item instead of blocking the producer.
+    on_drop(item) is called for every dropped item, e.g. to release its frame buffer.
+    """
+
+    def __init__(self, maxsize=2, stats=None, on_drop=None):
+        self.queue = Queue(maxsize=maxsize)
+        self.stats = stats
+        self.on_drop = on_drop
+
+    def put(self, item):
+        while True:
+            try:
+                self.queue.put(item, block=False)
+                return
+            except Full:
+                try:
+                    dropped = self.queue.get(block=False)
+                    if self.stats is not None:
+                        self.stats.dropped += 1
+                    if self.on_drop is not None:
+                        self.on_drop(dropped)
+                except Empty:
+                    pass
+
+    def get(self, timeout=None):
+        return self.queue.get(timeout=timeout)
+
+    def qsize(self):
+        return self.queue.qsize()
+
+
+class FrameGrabber:
+    """
+    Reads the camera on its own thread and keeps only the newest frame, so a slow
+    consumer never works on a stale image and cap.read() never waits on the consumer.
+
+    With a frame_pool.FramePool the camera decodes straight into pooled buffers and
+    consumers get read-only views, otherwise every cap.read() allocates a new frame.
+    """
+
+    def __init__(self, cap, pool=None):
+        self.cap = cap
+        self.pool = pool
+        self.stats = StageStats("capture")
+        self.frame_id = 0
+        self._frame = None
+        self._buffer = None
+        self._shape = None
+        self._cond = Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = Thread(target=self._worker, daemon=True)
+        self._thread.start()
+        return self
+
+    def _grab(self):
+        buf = None
+        if self.pool is not None and self._shape is not None:
+            buf = self.pool.acquire(self._shape)
+        if buf is None:
+            return self.cap.read() + (None,)
+
+        ret, frame = self.cap.read(buf.array)
+        if not ret or frame is not buf.array:
+            # Failed or the camera changed resolution and OpenCV allocated a new image
+            buf.release()
+            return ret, frame, None
+        return ret, buf.frame, buf
+
+    def _worker(self):
+        while self._running:
+            ret, frame, buf = self._grab()
+            if not ret:
+                break
+            self._shape = frame.shape
+            with self._cond:
+                if self._frame is not None:
+                    # Previous frame was never picked up
+                    self.stats.dropped += 1
+                    if self._buffer is not None:
+                        self._buffer.release()
+                self._frame = frame
+                self._buffer = buf
+                self.frame_id += 1
+                self._cond.notify_all()
+            self.stats.tick()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def read(self, timeout=1.0):
+        """
+        Wait for a frame newer than the last one read. Returns (frame_id, frame, buffer)
+        or (None, None, None). buffer is the pooled FrameBuffer behind frame or None; its
+        reference now belongs to the caller, who must release() it.
+        """
+        with self._cond:
+            if self._frame is None and self._running:
+                self._cond.wait(timeout)
+            frame, self._frame = self._frame, None
+            buf, self._buffer = self._buffer, None
+            return (self.frame_id, frame, buf) if frame is not None else (None, None, None)
+
+    def queue_depth(self):
+        return 0 if self._frame is None else 1
+
+    @property
+    def running(self):
+        return self._running
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        with self._cond:
+            if self._buffer is not None:
+                self._buffer.release()
+            self._frame = self._buffer = None
+
+
+class DetectionWorker:
+    """
+    Pulls the newest frame from a FrameGrabber, runs the detector on it and hands
+    the results to on_result straight away. get_update_args(frame_shape) returns extra
+    keyword arguments for DartDetector.update. If a render queue is given, every
+    processed frame is also pushed there for the preview stage, together with a View of
+    the detector and its frame buffer reference.
+
+    A frame whose update or on_result raises is logged, counted in stats.errors and
+    skipped; after max_errors failures in a row the worker stops, which stops the Pipeline.
+    """
+
+    def __init__(self, grabber, detector, on_result, get_update_args=None, render_queue=None, max_errors=30):
+        self.grabber = grabber
+        self.detector = detector
+        self.on_result = on_result
+        self.get_update_args = get_update_args
+        self.render_queue = render_queue
+        self.max_errors = max_errors
+        self.stats = StageStats("detection")
+        self._running = False
+        self._thread = None
+        # known_darts as a tuple, copied again only when its version changes
+        self._darts = (None, ())
+
+    def start(self):
+        self._running = True
+        self._thread = Thread(target=self._worker, daemon=True)
+        self._thread.start()
+        return self
+
+    def _view(self):
+        darts = self.detector.known_darts
+        if self._darts[0] != darts.version:
+            self._darts = (darts.version, tuple(darts))
+        # debug_tip is replaced, never drawn into, so the reference is a snapshot
+        return View(self._darts[1], self.detector.debug_tip)
+
+    def _worker(self):
+        failures = 0
+        while self._running:
+            frame_id, frame, buf = self.grabber.read(timeout=0.5)
+            if frame is None:
+                if not self.grabber.running:
+                    break
+                continue
+
+            try:
+                kwargs = self.get_update_args(frame.shape) if self.get_update_args else {}
+                result = self.detector.update(frame, **kwargs)
+                self.stats.tick()
+
+                self.on_result(frame, result)
+            except Exception as e:
+                if buf is not None:
+                    buf.release()
+                self.stats.errors += 1
+                failures += 1
+                if self.stats.errors == 1:
+                    traceback.print_exc()
+                print(f"[ERROR] Detection failed on frame {frame_id} ({failures} in a row): {e!r}")
+                if failures >= self.max_errors:
+                    print(f"[ERROR] Detection stopped after {failures} failed frames in a row")
+                    break
+                continue
+            except BaseException:
+                if buf is not None:
+                    buf.release()
+                raise
+            failures = 0
+
+            if self.render_queue is not None:
+                self.render_queue.put((frame_id, frame, result, self._view(), buf))
+            elif buf is not None:
+                buf.release()
+        self._running = False
+
+    @property
+    def running(self):
+        return self._running
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+
+class Pipeline:
+    """
+    Capture thread -> detection thread -> optional render queue, with per-stage stats.
+    pool is an optional frame_pool.FramePool the camera decodes into, see FrameGrabber.
+    """
+
+    def __init__(self, cap, detector, on_result, get_update_args=None, render=True, pool=None):
+        self.pool = pool
+        self.grabber = FrameGrabber(cap, pool=pool)
+        self.render_stats = StageStats("render")
+        self.render_queue = LatestQueue(maxsize=2, stats=self.render_stats,
+                                        on_drop=_release_item) if render else None
+        self.worker = DetectionWorker(self.grabber, detector, on_result,
+                                      get_update_args=get_update_args, render_queue=self.render_queue)
+        self._rendering = None
+
+    def start(self):
+        self.grabber.start()
+        self.worker.start()
+        return self
+
+    def next_render(self, timeout=0.1):
+        """
+        Blocks up to timeout for the next processed frame. Returns (frame_id, frame, result,
+        view) or None, view a View. frame is read-only and stays valid until the next call.
+        """
+        try:
+            item = self.render_queue.get(timeout=timeout)
+        except Empty:
+            return None
+        self.render_stats.tick()
+        _release_item(self._rendering)
+        self._rendering = item
+        return item[:4]
+
+    @property
+    def running(self):
+        return self.grabber.running and self.worker.running
+
+    def stop(self):
+        self.grabber.stop()
+        self.worker.stop()
+        _release_item(self._rendering)
+        self._rendering = None
+        if self.render_queue is not None:
+            while True:
+                try:
+                    _release_item(self.render_queue.get(timeout=0))
+                except Empty:
+                    break
+
+    def stats(self):
+        stats = {
+            "capture": self.grabber.stats.snapshot(self.grabber.queue_depth()),
+            "detection": self.worker.stats.snapshot(),
+        }
+        if self.render_queue is not None:
+            stats["render"] = self.render_stats.snapshot(self.render_queue.qsize())
+        if self.pool is not None:
+            stats["pool"] = self.pool.stats()
+        if self.worker.detector.scheduler is not None:
+            stats["scheduler"] = self.worker.detector.scheduler.stats()
+        return stats
+
+
+def _release_item(item):
+    """Releases the frame buffer of a render queue item, if it has one."""
+    if item is not None and item[4] is not None:
+        item[4].release()
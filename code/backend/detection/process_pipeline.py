@@ -0,0 +1,371 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from threading import Thread, Lock
+from queue import Empty
+
+import numpy as np
+
+from pipeline import StageStats, LatestQueue, View
+
+# Seconds between the pipeline stats the detection process sends back
+STATS_INTERVAL = 1.0
+
+
+def _shape_only(shape):
+    """Read-only, all-zero frame of shape that takes no memory: a stand-in when only the shape is known"""
+    return np.broadcast_to(np.zeros((), dtype=np.uint8), tuple(shape))
+
+
+class SharedFrameSlots:
+    """
+    `count` slots of (frame, thresh) in one shared memory block. The detection process
+    writes slot frame_id % count and only sends the frame_id over the pipe. Each slot
+    has a sequence number that is -1 while it is being written, so the reader can tell
+    a torn copy from a good one without a lock between the processes.
+    """
+
+    def __init__(self, shm, frame_shape, count, owner):
+        self.shm = shm
+        self.frame_shape = tuple(frame_shape)
+        self.count = count
+        self.owner = owner
+
+        h, w = self.frame_shape[:2]
+        frame_bytes = count * int(np.prod(self.frame_shape))
+        thresh_bytes = count * h * w
+        buf = shm.buf
+        self.seq = np.ndarray((count,), dtype=np.int64, buffer=buf)
+        self.frames = np.ndarray((count,) + self.frame_shape, dtype=np.uint8, buffer=buf, offset=8 * count)
+        self.threshes = np.ndarray((count, h, w), dtype=np.uint8, buffer=buf, offset=8 * count + frame_bytes)
+        assert 8 * count + frame_bytes + thresh_bytes <= shm.size
+
+    @staticmethod
+    def nbytes(frame_shape, count):
+        h, w = frame_shape[:2]
+        return 8 * count + count * int(np.prod(frame_shape)) + count * h * w
+
+    @classmethod
+    def create(cls, frame_shape, count=3):
+        shm = shared_memory.SharedMemory(create=True, size=cls.nbytes(frame_shape, count))
+        slots = cls(shm, frame_shape, count, owner=True)
+        slots.seq[:] = -1
+        return slots
+
+    @classmethod
+    def attach(cls, name, frame_shape, count):
+        return cls(shared_memory.SharedMemory(name=name), frame_shape, count, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, frame_id, frame, thresh):
+        i = frame_id % self.count
+        self.seq[i] = -1
+        np.copyto(self.frames[i], frame)
+        if thresh is not None:
+            np.copyto(self.threshes[i], thresh)
+        self.seq[i] = frame_id
+
+    def read(self, frame_id, with_thresh=True):
+        """Copies of (frame, thresh) for frame_id, or None if the slot was overwritten meanwhile."""
+        i = frame_id % self.count
+        if self.seq[i] != frame_id:
+            return None
+        frame = self.frames[i].copy()
+        thresh = self.threshes[i].copy() if with_thresh else None
+        if self.seq[i] != frame_id:
+            return None
+        return frame, thresh
+
+    def close(self):
+        # Views must go before the mapping can be closed
+        self.seq = self.frames = self.threshes = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def detection_process(source, config, conn, stop, slot_count=3, share_frames=True):
+    """
+    Body of the detection process: capture, DartDetector and calibration live here.
+    Sends ("ready", shm_name, frame_shape, slot_count) once, then per processed frame
+    ("result", frame_id, new_darts, has_thresh, contour_boxes, motion_level, known_darts),
+    ("stats", dict) every STATS_INTERVAL seconds, ("markers", BoardHomography) when the board
+    markers moved (see calibration_monitor) and ("exit", reason) at the end.
+    Accepts ("set", attr, value), ("reset_background",), ("clip", reason), ("focus", value) and
+    ("profile", enabled). The stats include the detector's stages, recorder and clips.
+    With share_frames=False, for headless use, no SharedFrameSlots are created and
+    shm_name is None.
+    """
+    import time
+    import cv2
+    from board_cache import BoardCache
+    from board_homography import build_rectifier
+    from calibration_monitor import build_monitor
+    from detector import DartDetector
+    import calibration
+    from frame_pool import build_frame_pool
+    from frame_ring import build_frame_ring
+    from pipeline import Pipeline
+    from profiler import StageProfiler
+    from recorder import build_recorder
+    from scheduler import build_scheduler
+
+    send_lock = Lock()
+
+    def send(msg):
+        with send_lock:
+            conn.send(msg)
+
+    cap = cv2.VideoCapture(source)
+    cap.set(cv2.CAP_PROP_AUTOFOCUS, 0)
+    ret, frame = cap.read()
+    if not ret:
+        send(("exit", f"could not read from {source}"))
+        cap.release()
+        return
+
+    # This process has its own calibration snapshot and watcher, the parent's only scores
+    calibration.reload()
+    watcher = calibration.build_watcher(config["calibration_watch"])
+    # Masks from the markers like main() scores from them
+    rectifier = build_rectifier(config["aruco"])
+    if rectifier is not None:
+        rectifier.update(frame)
+    monitor = build_monitor(rectifier, config["aruco"], on_change=lambda homography: send(("markers", homography)))
+    board_cache = BoardCache(padding=80)
+
+    detector = DartDetector(filter_pipeline=config.get("filter", "reference"),
+                            pyramid_levels=config.get("pyramid_levels", 0),
+                            background=config["background"], tip_direction=config["tip_direction"],
+                            preview=share_frames, blob_finder=config["blob_finder"])
+    detector.recorder = build_recorder(config["recording"])
+    detector.frame_ring = build_frame_ring(config["clips"])
+    detector.scheduler = build_scheduler(config["scheduler"])
+    if config["profile"]:
+        detector.profiler = StageProfiler()
+
+    slots = SharedFrameSlots.create(frame.shape, slot_count) if share_frames else None
+    send(("ready", slots.name if slots is not None else None, frame.shape, slot_count))
+
+    def get_update_args(frame_shape):
+        homography = rectifier.homography if rectifier is not None else None
+        if homography is not None:
+            if monitor is not None and monitor.changed():
+                detector.bg_frame = None
+            board = board_cache.get(homography.ring_data, homography.sector_config, frame_shape)
+        else:
+            snapshot = calibration.current()
+            board = board_cache.get(snapshot.ring_data, snapshot.sector_config, frame_shape)
+        return {"ignore_mask": board.ignore_mask, "roi": board.roi}
+
+    frame_ids = iter(range(1 << 62))
+
+    def on_result(frame, result):
+        new_darts, thresh, boxes, motion_level = result
+        if monitor is not None:
+            monitor.offer(frame)
+        frame_id = next(frame_ids)
+        if slots is not None and frame.shape == slots.frame_shape:
+            slots.write(frame_id, frame, thresh)
+        send(("result", frame_id, [(float(x), float(y)) for x, y in new_darts], thresh is not None,
+              [tuple(int(v) for v in box) for box in boxes], float(motion_level),
+              [(float(x), float(y)) for x, y in detector.known_darts]))
+
+    pool = build_frame_pool(config["frame_pool"], detector.recorder)
+    if monitor is not None:
+        monitor.start()
+    if watcher is not None:
+        watcher.start()
+    pipeline = Pipeline(cap, detector, on_result, get_update_args=get_update_args, render=False, pool=pool).start()
+    reason = "stopped"
+    try:
+        next_stats = time.monotonic() + STATS_INTERVAL
+        while not stop.is_set() and pipeline.running:
+            if conn.poll(0.05):
+                cmd = conn.recv()
+                if cmd[0] == "set":
+                    setattr(detector, cmd[1], cmd[2])
+                elif cmd[0] == "reset_background":
+                    detector.bg_frame = None
+                elif cmd[0] == "clip":
+                    detector.request_clip(cmd[1])
+                elif cmd[0] == "focus":
+                    cap.set(cv2.CAP_PROP_FOCUS, cmd[1])
+                elif cmd[0] == "profile":
+                    if cmd[1] and detector.profiler is None:
+                        detector.profiler = StageProfiler()
+                    elif not cmd[1]:
+                        detector.profiler = None
+                    # GET /profile answers from the stats, do not leave it a second behind
+                    next_stats = time.monotonic()
+            if time.monotonic() >= next_stats:
+                stats = pipeline.stats()
+                if detector.profiler is not None:
+                    stats["stages"] = detector.profiler.summary()
+                if detector.recorder is not None:
+                    stats["recorder"] = detector.recorder.stats()
+                if detector.frame_ring is not None:
+                    stats["clips"] = detector.frame_ring.stats()
+                if monitor is not None:
+                    stats["markers"] = monitor.stats()
+                send(("stats", stats))
+                next_stats = time.monotonic() + STATS_INTERVAL
+        if not pipeline.running:
+            reason = "camera stopped"
+    except (EOFError, BrokenPipeError):
+        reason = "parent gone"
+    finally:
+        pipeline.stop()
+        if monitor is not None:
+            monitor.stop()
+        if watcher is not None:
+            watcher.stop()
+        cap.release()
+        detector.cleanup()
+        try:
+            send(("exit", reason))
+        except (OSError, BrokenPipeError):
+            pass
+        if slots is not None:
+            slots.close()
+
+
+class ProcessPipeline:
+    """
+    Pipeline with capture and detection in a separate process, so request handling in
+    this process (Flask, Socket.IO) cannot slow detection down through the GIL. Frames
+    and thresh images stay in SharedFrameSlots, only frame ids and the small parts of
+    each result cross the pipe. Same interface as pipeline.Pipeline: on_result(frame,
+    result) runs on a receiver thread here. When rendering, frame is a copy from shared
+    memory. Headless, no frames are shared at all and frame is a read-only stand-in
+    that only has the camera's shape, enough to score tips with.
+
+    In the result tuples thresh is a copy from shared memory when rendering and None
+    otherwise. next_render's View carries the detector's known_darts from the other process and
+    no debug_tip. on_markers(homography) runs on the receiver thread when the detection process
+    saw the board markers move.
+    """
+
+    def __init__(self, source, config, on_result, render=True, slot_count=3, on_markers=None):
+        self.source = source
+        self.config = config
+        self.on_result = on_result
+        self.on_markers = on_markers
+        self.slot_count = slot_count
+
+        self.results_stats = StageStats("results")
+        self.render_stats = StageStats("render")
+        self.render_queue = LatestQueue(maxsize=2, stats=self.render_stats) if render else None
+        self.torn = 0
+        self.exit_reason = None
+        self._process_stats = {}
+
+        self._ctx = mp.get_context("spawn")
+        self._conn, child_conn = self._ctx.Pipe()
+        self._child_conn = child_conn
+        self._stop = self._ctx.Event()
+        self._process = None
+        self._receiver = None
+        self._slots = None
+        self._placeholder = None
+        self._send_lock = Lock()
+        self._running = False
+
+    def start(self):
+        self._process = self._ctx.Process(target=detection_process, name="detection",
+                                          args=(self.source, self.config, self._child_conn, self._stop,
+                                                self.slot_count, self.render_queue is not None),
+                                          daemon=True)
+        self._process.start()
+        self._running = True
+        self._receiver = Thread(target=self._receive, daemon=True)
+        self._receiver.start()
+        return self
+
+    def _receive(self):
+        try:
+            while self._running:
+                if not self._conn.poll(0.1):
+                    if not self._process.is_alive():
+                        self.exit_reason = self.exit_reason or "process died"
+                        break
+                    continue
+                msg = self._conn.recv()
+                kind = msg[0]
+                if kind == "result":
+                    self._handle_result(*msg[1:])
+                elif kind == "stats":
+                    self._process_stats = msg[1]
+                elif kind == "markers":
+                    if self.on_markers is not None:
+                        self.on_markers(msg[1])
+                elif kind == "ready":
+                    _, name, shape, count = msg
+                    self._placeholder = _shape_only(shape)
+                    if name is not None:
+                        self._slots = SharedFrameSlots.attach(name, shape, count)
+                elif kind == "exit":
+                    self.exit_reason = msg[1]
+                    print(f"[Pipeline] Detection process exited: {msg[1]}")
+                    break
+        except (EOFError, OSError):
+            self.exit_reason = self.exit_reason or "pipe closed"
+        finally:
+            self._running = False
+            if self._slots is not None:
+                self._slots.close()
+                self._slots = None
+
+    def _handle_result(self, frame_id, new_darts, has_thresh, boxes, motion_level, known_darts):
+        self.results_stats.tick()
+        if self.render_queue is None:
+            self.on_result(self._placeholder, (new_darts, None, boxes, motion_level))
+            return
+
+        copies = self._slots.read(frame_id, with_thresh=has_thresh)
+        if copies is None:
+            self.torn += 1
+            if new_darts:
+                self.on_result(self._placeholder, (new_darts, None, boxes, motion_level))
+            return
+        frame, thresh = copies
+        result = (new_darts, thresh, boxes, motion_level)
+        self.on_result(frame, result)
+        self.render_queue.put((frame_id, frame, result, View(tuple(known_darts), None)))
+
+    def send(self, *cmd):
+        """Command for the detection process, see detection_process"""
+        with self._send_lock:
+            self._conn.send(cmd)
+
+    def next_render(self, timeout=0.1):
+        try:
+            item = self.render_queue.get(timeout=timeout)
+        except Empty:
+            return None
+        self.render_stats.tick()
+        return item
+
+    @property
+    def running(self):
+        return self._running
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._process is not None:
+            self._process.join(timeout=timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+        if self._receiver is not None:
+            self._receiver.join(timeout=timeout)
+        self._running = False
+
+    def stats(self):
+        stats = dict(self._process_stats)
+        stats["results"] = self.results_stats.snapshot()
+        stats["results"]["torn"] = self.torn
+        if self.render_queue is not None:
+            stats["render"] = self.render_stats.snapshot(self.render_queue.qsize())
+        return stats
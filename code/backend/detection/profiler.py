@@ -0,0 +1,69 @@
+import time
+from collections import deque
+from threading import Lock
+
+import numpy as np
+
+
+class StageProfiler:
+    """
+    Lap timer for DartDetector.update. start() at the top of a frame, lap(name) after
+    each stage, end() when the frame is done. Keeps the last `window` samples per stage
+    for rolling percentiles.
+
+    DartDetector only calls into this when detector.profiler is set, so a detector
+    without a profiler pays nothing but an attribute check per stage.
+    """
+
+    def __init__(self, window=300):
+        self.window = window
+        self._samples = {}
+        self._lock = Lock()
+        self._start = 0.0
+        self._last = 0.0
+
+    def start(self):
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self._record(stage, now - self._last)
+        self._last = now
+
+    def end(self):
+        self._record("total", time.perf_counter() - self._start)
+
+    def _record(self, stage, elapsed):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(elapsed)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        """{stage: {"count", "mean", "p50", "p95", "p99"}} in milliseconds, in the order stages first ran, total last."""
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._samples.items()}
+        if "total" in samples:
+            samples["total"] = samples.pop("total")
+
+        summary = {}
+        for stage, values in samples.items():
+            ms = np.asarray(values) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            summary[stage] = {
+                "count": len(values),
+                "mean": round(float(ms.mean()), 3),
+                "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3),
+                "p99": round(float(p99), 3),
+            }
+        return summary
+
+    def print(self):
+        for stage, s in self.summary().items():
+            print(f"  {stage:18s} mean {s['mean']:7.2f} ms  p50 {s['p50']:7.2f}  p95 {s['p95']:7.2f}  p99 {s['p99']:7.2f}")
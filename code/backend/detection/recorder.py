@@ -0,0 +1,280 @@
+import os
+import time
+from collections import deque
+from queue import Queue, Full, Empty
+from threading import Thread, Lock
+
+import cv2
+
+from frame_pool import retain
+
+
+def enforce_retention(directory, extensions, max_bytes=None, max_age=None, keep=()):
+    """
+    Deletes the oldest files in directory (matching extensions) until they are younger
+    than max_age seconds and add up to at most max_bytes. Paths in keep are never deleted.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    entries = []
+    for name in os.listdir(directory):
+        if not name.endswith(extensions):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()
+
+    now = time.time()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, path in entries:
+        too_old = max_age is not None and now - mtime > max_age
+        too_big = max_bytes is not None and total > max_bytes
+        if not (too_old or too_big):
+            break
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+class SegmentedVideoWriter:
+    """Writes frames into video files of at most segment_seconds each."""
+
+    extensions = (".mp4", ".avi")
+
+    def __init__(self, directory, fps=30.0, segment_seconds=60.0, fourcc="mp4v", max_bytes=None, max_age=None):
+        self.directory = directory
+        self.fps = fps
+        self.segment_seconds = segment_seconds
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.ext = ".avi" if fourcc in ("MJPG", "XVID") else ".mp4"
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._writer = None
+        self._path = None
+        self._size = None
+        self._started = None
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, frame, ts, motion_level):
+        size = (frame.shape[1], frame.shape[0])
+        if self._writer is None or size != self._size or ts - self._started >= self.segment_seconds:
+            self._open(size, ts)
+        self._writer.write(frame if frame.ndim == 3 else cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
+
+    def _open(self, size, ts):
+        self.close()
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        self._path = os.path.join(self.directory, f"motion_{stamp}_{int(ts * 1000) % 1000:03d}{self.ext}")
+        self._writer = cv2.VideoWriter(self._path, self.fourcc, self.fps, size)
+        self._size = size
+        self._started = ts
+        enforce_retention(self.directory, self.extensions, self.max_bytes, self.max_age, keep=(self._path,))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+
+class JpegRingWriter:
+    """One JPEG per frame, keeping at most max_files of them (oldest are deleted)."""
+
+    extensions = (".jpg",)
+
+    def __init__(self, directory, quality=85, max_files=2000, max_bytes=None, max_age=None):
+        self.directory = directory
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.frame_id = 0
+        self._files = deque()
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, frame, ts, motion_level):
+        ok, buf = cv2.imencode(".jpg", frame, self.params)
+        if not ok:
+            raise ValueError("could not encode frame")
+        path = os.path.join(self.directory, f"{self.frame_id:06d}_motion_{motion_level:.0f}.jpg")
+        with open(path, "wb") as f:
+            f.write(buf.tobytes())
+        self.frame_id += 1
+        self._files.append(path)
+
+        while len(self._files) > self.max_files:
+            try:
+                os.remove(self._files.popleft())
+            except OSError:
+                pass
+        if self.frame_id % 100 == 0:
+            enforce_retention(self.directory, self.extensions, self.max_bytes, self.max_age)
+
+    def close(self):
+        pass
+
+
+class MotionRecorder:
+    """
+    Records frames around motion and around each detected dart, on a writer thread.
+
+    record() is called for every processed frame. Frames with motion above min_level are
+    written; the last pre_frames frames are also kept in memory so that trigger() (a dart
+    was found) can write the context leading up to it, followed by the next post_frames
+    frames. Frames are never written out of order. When the write queue is full frames
+    are dropped and counted instead of blocking detection.
+
+    Frames from a frame_pool.FramePool are kept by reference until written, other
+    frames are referenced as they are, or copied with copy_frames=True.
+    """
+
+    def __init__(self, writer, pre_frames=15, post_frames=30, min_level=30, motion_only=True,
+                 max_queue=60, copy_frames=False):
+        self.writer = writer
+        self.pre_frames = pre_frames
+        self.post_frames = post_frames
+        self.min_level = min_level
+        self.motion_only = motion_only
+        self.copy_frames = copy_frames
+
+        self.recorded = 0
+        self.dropped = 0
+        self.failed = 0
+        self.triggers = 0
+        self._lock = Lock()
+
+        self._seq = 0
+        self._last_queued = 0
+        self._post_remaining = 0
+        self._pre = deque(maxlen=max(1, pre_frames))
+        self._queue = Queue(maxsize=max_queue)
+        self._thread = Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def record(self, frame, motion_level, ts):
+        self._seq += 1
+        enqueue = self._post_remaining > 0 or not self.motion_only or motion_level > self.min_level
+        if self._post_remaining > 0:
+            self._post_remaining -= 1
+        if not enqueue and self.pre_frames == 0:
+            return
+
+        item = self._keep(self._seq, ts, frame, motion_level)
+        if enqueue:
+            self._enqueue(item)
+        if self.pre_frames > 0:
+            if len(self._pre) == self._pre.maxlen:
+                self._release(self._pre[0])
+            self._pre.append(item)
+        else:
+            self._release(item)
+
+    def trigger(self):
+        """A dart was detected: write the buffered lead-up and the next post_frames frames."""
+        self.triggers += 1
+        for item in self._pre:
+            if item[0] > self._last_queued:
+                self._enqueue(item)
+            self._release(item)
+        self._pre.clear()
+        self._post_remaining = self.post_frames
+
+    def _keep(self, seq, ts, frame, motion_level):
+        """Item holding a reference to (or a copy of) frame, valid after record() returns"""
+        buf = retain(frame)
+        if buf is None and self.copy_frames:
+            frame = frame.copy()
+        return seq, ts, frame, motion_level, buf
+
+    @staticmethod
+    def _release(item):
+        if item[4] is not None:
+            item[4].release()
+
+    def _enqueue(self, item):
+        seq, ts, frame, motion_level, buf = item
+        if buf is not None:
+            buf.retain()
+        try:
+            self._queue.put((ts, frame, motion_level, buf), block=False)
+        except Full:
+            if buf is not None:
+                buf.release()
+            with self._lock:
+                self.dropped += 1
+        self._last_queued = seq
+
+    def _worker(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except Empty:
+                continue
+            if item is None:
+                break
+            ts, frame, motion_level, buf = item
+            try:
+                self.writer.write(frame, ts, motion_level)
+                with self._lock:
+                    self.recorded += 1
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"[WARN] Failed to record motion frame: {e}")
+            finally:
+                if buf is not None:
+                    buf.release()
+        self.writer.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "recorded": self.recorded,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "triggers": self.triggers,
+                "queue_depth": self._queue.qsize(),
+            }
+
+    def close(self, timeout=5.0):
+        for item in self._pre:
+            self._release(item)
+        self._pre.clear()
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+
+
+def build_recorder(config):
+    """MotionRecorder from the 'recording' section of config.json, or None if recording is off."""
+    mode = config.get("mode", "off")
+    if mode == "off":
+        return None
+
+    directory = config.get("dir", "motion_frames")
+    max_bytes = config.get("max_mb")
+    max_bytes = int(max_bytes * 1024 * 1024) if max_bytes else None
+    max_age = config.get("max_age_hours")
+    max_age = max_age * 3600 if max_age else None
+
+    if mode == "video":
+        writer = SegmentedVideoWriter(directory, fps=config.get("fps", 30.0),
+                                      segment_seconds=config.get("segment_seconds", 60.0),
+                                      fourcc=config.get("fourcc", "mp4v"), max_bytes=max_bytes, max_age=max_age)
+    elif mode == "jpeg":
+        writer = JpegRingWriter(directory, quality=config.get("quality", 85),
+                                max_files=config.get("max_files", 2000), max_bytes=max_bytes, max_age=max_age)
+    else:
+        raise ValueError(f"Unknown recording mode '{mode}', expected off, video or jpeg")
+
+    return MotionRecorder(writer, pre_frames=config.get("pre_frames", 15), post_frames=config.get("post_frames", 30),
+                          min_level=config.get("min_level", 30), motion_only=config.get("motion_only", True))
@@ -0,0 +1,217 @@
+import argparse
+import glob
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from detector import DartDetector
+from profiler import StageProfiler
+from scheduler import MotionScheduler
+
+IMAGE_EXTENSIONS = ("png", "jpg", "jpeg", "bmp")
+
+
+class ReplayClock:
+    """Clock for DartDetector(clock=...) that only moves when the replay says so."""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def set(self, t):
+        self.now = t
+
+
+class ReplaySource:
+    """
+    Recorded frames as (timestamp, frame) pairs. path is a video file or a directory
+    of images that sort in capture order, e.g. motion_frames/ or a clip from clips/.
+    Image sequences are spaced 1 / fps apart unless the directory has a timestamps.json
+    (clips do). Videos use their own timestamps when the container provides them.
+    """
+
+    def __init__(self, path, fps=30.0, limit=None):
+        self.path = path
+        self.fps = fps
+        self.limit = limit
+        if os.path.isdir(path):
+            files = [f for ext in IMAGE_EXTENSIONS for f in glob.glob(os.path.join(path, f"*.{ext}"))]
+            self.files = sorted(files)[:limit]
+            if not self.files:
+                raise ValueError(f"No images found in {path}")
+            self.timestamps = None
+            ts_path = os.path.join(path, "timestamps.json")
+            if os.path.isfile(ts_path):
+                with open(ts_path) as f:
+                    timestamps = json.load(f)
+                if len(timestamps) >= len(self.files):
+                    self.timestamps = timestamps
+        elif os.path.isfile(path):
+            self.files = None
+        else:
+            raise FileNotFoundError(path)
+
+    def __iter__(self):
+        if self.files is not None:
+            for i, f in enumerate(self.files):
+                frame = cv2.imread(f, cv2.IMREAD_COLOR)
+                if frame is not None:
+                    yield (self.timestamps[i] if self.timestamps else i / self.fps), frame
+            return
+
+        cap = cv2.VideoCapture(self.path)
+        try:
+            i = 0
+            while self.limit is None or i < self.limit:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+                yield (msec / 1000.0 if msec > 0 else i / self.fps), frame
+                i += 1
+        finally:
+            cap.release()
+
+
+def _percentiles(values):
+    if not values:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ms = np.asarray(values) * 1000
+    return {
+        "mean": float(ms.mean()),
+        "p50": float(np.percentile(ms, 50)),
+        "p95": float(np.percentile(ms, 95)),
+        "max": float(ms.max()),
+    }
+
+
+class ReplayReport:
+    def __init__(self):
+        self.frames = 0
+        self.wall_time = 0.0
+        self.stage_times = {"decode": [], "update": []}
+        self.tips = []
+        self.camera_adjustments = 0
+
+    @property
+    def fps(self):
+        return self.frames / self.wall_time if self.wall_time > 0 else 0.0
+
+    def latency(self):
+        return {stage: _percentiles(times) for stage, times in self.stage_times.items()}
+
+    def print(self):
+        print(f"{self.frames} frames in {self.wall_time:.2f} s ({self.fps:.1f} frames/s)")
+        for stage, p in self.latency().items():
+            print(f"  {stage:10s} mean {p['mean']:7.2f} ms  p50 {p['p50']:7.2f}  p95 {p['p95']:7.2f}  max {p['max']:7.2f}")
+        print(f"{self.camera_adjustments} camera adjustment resets")
+        print(f"{len(self.tips)} tips:")
+        for frame_index, t, (x, y) in self.tips:
+            print(f"  frame {frame_index:5d}  t={t:8.3f}s  ({x:.2f}, {y:.2f})")
+
+
+def replay(source, detector, realtime=False, **update_kwargs):
+    """
+    Feeds every frame of source through detector.update. The detector must have been
+    built with clock=ReplayClock() so its timing follows the recording. With
+    realtime=True frames are paced to their timestamps, otherwise they run at max speed.
+    """
+    clock = detector.clock
+    if not isinstance(clock, ReplayClock):
+        raise ValueError("replay() needs a DartDetector built with clock=ReplayClock()")
+
+    report = ReplayReport()
+    frames = iter(source)
+    start = time.perf_counter()
+    first_ts = None
+    while True:
+        t0 = time.perf_counter()
+        try:
+            ts, frame = next(frames)
+        except StopIteration:
+            break
+        t1 = time.perf_counter()
+
+        if first_ts is None:
+            first_ts = ts
+        if realtime:
+            delay = (ts - first_ts) - (t1 - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        clock.set(ts)
+        new_darts, _, _, _ = detector.update(frame, **update_kwargs)
+        t2 = time.perf_counter()
+
+        report.stage_times["decode"].append(t1 - t0)
+        report.stage_times["update"].append(t2 - t1)
+        for tip in new_darts:
+            report.tips.append((report.frames, ts, (float(tip[0]), float(tip[1]))))
+        report.frames += 1
+
+    report.wall_time = time.perf_counter() - start
+    report.camera_adjustments = detector.camera_adjustments
+    return report
+
+
+def _direction(value):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded frames through DartDetector")
+    parser.add_argument("path", help="video file or directory of frames (e.g. motion_frames/)")
+    parser.add_argument("--fps", type=float, default=30.0, help="frame rate for image sequences")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--realtime", action="store_true", help="pace frames to their timestamps")
+    parser.add_argument("--filter", default="reference", help="filter preset, see filters.PRESETS")
+    parser.add_argument("--pyramid", type=int, default=0, help="pyramid levels")
+    parser.add_argument("--background", default="snapshot", help="background model, see background.BACKGROUNDS")
+    parser.add_argument("--blobs", default="contours", help="blob finder, see blobs.BLOB_FINDERS")
+    parser.add_argument("--schedule", action="store_true", help="only probe idle frames, see scheduler.MotionScheduler")
+    parser.add_argument("--tip-direction", default="left", help="which way darts point in the image, see tip.DIRECTIONS")
+    parser.add_argument("--no-board", action="store_true", help="ignore rings.json, process the whole frame")
+    parser.add_argument("--profile", action="store_true", help="also print per-stage timings inside update()")
+    args = parser.parse_args()
+
+    source = ReplaySource(args.path, fps=args.fps, limit=args.limit)
+    detector = DartDetector(filter_pipeline=args.filter, pyramid_levels=args.pyramid, clock=ReplayClock(),
+                            background=args.background, tip_direction=_direction(args.tip_direction),
+                            scheduler=MotionScheduler() if args.schedule else None, preview=False,
+                            blob_finder=args.blobs)
+    if args.profile:
+        detector.profiler = StageProfiler()
+
+    update_kwargs = {}
+    if not args.no_board:
+        from board_cache import BoardCache
+        from file_handler import load_rings, load_lines
+
+        ring_data, loaded = load_rings()
+        if loaded:
+            first_frame = next(iter(source))[1]
+            board = BoardCache().get(ring_data, load_lines(), first_frame.shape)
+            update_kwargs = {"ignore_mask": board.ignore_mask, "roi": board.roi}
+
+    try:
+        report = replay(source, detector, realtime=args.realtime, **update_kwargs)
+    finally:
+        detector.cleanup()
+    report.print()
+    if detector.scheduler is not None:
+        print("Scheduler:", detector.scheduler.stats())
+    if args.profile:
+        print("Stages inside update():")
+        detector.profiler.print()
+
+
+if __name__ == "__main__":
+    main()
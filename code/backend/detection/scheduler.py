@@ -0,0 +1,132 @@
+import cv2
+
+
+class MotionScheduler:
+    """
+    Decides per frame whether DartDetector.update runs the full diff/filter/blob chain
+    or only a motion probe. While the board is idle every frame is compared with a
+    reference at 1/scale resolution (a bilinear resize and a gray conversion, well under
+    a millisecond); as soon as more than min_changed full-resolution pixels differ by
+    more than thresh, the detector escalates to full processing on that same frame.
+    After idle_after seconds of full processing with the motion level at or below the
+    detector's motion_min_level and no new known dart, it drops back to probing, with
+    that frame as the new reference.
+
+    Probes never update the detector's background, so lighting that drifts slowly stays
+    under thresh against the reference but adds up against the background, until the
+    full pass on the next dart sees the whole board as motion. Every frame that becomes
+    the reference therefore becomes the background too (see observe), and while idle a
+    full pass runs every refresh_every seconds to take a fresh one.
+    """
+
+    def __init__(self, scale=4, thresh=18, min_changed=64, idle_after=1.0, refresh_every=5.0):
+        self.scale = scale
+        self.thresh = thresh
+        self.min_changed = min_changed
+        self.idle_after = idle_after
+        self.refresh_every = refresh_every
+        self.idle = False
+        self.reference = None
+        self.last_changed = 0
+        self.probes = 0
+        self.full = 0
+        self.escalations = 0
+        self.refreshes = 0
+        self._small = None
+        self._diff = None
+        self._quiet_since = None
+        self._darts_version = None
+        self._reference_time = None
+        self._refreshing = False
+
+    def _shrink(self, frame):
+        h, w = frame.shape[:2]
+        size = (max(1, w // self.scale), max(1, h // self.scale))
+        if self._small is not None and self._small.shape[:2] != (size[1], size[0]):
+            self._small = self._diff = None
+        self._small = cv2.resize(frame, size, dst=self._small, interpolation=cv2.INTER_LINEAR)
+        if self._small.ndim == 3:
+            return cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY)
+        return self._small
+
+    def wants_full(self, frame, now=None):
+        """True if this frame needs the full detector, otherwise it was only probed."""
+        if not self.idle:
+            self.full += 1
+            return True
+        if self.refresh_every and now is not None and now - self._reference_time >= self.refresh_every:
+            self._refreshing = True
+            self.refreshes += 1
+            self.full += 1
+            return True
+        self.probes += 1
+        small = self._shrink(frame)
+        if self.reference is None or self.reference.shape != small.shape:
+            changed = float("inf")
+        else:
+            self._diff = cv2.absdiff(small, self.reference, dst=self._diff)
+            cv2.threshold(self._diff, self.thresh, 255, cv2.THRESH_BINARY, dst=self._diff)
+            changed = cv2.countNonZero(self._diff)
+            changed *= self.scale * self.scale
+        self.last_changed = changed
+        if changed < self.min_changed:
+            return False
+        self.idle = False
+        self.escalations += 1
+        self._quiet_since = None
+        self.full += 1
+        return True
+
+    def observe(self, frame, quiet, darts_version, now):
+        """
+        After every full update. quiet: nothing above the detector's motion_min_level.
+        True if frame is the new reference, the detector then takes it as its background.
+        """
+        refreshing, self._refreshing = self._refreshing, False
+        if not quiet or darts_version != self._darts_version:
+            if refreshing:
+                # Something moved on the refresh frame, full processing as after a probe
+                self.idle = False
+                self.escalations += 1
+            self._quiet_since = None
+            self._darts_version = darts_version
+            return False
+        if refreshing:
+            self._rebase(frame, now)
+            return True
+        if self._quiet_since is None:
+            self._quiet_since = now
+        elif now - self._quiet_since >= self.idle_after:
+            self._rebase(frame, now)
+            self.idle = True
+            return True
+        return False
+
+    def _rebase(self, frame, now):
+        self.reference = self._shrink(frame).copy()
+        self._reference_time = now
+
+    def wake(self):
+        """Back to full processing from the next frame, e.g. after a background reset."""
+        self.idle = False
+        self._quiet_since = None
+        self._refreshing = False
+
+    def stats(self):
+        return {
+            "idle": self.idle,
+            "probes": self.probes,
+            "full": self.full,
+            "escalations": self.escalations,
+            "refreshes": self.refreshes,
+            "last_changed": self.last_changed,
+        }
+
+
+def build_scheduler(config):
+    """MotionScheduler from the 'scheduler' section of config.json, or None if it is off."""
+    if not config.get("enabled", False):
+        return None
+    return MotionScheduler(scale=config.get("scale", 4), thresh=config.get("thresh", 18),
+                           min_changed=config.get("min_changed", 64), idle_after=config.get("idle_after", 1.0),
+                           refresh_every=config.get("refresh_every", 5.0))
@@ -0,0 +1,119 @@
+from threading import Lock, Thread
+
+import numpy as np
+
+from calibration import current
+from classifier import (classify_field, classify_ring, classify_sector, classify_ring_array, classify_sector_array,
+                        field_lookup_table)
+
+MISS_LABEL = 0
+
+
+class ScoreTable:
+    """
+    Frame-sized label image of the calibrated board. Every pixel holds an index into
+    self.fields, so scoring a hit is a single array read instead of the ellipse and
+    atan2 math in classifier.py. Build it once per calibration and frame size, from
+    calibration.current() unless a calibration.Calibration is passed in.
+    """
+
+    def __init__(self, frame_shape, calibration=None):
+        calibration = calibration or current()
+        self.key = calibration.key
+        self.shape = tuple(frame_shape[:2])
+
+        self.fields, field_lut = field_lookup_table(calibration)
+        # classify_field returns "0" for a miss, which the lookup table puts first
+        assert self.fields[MISS_LABEL] == "0"
+
+        h, w = self.shape
+        ys, xs = np.mgrid[0:h, 0:w].astype(np.float32)
+        outer, inner = classify_ring_array(xs, ys, calibration)
+        sector_ids = classify_sector_array(xs, ys, calibration)
+        self.labels = field_lut[outer, inner + 1, sector_ids]
+
+    def matches(self, frame_shape, calibration=None):
+        return self.shape == tuple(frame_shape[:2]) and self.key == (calibration or current()).key
+
+    def contains(self, x, y):
+        return 0 <= x < self.shape[1] and 0 <= y < self.shape[0]
+
+    def lookup(self, x, y):
+        """Score a single pixel. Returns the same string as classify_field."""
+        return self.fields[self.labels[int(y), int(x)]]
+
+    def lookup_labels(self, xs, ys):
+        """Score N points in one call. Points outside the frame get MISS_LABEL."""
+        xs = np.asarray(xs).astype(np.intp)
+        ys = np.asarray(ys).astype(np.intp)
+        h, w = self.shape
+        valid = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+        labels = np.full(xs.shape, MISS_LABEL, dtype=np.uint8)
+        labels[valid] = self.labels[ys[valid], xs[valid]]
+        return labels
+
+    def lookup_many(self, xs, ys):
+        """Same as lookup_labels but returns the field strings."""
+        return np.asarray(self.fields, dtype=object)[self.lookup_labels(xs, ys)]
+
+
+_table = None
+# (shape, calibration key) of the table prepare_score_table is building
+_pending = None
+_pending_lock = Lock()
+
+
+def get_score_table(frame_shape, calibration=None):
+    """Returns the table for calibration (default the current one), rebuilding it if that changed."""
+    global _table
+    calibration = calibration or current()
+    table = _table
+    if table is None or not table.matches(frame_shape, calibration):
+        table = _table = ScoreTable(frame_shape, calibration)
+    return table
+
+
+def prepare_score_table(frame_shape, calibration=None):
+    """
+    Builds the table for calibration (default the current one) on a background thread,
+    unless it is already built or being built. Returns the thread, or None.
+    """
+    global _pending
+    calibration = calibration or current()
+    table = _table
+    if table is not None and table.matches(frame_shape, calibration):
+        return None
+    pending = (tuple(frame_shape[:2]), calibration.key)
+    with _pending_lock:
+        if _pending == pending:
+            return None
+        _pending = pending
+
+    def build():
+        global _pending
+        try:
+            get_score_table(frame_shape, calibration)
+        finally:
+            with _pending_lock:
+                if _pending == pending:
+                    _pending = None
+
+    thread = Thread(target=build, name="score-table", daemon=True)
+    thread.start()
+    return thread
+
+
+def score_point(x, y, frame_shape, calibration=None):
+    """
+    The field at (x, y). Never waits for the table: until it is built for this frame size
+    and calibration, the classifier answers (same result, ~15 us instead of ~1 us) and the
+    table is prepared in the background.
+    """
+    calibration = calibration or current()
+    table = _table
+    if table is not None and table.matches(frame_shape, calibration):
+        if table.contains(x, y):
+            return table.lookup(x, y)
+    else:
+        prepare_score_table(frame_shape, calibration)
+    return classify_field(classify_ring(x, y, calibration), classify_sector(x, y, calibration))
@@ -0,0 +1,51 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from artifact_sink import ArtifactSink
+
+
+def test_images_are_written(tmp_path):
+    sink = ArtifactSink(base_dir=str(tmp_path), fmt="png")
+    img = np.arange(48 * 64, dtype=np.uint32).reshape(48, 64).astype(np.uint8)
+    assert sink.submit("00001_thresh", img)
+    assert not sink.submit("00001_none", None)
+    sink.close()
+    assert np.array_equal(cv2.imread(str(tmp_path / "00001_thresh.png"), cv2.IMREAD_UNCHANGED), img)
+    assert sink.stats() == {"submitted": 1, "written": 1, "dropped": 0, "failed": 0, "queue_depth": 0}
+
+
+def test_copy_keeps_what_the_buffer_held(tmp_path):
+    # No workers yet: everything stays queued until the buffer was overwritten
+    sink = ArtifactSink(base_dir=str(tmp_path), workers=0)
+    buf = np.full((8, 8), 10, dtype=np.uint8)
+    sink.submit("copied", buf, copy=True)
+    sink.submit("shared", buf)
+    buf[:] = 200
+    sink._queue.put(None)
+    sink._worker()
+    assert cv2.imread(str(tmp_path / "copied.png"), cv2.IMREAD_GRAYSCALE)[0, 0] == 10
+    assert cv2.imread(str(tmp_path / "shared.png"), cv2.IMREAD_GRAYSCALE)[0, 0] == 200
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    sink = ArtifactSink(base_dir=str(tmp_path), workers=0, max_queue=2)
+    img = np.zeros((4, 4), dtype=np.uint8)
+    assert [sink.submit(f"{i}", img) for i in range(4)] == [True, True, False, False]
+    assert sink.stats()["dropped"] == 2 and sink.stats()["queue_depth"] == 2
+
+
+def test_failed_writes_are_counted(tmp_path):
+    sink = ArtifactSink(base_dir=str(tmp_path / "debug"), fmt="jpg", level=80)
+    assert sink.submit("empty", np.zeros((0, 0), dtype=np.uint8))
+    assert sink.submit("ok", np.zeros((4, 4, 3), dtype=np.uint8))
+    sink.close()
+    assert (sink.written, sink.failed) == (1, 1)
+    assert os.listdir(tmp_path / "debug") == ["ok.jpg"]
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        ArtifactSink(base_dir=str(tmp_path), fmt="bmp")
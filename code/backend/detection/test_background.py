@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from background import RunningAverageBackground, SnapshotBackground, make_background
+
+SHAPE = (30, 40)
+
+
+def _img(value):
+    return np.full(SHAPE, value, dtype=np.uint8)
+
+
+def test_snapshot_reuses_its_array():
+    bg = SnapshotBackground()
+    bg.reset(_img(10))
+    frame = bg.frame
+    bg.reset(_img(20))
+    assert bg.frame is frame and bg.frame[0, 0] == 20
+    bg.update(_img(90), np.zeros(SHAPE, dtype=np.uint8))
+    assert bg.frame[0, 0] == 20
+    bg.reset(np.zeros((5, 5), dtype=np.uint8))
+    assert bg.frame.shape == (5, 5)
+    bg.clear()
+    assert bg.frame is None
+
+
+def test_running_average_follows_still_pixels_only():
+    bg = RunningAverageBackground(alpha=0.5)
+    bg.reset(_img(100))
+    frame = bg.frame
+    motion = np.zeros(SHAPE, dtype=np.uint8)
+    motion[:, :20] = 255
+    for expected in (110, 115, 118):
+        bg.update(_img(120), motion)
+        assert bg.frame[0, 30] == expected
+    assert (bg.frame[:, :20] == 100).all()
+    # In place, the detector keeps referencing the same arrays
+    assert bg.frame is frame
+
+    # Lighting drift: without motion the model converges onto the frame
+    for _ in range(20):
+        bg.update(_img(140), np.zeros(SHAPE, dtype=np.uint8))
+    assert (bg.frame == 140).all()
+
+
+def test_running_average_needs_a_reset():
+    bg = RunningAverageBackground()
+    bg.update(_img(50), np.zeros(SHAPE, dtype=np.uint8))
+    assert bg.frame is None
+    bg.reset(_img(50))
+    bg.clear()
+    assert bg.frame is None and bg.mean is None
+
+
+def test_make_background():
+    assert make_background("snapshot").kind == "snapshot"
+    assert make_background("running").kind == "running"
+    bg = RunningAverageBackground(alpha=0.2)
+    assert make_background(bg) is bg
+    with pytest.raises(ValueError):
+        make_background("median")
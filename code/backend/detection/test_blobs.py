@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+import pytest
+
+from blobs import (BLOB_FINDERS, blob_hull, blob_mask, find_blobs, find_contour_blobs, make_blob_finder,
+                   to_frame_blob, union_bbox)
+
+SHAPE = (90, 120)
+
+
+def _thresh():
+    """A large and a small rectangle and a speck"""
+    thresh = np.zeros(SHAPE, dtype=np.uint8)
+    thresh[20:40, 30:80] = 255
+    thresh[60:70, 90:100] = 255
+    thresh[5, 5] = 255
+    return thresh
+
+
+@pytest.mark.parametrize("name", sorted(BLOB_FINDERS))
+def test_finders_sort_and_filter(name):
+    blobs, labels, origin = make_blob_finder(name)(_thresh(), min_area=20)
+    assert [b.bbox for b in blobs] == [(30, 20, 50, 20), (90, 60, 10, 10)]
+    assert blobs[0].centroid == pytest.approx((54.5, 29.5), abs=0.5)
+
+    mask, corner = blob_mask(labels, blobs[1:], origin)
+    assert corner == (90, 60) and mask.shape == (10, 10) and mask.all()
+    hull = blob_hull(labels, blobs, origin).reshape(-1, 2)
+    # Around both rectangles, through their outer corners
+    assert hull[:, 0].min() == 30 and hull[:, 0].max() == 99
+    assert hull[:, 1].min() == 20 and hull[:, 1].max() == 69
+    assert make_blob_finder(name)(np.zeros(SHAPE, dtype=np.uint8)) == ([], None, (0, 0))
+
+
+def test_components_label_only_the_nonzero_box():
+    blobs, labels, origin = find_blobs(_thresh())
+    assert origin == (5, 5) and labels.shape == (65, 95)
+    assert [b.area for b in blobs] == [1000, 100, 1]
+    mask, corner = blob_mask(labels, blobs[:2], origin)
+    assert corner == (30, 20) and mask.sum() == 1100
+
+
+def test_contour_areas_and_masks():
+    blobs, labels, _ = find_contour_blobs(_thresh(), min_area=1)
+    assert labels is None
+    # Contour areas run through the outer pixel centres
+    assert [b.area for b in blobs] == [49 * 19, 9 * 9]
+    mask, corner = blob_mask(None, blobs[:1])
+    assert corner == (30, 20) and mask.sum() == 1000
+
+
+def test_to_frame_blob():
+    blob, = find_contour_blobs(_thresh(), min_area=500)[0]
+    full = to_frame_blob(blob, scale=2, offset=(100, 50))
+    assert full.bbox == (160, 90, 100, 40) and full.area == blob.area * 4
+    assert full.centroid == pytest.approx((blob.centroid[0] * 2 + 100, blob.centroid[1] * 2 + 50))
+    assert full.contour is None
+    assert union_bbox([blob, full]) == (30, 20, 230, 110)
+
+
+def test_unknown_finder():
+    assert make_blob_finder(cv2.findContours) is cv2.findContours
+    with pytest.raises(ValueError):
+        make_blob_finder("watershed")
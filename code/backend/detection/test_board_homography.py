@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from board_homography import (DEFAULT_MARKERS, BoardHomography, BoardRectifier, _transform, build_rectifier,
+                              marker_board_corners, relative_coords)
+from fusion import BOARD_RADII_MM
+
+# Image -> board mm: the bull at (960, 540), 2 px per mm, the board seen at a slight tilt
+H = np.array([[0.5, 0.02, -490.0], [0.0, 0.52, -281.0], [0.0, 0.00002, 1.0]])
+
+
+def _corners(H, markers=DEFAULT_MARKERS, size=40.0):
+    """Image corners of markers as a camera with homography H sees them"""
+    H_inv = np.linalg.inv(H)
+    return {i: _transform(H_inv, *marker_board_corners(c, size).T) for i, c in markers.items()}
+
+
+def test_scores_through_the_homography():
+    homography = BoardHomography(H, {}, 0.0)
+    bull = homography.to_image(0.0, 0.0)
+    assert homography.score(*bull) == "50"
+    # Straight up from the bull is the 20
+    for r, field in ((103.0, "T20"), (140.0, "S20"), (166.0, "D20"), (180.0, "0")):
+        x, y = homography.to_image(0.0, -r)
+        assert homography.score(x, y) == field, r
+        assert homography.to_board(x, y)[0] == pytest.approx(r)
+    assert homography.to_board_mm(*homography.to_image(33.0, -12.0)) == pytest.approx((33.0, -12.0))
+
+
+def test_overlay_calibration_follows_the_board():
+    homography = BoardHomography(H, {}, 0.0)
+    rings, sectors = homography.ring_data, homography.sector_config
+    assert len(rings) == len(BOARD_RADII_MM)
+    # Nested around the projected bull
+    bull = homography.to_image(0.0, 0.0)
+    assert rings[0][:2] == pytest.approx(bull, abs=3.0)
+    assert [float(r[2]) for r in rings] == sorted((float(r[2]) for r in rings), reverse=True)
+    assert len(sectors) == 6
+
+
+def test_solve_recovers_the_homography():
+    rectifier = BoardRectifier()
+    solved = rectifier.solve(_corners(H))
+    assert solved.error < 1e-3 and sorted(solved.corners) == sorted(DEFAULT_MARKERS)
+    pts = np.array([[960.0, 540.0], [1200.0, 300.0], [700.0, 800.0]])
+    assert _transform(solved.H, *pts.T) == pytest.approx(_transform(H, *pts.T), abs=1e-3)
+
+
+def test_solve_drops_a_misread_marker_and_needs_enough():
+    rectifier = BoardRectifier(min_markers=3)
+    corners = _corners(H)
+    corners[2] = corners[2] + 60.0
+    solved = rectifier.solve(corners)
+    assert sorted(solved.corners) == [0, 1, 3] and solved.error < 0.1
+    assert rectifier.solve({i: corners[i] for i in (0, 1)}) is None
+
+
+def test_update_solves_again_only_when_markers_moved():
+    rectifier = BoardRectifier(move_tolerance=2.0)
+    corners = _corners(H)
+    rectifier.detect = lambda frame: corners
+    assert rectifier.update(None) and rectifier.solves == 1
+    first = rectifier.homography
+    corners = {i: c + 1.0 for i, c in corners.items()}
+    assert not rectifier.update(None) and rectifier.homography is first
+    # Hidden markers keep the last homography
+    corners = {}
+    assert not rectifier.update(None) and rectifier.homography is first
+    corners = {i: c + 10.0 for i, c in _corners(H).items()}
+    assert rectifier.update(None) and rectifier.solves == 2
+    assert rectifier.homography.moved(corners) == 0.0
+    assert rectifier.stats()["checks"] == 4
+
+
+def test_rotation_turns_the_sectors():
+    corners = _corners(H)
+    plain = BoardRectifier().solve(corners)
+    turned = BoardRectifier(rotation=18.0).solve(corners)
+    x, y = plain.to_image(0.0, -140.0)
+    assert (turned.to_board(x, y)[1] - plain.to_board(x, y)[1]) % 360 == pytest.approx(342.0)
+    assert turned.score(x, y) == "S5"
+
+
+def test_relative_coords_and_config():
+    assert relative_coords(BOARD_RADII_MM[0], -9.0) == pytest.approx((100.0, 0.0))
+    assert build_rectifier({}) is None
+    rectifier = build_rectifier({"enabled": True, "markers": {"7": [0, -250]}, "min_markers": 1})
+    assert rectifier.markers == {7: (0.0, -250.0)} and rectifier.min_markers == 1
@@ -0,0 +1,117 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+import calibration
+from calibration import Calibration, CalibrationWatcher, build_watcher
+from file_handler import save_lines, save_rings
+from test_classifier import RINGS, SECTORS
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    """(rings, sectors) paths of every camera, in tmp_path, and no current calibration"""
+    def paths(camera=None):
+        suffix = "" if camera is None else f"_{camera}"
+        return str(tmp_path / f"rings{suffix}.json"), str(tmp_path / f"sectors{suffix}.json")
+
+    monkeypatch.setattr(calibration, "calibration_paths", paths)
+    monkeypatch.setattr(calibration, "_current", None)
+    return paths()
+
+
+def _save(files, rings=RINGS, sectors=SECTORS):
+    save_rings(rings, files[0])
+    save_lines(*sectors, path=files[1])
+
+
+def test_snapshot_is_immutable():
+    rings = [list(r) for r in RINGS]
+    snapshot = Calibration(rings, SECTORS)
+    rings[0][0] = 0.0
+    assert snapshot.ring_data[0][0] == RINGS[0][0]
+    with pytest.raises(ValueError):
+        snapshot.ring_data[0][0] = 1.0
+    assert snapshot == Calibration(RINGS, SECTORS) and hash(snapshot) == hash(Calibration(RINGS, SECTORS))
+    assert snapshot != Calibration(RINGS, (0.0,) + SECTORS[1:])
+
+
+def test_load(files):
+    missing = Calibration.load()
+    assert not missing.loaded and len(missing.ring_data) == 6
+    _save(files)
+    loaded = Calibration.load()
+    assert loaded.loaded and loaded == Calibration(RINGS, SECTORS)
+    with open(files[0], "w"):
+        pass
+    assert not Calibration.load().loaded
+
+
+def test_swap_and_reload(files):
+    _save(files)
+    first = calibration.current()
+    assert first == Calibration(RINGS, SECTORS) and calibration.current() is first
+
+    other = Calibration(RINGS, (5.0,) + SECTORS[1:])
+    assert calibration.swap(other) is other and calibration.current() is other
+
+    moved = [(x + 10, y, s, sx, sy) for x, y, s, sx, sy in RINGS]
+    _save(files, rings=moved)
+    # A reader holding the old snapshot keeps it
+    assert other.ring_data[0][0] == RINGS[0][0]
+    reloaded = calibration.reload()
+    assert calibration.current() is reloaded and reloaded.ring_data[0][0] == RINGS[0][0] + 10
+
+
+def _wait(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_watcher_reloads_changed_files(files):
+    _save(files)
+    changes = []
+    watcher = CalibrationWatcher(interval=0.02, on_change=changes.append).start()
+    try:
+        time.sleep(0.1)
+        assert not changes
+        # Caught mid-write: skipped, then picked up once the file is complete
+        with open(files[0], "w"):
+            pass
+        time.sleep(0.1)
+        assert not changes
+        moved = [(x, y + 4, s, sx, sy) for x, y, s, sx, sy in RINGS]
+        _save(files, rings=moved)
+        assert _wait(lambda: changes)
+        assert changes[0].ring_data[0][1] == pytest.approx(RINGS[0][1] + 4)
+        assert watcher.reloads == 1
+    finally:
+        watcher.stop()
+
+
+def test_watcher_swaps_by_default_and_per_camera(files, tmp_path):
+    _save(files)
+    watcher = CalibrationWatcher(interval=0.02).start()
+    try:
+        _save(files, sectors=(7.0,) + SECTORS[1:])
+        # mtime granularity: make sure the stamp differs
+        os.utime(files[0], (time.time() + 5, time.time() + 5))
+        assert _wait(lambda: calibration._current is not None and calibration._current.sector_config[0] == 7.0)
+    finally:
+        watcher.stop()
+
+    left = []
+    watcher = CalibrationWatcher(camera="left", interval=0.02, on_change=left.append).start()
+    try:
+        save_rings(RINGS, str(tmp_path / "rings_left.json"))
+        save_lines(*SECTORS, path=str(tmp_path / "sectors_left.json"))
+        assert _wait(lambda: left)
+        assert left[-1] == Calibration(RINGS, SECTORS)
+    finally:
+        watcher.stop()
+    assert build_watcher(0) is None and build_watcher(1.0).interval == 1.0
+    assert np.isclose(calibration.current().sector_config[0], 7.0)
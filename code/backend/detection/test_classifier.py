@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from calibration import Calibration
+from classifier import (classify_ring, classify_sector, classify_field, get_relative_coords,
+                        classify_ring_array, classify_sector_array, classify_field_array,
+                        get_relative_coords_array, field_lookup_table)
+
+WIDTH, HEIGHT = 1920, 1080
+# (cx, cy, scale, stretch_x, stretch_y) per ring, outermost first, as in rings.json
+RINGS = [(960.0, 540.0, 420.0, 1.05, 0.93), (960.5, 539.7, 394.8, 1.05, 0.93),
+         (961.0, 539.4, 264.6, 1.05, 0.93), (961.5, 539.1, 239.4, 1.05, 0.93),
+         (962.0, 538.8, 42.0, 1.05, 0.93), (962.5, 538.5, 16.8, 1.05, 0.93)]
+SECTORS = (-9.5, 2.0, -1.5, 1.0, 1.02, 0.98)
+CALIBRATION = Calibration(RINGS, SECTORS)
+
+
+def _uniform_points(rng, n):
+    """Over and a bit past the frame"""
+    return rng.uniform(-50, WIDTH + 50, n), rng.uniform(-50, HEIGHT + 50, n)
+
+
+def _edge_points(rng, n):
+    """Within a thousandth of a ring edge, and on the sector lines"""
+    ring_data = CALIBRATION.ring_data
+    ring = ring_data[rng.integers(0, len(ring_data))]
+    theta = rng.uniform(0, 2 * np.pi, n)
+    r = 1 + rng.normal(0, 1e-3, n)
+    edge_x = ring[0] + r * np.cos(theta) * ring[2] * ring[3]
+    edge_y = ring[1] + r * np.sin(theta) * ring[2] * ring[4]
+
+    rotation_deg, offset_x, offset_y, scale, stretch_x, stretch_y = CALIBRATION.sector_config
+    outer = ring_data[0]
+    angle = np.deg2rad(rng.integers(0, 20, n) * 18 + rotation_deg + rng.normal(0, 1e-4, n))
+    dist = rng.uniform(0, outer[2], n)
+    line_x = outer[0] + offset_x + dist * np.cos(angle) * outer[3] * scale * stretch_x
+    line_y = outer[1] + offset_y + dist * np.sin(angle) * outer[4] * scale * stretch_y
+    return np.concatenate([edge_x, line_x]), np.concatenate([edge_y, line_y])
+
+
+def _pixel_points(rng, n):
+    """Integer pixels, which is what tips and hover positions mostly are"""
+    return np.round(rng.uniform(0, WIDTH, n)), np.round(rng.uniform(0, HEIGHT, n))
+
+
+def _mismatches(xs, ys, calibration=CALIBRATION):
+    """Points where the *_array functions differ from the scalar ones"""
+    outer, inner = classify_ring_array(xs, ys, calibration)
+    sectors = classify_sector_array(xs, ys, calibration)
+    fields = classify_field_array(outer, inner, sectors, calibration)
+    rel_x, rel_y = get_relative_coords_array(xs, ys, calibration)
+
+    mismatches = []
+    for i, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+        ring_ids = classify_ring(x, y, calibration)
+        sector_id = classify_sector(x, y, calibration)
+        expected = (ring_ids, sector_id, classify_field(ring_ids, sector_id),
+                    get_relative_coords(x, y, calibration))
+        got_ids = [int(outer[i])] if inner[i] < 0 else [int(outer[i]), int(inner[i])]
+        got = (got_ids, int(sectors[i]), fields[i], (rel_x[i], rel_y[i]))
+        if got != expected:
+            mismatches.append(((x, y), expected, got))
+    return mismatches
+
+
+@pytest.mark.parametrize("points", [_uniform_points, _edge_points, _pixel_points])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_array_functions_match_scalar(points, seed):
+    xs, ys = points(np.random.default_rng(seed), 5000)
+    mismatches = _mismatches(xs, ys)
+    assert not mismatches, mismatches[:10]
+
+
+def test_ring_count_comes_from_the_calibration():
+    # Without the inner bull: the bull is the innermost ring there is
+    five = Calibration(RINGS[:5], SECTORS)
+    cx, cy = RINGS[4][0], RINGS[4][1]
+    assert classify_ring(cx, cy, five) == [4]
+    assert classify_ring(cx, cy, CALIBRATION) == [5]
+    assert classify_ring_array([cx], [cy], five)[0].tolist() == [4]
+    fields, lut = field_lookup_table(five)
+    assert lut.shape == (5, 6, 20)
+    xs, ys = _uniform_points(np.random.default_rng(0), 5000)
+    mismatches = _mismatches(xs, ys, five)
+    assert not mismatches, mismatches[:10]
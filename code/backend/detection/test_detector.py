@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+
+from detector import DartDetector
+from replay import ReplayClock
+from scheduler import MotionScheduler
+
+WIDTH, HEIGHT = 320, 240
+FPS = 30.0
+# Drawn from its tip at (200, 150) to the right, for tip_direction "left"
+DART = ((200, 150), (290, 160))
+DART_FRAME = 1740
+
+
+def _drifting_board(drift, flicker=True, frames=1860):
+    """
+    (t, frame) of a textured board that brightens evenly by drift gray levels per 58 s, a
+    dart landing at DART_FRAME. With flicker, a patch in the top left corner (outside the
+    board, see _IGNORE) lights up every 5 s, which wakes a scheduler without any motion
+    on the board.
+    """
+    rng = np.random.default_rng(0)
+    texture = cv2.GaussianBlur(rng.integers(30, 230, (HEIGHT, WIDTH)).astype(np.float32), (0, 0), 2)
+    for i in range(frames):
+        t = i / FPS
+        img = texture + drift * t / 58.0 + rng.normal(0, 2.0, texture.shape)
+        if flicker and i % 150 < 2:
+            img[10:40, 10:40] += 60
+        if i >= DART_FRAME:
+            cv2.line(img, DART[0], DART[1], 40.0, 4)
+        yield t, cv2.cvtColor(np.clip(img, 0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+
+
+_IGNORE = np.zeros((HEIGHT, WIDTH), dtype=bool)
+_IGNORE[:60, :60] = True
+
+
+def _tips(detector, frames):
+    clock = ReplayClock()
+    detector.clock = clock
+    tips = []
+    for t, frame in frames:
+        clock.set(t)
+        tips.extend(detector.update(frame, ignore_mask=_IGNORE)[0])
+    return tips
+
+
+def _assert_one_dart(tips):
+    assert len(tips) == 1, tips
+    x, y = tips[0]
+    assert np.hypot(x - DART[0][0], y - DART[0][1]) < 4, tips
+
+
+def test_scheduler_background_follows_drift():
+    # Lighting 17.8 gray levels brighter by the time the dart lands, just under the
+    # probe threshold, against a background that is as old as the first idle stretch
+    _assert_one_dart(_tips(DartDetector(scheduler=MotionScheduler()), _drifting_board(17.8)))
+
+
+def test_scheduler_refresh_on_long_idle():
+    scheduler = MotionScheduler(refresh_every=5.0)
+    _assert_one_dart(_tips(DartDetector(scheduler=scheduler), _drifting_board(17.8, flicker=False)))
+    assert scheduler.refreshes > 0
+
+
+def test_running_background_refines_against_drift():
+    # The pyramid finds the dart on the adapted work image, _refine_tip redoes it at full
+    # resolution against bg_full, which has to have followed the drift as well
+    detector = DartDetector(background="running", pyramid_levels=1)
+    _assert_one_dart(_tips(detector, _drifting_board(17.8, flicker=False)))
+
+
+def test_blob_finders_agree():
+    # Contours are the default, connected components the opt-in, see blobs.BLOB_FINDERS
+    tips = {finder: _tips(DartDetector(blob_finder=finder), _drifting_board(0.0, flicker=False))
+            for finder in ("contours", "components")}
+    _assert_one_dart(tips["contours"])
+    _assert_one_dart(tips["components"])
+    assert np.allclose(tips["contours"], tips["components"], atol=0.5), tips
@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+import pytest
+
+from filters import PRESETS, REFERENCE_STAGES, FilterPipeline
+
+
+def _diff(seed=0):
+    """A dart-like stroke on sensor noise, like the background diff"""
+    rng = np.random.default_rng(seed)
+    img = np.zeros((120, 160), dtype=np.uint8)
+    cv2.line(img, (30, 60), (130, 70), 120, 5)
+    return np.clip(img + rng.normal(0, 4, img.shape), 0, 255).astype(np.uint8)
+
+
+def test_reference_is_the_original_chain():
+    img = _diff()
+    expected = cv2.GaussianBlur(img, (5, 5), 0)
+    for _ in range(10):
+        expected = cv2.GaussianBlur(expected, (9, 9), 1)
+    expected = cv2.bilateralFilter(expected, 9, 75, 75)
+    assert np.array_equal(FilterPipeline.preset("reference")(img), expected)
+    assert np.array_equal(FilterPipeline()(img), expected)
+
+
+@pytest.mark.parametrize("name", sorted(set(PRESETS) - {"reference"}))
+def test_presets_stay_close_to_the_reference(name):
+    img = _diff()
+    reference = FilterPipeline.preset("reference")(img)
+    out = FilterPipeline.preset(name)(img)
+    assert np.abs(out.astype(int) - reference).max() <= 10
+    # What the motion threshold makes of it
+    assert ((out > 20) == (reference > 20)).mean() > 0.99
+
+
+@pytest.mark.parametrize("name", sorted(PRESETS))
+def test_buffers_are_reused(name):
+    pipeline = FilterPipeline.preset(name)
+    buffers = {}
+    first = pipeline(_diff(0), buffers)
+    kept = dict(buffers)
+    second = pipeline(_diff(1), buffers)
+    assert all(buffers[key] is kept[key] for key in kept)
+    assert any(second is buf for buf in buffers.values())
+    assert np.array_equal(second, pipeline(_diff(1)))
+    assert first is second
+
+
+def test_presets_leave_the_reference_stages_alone():
+    stages = [(kind, dict(params)) for kind, params in REFERENCE_STAGES]
+    assert FilterPipeline.preset("fastest").describe() == "gaussian:skip, gaussian:box, bilateral:skip"
+    assert REFERENCE_STAGES == stages
+
+
+def test_unknown_names():
+    with pytest.raises(ValueError):
+        FilterPipeline.preset("fancy")
+    with pytest.raises(ValueError):
+        FilterPipeline([("median", {"ksize": 5})])
+    with pytest.raises(ValueError):
+        FilterPipeline([("gaussian", {"ksize": 5, "mode": "fft"})])
@@ -0,0 +1,56 @@
+import numpy as np
+
+from frame_pool import FramePool, PIPELINE_FRAMES, build_frame_pool, retain
+from recorder import MotionRecorder
+
+SHAPE = (48, 64, 3)
+
+
+class _NullWriter:
+    def write(self, frame, ts, motion_level):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_buffers_return_to_the_pool():
+    pool = FramePool(2)
+    a, b = pool.acquire(SHAPE), pool.acquire(SHAPE)
+    assert pool.acquire(SHAPE) is None
+    assert retain(a.frame[10:20]) is a
+    a.release()
+    assert pool.acquire(SHAPE) is None
+    a.release()
+    assert pool.acquire(SHAPE) is a
+    assert pool.stats()["exhausted"] == 2
+    assert retain(np.zeros(SHAPE, dtype=np.uint8)) is None
+    b.release()
+
+
+def test_new_shape_drops_old_buffers():
+    pool = FramePool(1)
+    old = pool.acquire(SHAPE)
+    new = pool.acquire((24, 32, 3))
+    assert new is not None and new.array.shape == (24, 32, 3)
+    old.release()
+    assert pool.stats() == {"count": 1, "free": 0, "acquired": 2, "exhausted": 0, "allocations": 2}
+
+
+def test_pool_covers_the_recorder():
+    assert build_frame_pool(0) is None
+    recorder = MotionRecorder(_NullWriter(), pre_frames=15)
+    try:
+        pool = build_frame_pool(8, recorder)
+        assert pool.count == 15 + PIPELINE_FRAMES
+        # The recorder holds its pre_frames, the pipeline a few more on top
+        held = []
+        for i in range(100):
+            buf = pool.acquire(SHAPE)
+            assert buf is not None, f"pool ran dry at frame {i}"
+            recorder.record(buf.frame, 0, i / 30.0)
+            held.append(buf)
+            if len(held) > PIPELINE_FRAMES - 2:
+                held.pop(0).release()
+    finally:
+        recorder.close()
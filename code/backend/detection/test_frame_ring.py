@@ -0,0 +1,100 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from frame_ring import ClipWriter, FrameRing, build_frame_ring
+
+SHAPE = (24, 32)
+
+
+class _HeldWriter:
+    """A ClipWriter that keeps every clip until finish() is called, like one that is busy"""
+
+    def __init__(self, max_queue=2):
+        self.max_queue = max_queue
+        self.clips = []
+
+    def submit(self, name, frames, timestamps, on_written=None):
+        if len(self.clips) > self.max_queue:
+            return None
+        self.clips.append((name, list(frames), timestamps, on_written))
+        return name
+
+    def finish(self):
+        name, frames, timestamps, on_written = self.clips.pop(0)
+        on_written()
+        return frames, timestamps
+
+
+def _push(ring, start, count):
+    for i in range(start, start + count):
+        ring.push(np.full(SHAPE, i, dtype=np.uint8), float(i))
+
+
+def test_back_to_back_flushes_use_the_spares():
+    writer = _HeldWriter(max_queue=2)
+    ring = FrameRing(capacity=5, writer=writer)
+    _push(ring, 0, 7)
+    arrays = [ring.frames] + list(ring._spares)
+    assert len(arrays) == 1 + writer.max_queue + 1
+
+    # One clip being written and max_queue waiting: every flush continues in a spare
+    for clip in range(3):
+        assert ring.flush("dart") is not None
+        assert len(ring) == 0
+        _push(ring, 10 * (clip + 1), 3)
+    assert any(ring.frames is a for a in arrays)
+    assert ring.flush("dart") is None
+    assert (ring.dropped, len(ring)) == (1, 3)
+
+    frames, timestamps = writer.finish()
+    assert [int(f[0, 0]) for f in frames] == [2, 3, 4, 5, 6]
+    assert timestamps.tolist() == [2.0, 3.0, 4.0, 5.0, 6.0]
+    # The written array is the next spare, nothing was allocated
+    assert ring.flush("dart") is not None
+    assert any(ring.frames is a for a in arrays)
+    frames, _ = writer.finish()
+    assert [int(f[0, 0]) for f in frames] == [10, 11, 12]
+
+
+def test_new_frame_size_drops_old_spares():
+    writer = _HeldWriter(max_queue=1)
+    ring = FrameRing(capacity=4, writer=writer)
+    _push(ring, 0, 2)
+    ring.flush()
+    ring.push(np.zeros((12, 16), dtype=np.uint8), 9.0)
+    writer.finish()
+    assert ring.flush() is not None
+    assert ring.frames.shape == (4, 12, 16)
+    assert all(spare.shape == ring.frames.shape for spare in ring._spares)
+
+
+def test_request_flush_happens_on_push():
+    writer = _HeldWriter()
+    ring = FrameRing(capacity=4, writer=writer)
+    _push(ring, 0, 2)
+    ring.request_flush("manual")
+    assert not writer.clips
+    _push(ring, 2, 1)
+    assert len(writer.clips) == 1 and writer.clips[0][0].endswith("_0001_manual")
+    assert len(ring) == 0
+
+
+def test_clips_are_written(tmp_path):
+    ring = build_frame_ring({"enabled": True, "frames": 4, "dir": str(tmp_path), "queue": 3})
+    assert isinstance(ring.writer, ClipWriter) and ring.spares == 4
+    paths = []
+    for clip in range(3):
+        _push(ring, 10 * clip, 3)
+        paths.append(ring.flush("dart"))
+    ring.close()
+    assert ring.writer.stats()["written"] == 3 and ring.dropped == 0
+    for clip, path in enumerate(paths):
+        with open(os.path.join(path, "timestamps.json")) as f:
+            assert json.load(f) == [10.0 * clip, 10.0 * clip + 1, 10.0 * clip + 2]
+        frame = cv2.imread(os.path.join(path, "000002.png"), cv2.IMREAD_GRAYSCALE)
+        assert frame.shape == SHAPE and frame[0, 0] == 10 * clip + 2
+    assert len(ring._spares) == 4
+    assert build_frame_ring({"enabled": True, "frames": 0}) is None
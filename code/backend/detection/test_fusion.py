@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from classifier import classify_field, classify_ring, classify_sector
+from fusion import CameraGeometry, TipFuser, fuse, score_board, to_cartesian
+from test_classifier import CALIBRATION
+
+
+def test_geometry_scores_like_the_classifier():
+    geometry = CameraGeometry(CALIBRATION.ring_data, CALIBRATION.sector_config)
+    rng = np.random.default_rng(0)
+    for x, y in zip(rng.uniform(400, 1500, 2000).tolist(), rng.uniform(50, 1000, 2000).tolist()):
+        expected = classify_field(classify_ring(x, y, CALIBRATION), classify_sector(x, y, CALIBRATION))
+        assert score_board(*geometry.to_board(x, y)) == expected, (x, y)
+
+
+def test_geometry_needs_every_ring():
+    with pytest.raises(ValueError):
+        CameraGeometry(CALIBRATION.ring_data[:5], CALIBRATION.sector_config)
+
+
+def test_fuse_drops_the_outlier():
+    r, angle, used = fuse([(100.0, 10.0, 1.0), (102.0, 10.5, 1.0), (60.0, 200.0, 5.0)])
+    assert used == [0, 1]
+    assert r == pytest.approx(101.0, abs=0.1)
+    assert angle == pytest.approx(10.25, abs=0.05)
+
+
+def test_fuse_weights():
+    u, v = to_cartesian(*fuse([(100.0, 0.0, 3.0), (104.0, 0.0, 1.0)])[:2])
+    assert (u, v) == pytest.approx((101.0, 0.0))
+
+
+def test_fuser_completes_on_every_camera_or_window():
+    fuser = TipFuser(["a", "b", "c"], window=0.3)
+    assert fuser.add("a", 10.0, 100.0, 10.0) == []
+    assert fuser.add("b", 10.1, 101.0, 10.0) == []
+    assert fuser.poll(10.2) == []
+    hit, = fuser.add("c", 10.2, 99.0, 10.0)
+    assert sorted(hit["cameras"]) == ["a", "b", "c"]
+
+    fuser.add("a", 20.0, 50.0, 100.0)
+    hit, = fuser.poll(20.3)
+    assert hit["cameras"] == ["a"] and hit["field"] == score_board(50.0, 100.0)
+
+
+def test_fuser_same_camera_twice_is_two_darts():
+    fuser = TipFuser(["a", "b"], window=0.3)
+    fuser.add("a", 10.0, 100.0, 10.0)
+    first, = fuser.add("a", 10.1, 60.0, 200.0)
+    assert first["r"] == pytest.approx(100.0)
+    assert fuser.poll(10.4)[0]["r"] == pytest.approx(60.0)
+
+
+def test_fuser_drops_a_late_tip_of_the_same_dart():
+    fuser = TipFuser(["a", "b"], window=0.3, max_spread=12.0)
+    fuser.add("a", 10.0, 100.0, 10.0)
+    assert len(fuser.poll(10.3)) == 1
+    # b saw the same dart just after the window closed
+    assert fuser.add("b", 10.35, 101.0, 10.5) == []
+    assert fuser.poll(11.0) == []
+    assert (fuser.fused, fuser.late_tips) == (1, 1)
+
+
+def test_fuser_late_check_keeps_other_darts():
+    fuser = TipFuser(["a", "b"], window=0.3, max_spread=12.0)
+    fuser.add("a", 10.0, 100.0, 10.0)
+    fuser.poll(10.3)
+    # Somewhere else on the board
+    fuser.add("b", 10.35, 100.0, 90.0)
+    assert len(fuser.poll(10.65)) == 1
+
+    fuser.add("a", 20.0, 100.0, 10.0)
+    fuser.poll(20.3)
+    # The same spot, but long after the window
+    fuser.add("b", 21.0, 100.0, 10.0)
+    assert len(fuser.poll(21.3)) == 1
+    assert (fuser.fused, fuser.late_tips) == (4, 0)
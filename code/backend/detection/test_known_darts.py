@@ -0,0 +1,86 @@
+import math
+
+import cv2
+import numpy as np
+import pytest
+
+from detector import DartDetector
+from known_darts import KnownDarts
+
+
+def _ignore_mask(shape):
+    """Everything outside an off-centre ellipse, like BoardCache's ignore_mask"""
+    mask = np.ones(shape, dtype=np.uint8)
+    h, w = shape
+    cv2.ellipse(mask, (w // 2 + 7, h // 2 - 3), (w // 3, h // 3), 10.0, 0.0, 360.0, (0,), -1)
+    return mask.astype(bool)
+
+
+def _rebuilt(detector, ignore_mask, shape):
+    detector._keep_mask = None
+    return detector._get_keep_mask(ignore_mask, shape).copy()
+
+
+@pytest.mark.parametrize("shape", [(241, 321), (479, 637)])
+@pytest.mark.parametrize("roi", [None, (13, 7, 201, 149), (0, 31, 317, 177)])
+@pytest.mark.parametrize("levels", [0, 1, 2, 3])
+def test_stamped_keep_mask_matches_a_rebuild(shape, roi, levels):
+    detector = DartDetector(pyramid_levels=levels)
+    if roi is not None:
+        detector._set_roi(roi, shape)
+    ignore_mask = _ignore_mask(shape)
+    detector._get_keep_mask(ignore_mask, shape)
+
+    rng = np.random.default_rng(levels)
+    # Inside, across the roi edges and right on the frame corners
+    darts = [(int(x), int(y)) for x, y in zip(rng.integers(-5, shape[1] + 5, 40), rng.integers(-5, shape[0] + 5, 40))]
+    darts += [(0, 0), (shape[1] - 1, shape[0] - 1)]
+    if roi is not None:
+        x, y, w, h = detector.roi
+        darts += [(x - 3, y + h // 2), (x + w + 2, y + 5), (x + w // 2, y + h)]
+    for dart in darts:
+        detector.known_darts.append(dart)
+        stamped = detector._get_keep_mask(ignore_mask, shape).copy()
+        assert np.array_equal(stamped, _rebuilt(detector, ignore_mask, shape)), dart
+
+    # Removed darts rebuild, they cannot be unstamped
+    detector.known_darts = darts[:3]
+    assert np.array_equal(detector._get_keep_mask(ignore_mask, shape), _rebuilt(detector, ignore_mask, shape))
+    detector.cleanup()
+
+
+def test_version_and_generation():
+    darts = KnownDarts([(1, 2)])
+    assert (darts.version, darts.generation) == (1, 0)
+    darts.append((3, 4))
+    assert (darts.version, darts.generation) == (2, 0)
+    assert list(darts) == [(1, 2), (3, 4)] and darts[1:] == [(3, 4)] and len(darts) == 2
+    darts.clear()
+    assert (darts.version, darts.generation, len(darts)) == (3, 1, 0)
+    # Nothing to clear, nothing changed
+    darts.clear()
+    assert (darts.version, darts.generation) == (3, 1)
+
+
+@pytest.mark.parametrize("radius", [3.0, 16.0, 31.9, 32.0, 75.0])
+def test_near_matches_a_linear_search(radius):
+    rng = np.random.default_rng(int(radius))
+    points = list(zip(rng.uniform(-20, 300, 200).tolist(), rng.uniform(-20, 200, 200).tolist()))
+    darts = KnownDarts(points, cell_size=32)
+    for x, y in zip(rng.uniform(-40, 320, 500).tolist(), rng.uniform(-40, 220, 500).tolist()):
+        d = [math.hypot(px - x, py - y) for px, py in points]
+        i = int(np.argmin(d))
+        expected = points[i] if d[i] <= radius else None
+        assert darts.near(x, y, radius) == expected, (x, y)
+
+
+def test_near_at_the_duplicate_radius():
+    detector = DartDetector()
+    r = detector.duplicate_radius
+    detector.known_darts = [(100, 100)]
+    # The lookup is inclusive and reaches into the cells around the point's own
+    assert detector.known_darts.near(100 + r, 100, r) == (100, 100)
+    assert detector.known_darts.near(100 + r * 0.6, 100 + r * 0.8, r) == (100, 100)
+    assert detector.known_darts.near(100 + r + 0.01, 100, r) is None
+    assert detector.known_darts.near(100, 100 - r - 0.01, r) is None
+    detector.cleanup()
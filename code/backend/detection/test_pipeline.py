@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+
+from known_darts import KnownDarts
+from pipeline import Pipeline, View
+
+SHAPE = (24, 32, 3)
+
+
+class _Capture:
+    """count frames numbered in their first pixel, then end of stream"""
+
+    def __init__(self, count, delay=0.002):
+        self.count = count
+        self.delay = delay
+        self.i = 0
+
+    def read(self, image=None):
+        time.sleep(self.delay)
+        if self.i >= self.count:
+            return False, None
+        self.i += 1
+        return True, np.full(SHAPE, self.i, dtype=np.uint8)
+
+
+class _Detector:
+    """Fails on the frames in fail, adds a dart on every frame otherwise"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.seen = []
+        self.known_darts = KnownDarts()
+        self.debug_tip = None
+        self.scheduler = None
+
+    def update(self, frame):
+        n = int(frame[0, 0, 0])
+        self.seen.append(n)
+        if n in self.fail:
+            raise ValueError(f"frame {n}")
+        self.known_darts.append((n, n))
+        self.debug_tip = np.full((4, 4), n, dtype=np.uint8)
+        return [(n, n)], None, [], 0
+
+
+def _run(pipeline, timeout=5.0):
+    pipeline.start()
+    deadline = time.monotonic() + timeout
+    while pipeline.worker.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pipeline.stop()
+
+
+def test_failed_frames_are_counted_and_skipped():
+    results = []
+    detector = _Detector(fail={3, 4, 9})
+    pipeline = Pipeline(_Capture(20, delay=0.01), detector, lambda frame, result: results.append(result[0]),
+                        render=False)
+    _run(pipeline)
+    stats = pipeline.stats()["detection"]
+    # The grabber may skip a frame the worker was too slow for
+    failed = detector.fail.intersection(detector.seen)
+    assert failed and stats["errors"] == len(failed)
+    assert stats["frames"] == len(results) == len(detector.seen) - len(failed)
+    assert [(3, 3)] not in results and results[-1] == [(20, 20)]
+
+
+def test_worker_stops_after_max_errors_in_a_row():
+    pipeline = Pipeline(_Capture(200, delay=0.001), _Detector(fail=range(5, 200)), lambda frame, result: None,
+                        render=False)
+    pipeline.worker.max_errors = 10
+    _run(pipeline)
+    assert not pipeline.running
+    assert pipeline.worker.stats.errors == 10
+
+
+def test_render_gets_a_snapshot_of_the_detector():
+    detector = _Detector()
+    pipeline = Pipeline(_Capture(5, delay=0.02), detector, lambda frame, result: None)
+    pipeline.start()
+    try:
+        item = None
+        while item is None:
+            item = pipeline.next_render(timeout=1.0)
+        frame_id, frame, result, view = item
+        assert isinstance(view, View)
+        n = int(frame[0, 0, 0])
+        # What the detector had right after this frame, whatever it did since
+        assert view.known_darts[-1] == (n, n) and len(view.known_darts) == n
+        assert view.debug_tip[0, 0] == n
+        detector.known_darts.append((99, 99))
+        assert view.known_darts[-1] == (n, n)
+    finally:
+        pipeline.stop()
@@ -0,0 +1,96 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from recorder import JpegRingWriter, MotionRecorder, build_recorder, enforce_retention
+
+SHAPE = (24, 32, 3)
+
+
+class _ListWriter:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, frame, ts, motion_level):
+        self.frames.append((ts, motion_level))
+
+    def close(self):
+        pass
+
+
+def _files(directory, sizes, ages):
+    """One file per size, the i-th ages[i] seconds old"""
+    now = time.time()
+    paths = []
+    for i, (size, age) in enumerate(zip(sizes, ages)):
+        path = os.path.join(directory, f"{i:03d}.jpg")
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        os.utime(path, (now - age, now - age))
+        paths.append(path)
+    return paths
+
+
+def test_retention_by_size_keeps_the_newest(tmp_path):
+    paths = _files(str(tmp_path), [100] * 5, [50, 40, 30, 20, 10])
+    (tmp_path / "notes.txt").write_bytes(b"y" * 1000)
+    assert enforce_retention(str(tmp_path), (".jpg",), max_bytes=250) == 3
+    assert sorted(os.listdir(tmp_path)) == ["003.jpg", "004.jpg", "notes.txt"]
+    assert enforce_retention(str(tmp_path), (".jpg",), max_bytes=250) == 0
+    assert os.path.exists(paths[-1])
+
+
+def test_retention_by_age_and_kept_paths(tmp_path):
+    paths = _files(str(tmp_path), [10] * 4, [400, 300, 200, 100])
+    assert enforce_retention(str(tmp_path), (".jpg",), max_age=250, keep=(paths[0],)) == 1
+    assert sorted(os.listdir(tmp_path)) == ["000.jpg", "002.jpg", "003.jpg"]
+    assert enforce_retention(str(tmp_path / "missing"), (".jpg",), max_bytes=0) == 0
+
+
+def test_jpeg_ring_keeps_max_files(tmp_path):
+    writer = JpegRingWriter(str(tmp_path), max_files=3)
+    for i in range(7):
+        writer.write(np.full(SHAPE, i * 30, dtype=np.uint8), i / 30.0, 40 + i)
+    assert sorted(os.listdir(tmp_path)) == ["000004_motion_44.jpg", "000005_motion_45.jpg", "000006_motion_46.jpg"]
+
+
+def test_trigger_writes_the_lead_up_once():
+    writer = _ListWriter()
+    recorder = MotionRecorder(writer, pre_frames=3, post_frames=2, min_level=30)
+    frame = np.zeros(SHAPE, dtype=np.uint8)
+    levels = [0, 0, 50, 0, 0]
+    for i, level in enumerate(levels):
+        recorder.record(frame, level, float(i))
+    recorder.trigger()
+    for i in range(5, 9):
+        recorder.record(frame, 0, float(i))
+    recorder.close()
+    # Motion at 2, the lead-up 3 and 4 (2 was already written), then post_frames after the trigger
+    assert [ts for ts, _ in writer.frames] == [2.0, 3.0, 4.0, 5.0, 6.0]
+    assert recorder.stats()["triggers"] == 1 and recorder.recorded == 5
+
+
+def test_full_queue_drops_and_counts():
+    class _Slow(_ListWriter):
+        def write(self, frame, ts, motion_level):
+            time.sleep(0.05)
+            super().write(frame, ts, motion_level)
+
+    recorder = MotionRecorder(_Slow(), pre_frames=0, motion_only=False, max_queue=2)
+    for i in range(10):
+        recorder.record(np.zeros(SHAPE, dtype=np.uint8), 0, float(i))
+    recorder.close()
+    assert recorder.dropped > 0 and recorder.recorded + recorder.dropped == 10
+
+
+def test_build_recorder(tmp_path):
+    assert build_recorder({"mode": "off"}) is None
+    with pytest.raises(ValueError):
+        build_recorder({"mode": "gif", "dir": str(tmp_path)})
+    recorder = build_recorder({"mode": "jpeg", "dir": str(tmp_path), "max_mb": 1, "max_age_hours": 2})
+    try:
+        assert recorder.writer.max_bytes == 1024 * 1024 and recorder.writer.max_age == 7200
+    finally:
+        recorder.close()
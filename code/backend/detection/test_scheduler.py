@@ -0,0 +1,85 @@
+import numpy as np
+
+from detector import DartDetector
+from scheduler import MotionScheduler, build_scheduler
+
+SHAPE = (120, 160, 3)
+
+
+def _board(value=100):
+    return np.full(SHAPE, value, dtype=np.uint8)
+
+
+def _idle_scheduler(**kwargs):
+    """A scheduler that went idle on _board() at t=1, quiet since t=0"""
+    scheduler = MotionScheduler(**kwargs)
+    frame = _board()
+    # The first observe() only learns the darts version
+    for t in (-0.1, 0.0):
+        assert scheduler.wants_full(frame, t)
+        assert not scheduler.observe(frame, True, 0, t)
+    assert scheduler.wants_full(frame, 1.0)
+    assert scheduler.observe(frame, True, 0, 1.0)
+    assert scheduler.idle
+    return scheduler
+
+
+def test_probes_while_idle_and_escalates_on_change():
+    scheduler = _idle_scheduler()
+    assert not scheduler.wants_full(_board(), 1.5)
+    changed = _board()
+    changed[40:60, 60:80] = 200
+    assert scheduler.wants_full(changed, 1.6)
+    assert not scheduler.idle
+    assert (scheduler.probes, scheduler.escalations) == (2, 1)
+
+
+def test_small_or_faint_changes_stay_probes():
+    scheduler = _idle_scheduler(min_changed=64, thresh=18)
+    # 4 pixels is one pixel at scale 4, 16 full-resolution pixels
+    speck = _board()
+    speck[40:44, 60:64] = 200
+    assert not scheduler.wants_full(speck, 1.5)
+    assert not scheduler.wants_full(_board(110), 1.6)
+
+
+def test_new_dart_keeps_full_processing():
+    scheduler = _idle_scheduler(idle_after=1.0)
+    scheduler.wake()
+    frame = _board()
+    assert not scheduler.observe(frame, True, 0, 2.0)
+    # known_darts changed: the quiet stretch starts over
+    assert not scheduler.observe(frame, True, 1, 3.0)
+    assert not scheduler.observe(frame, True, 1, 3.5)
+    assert not scheduler.idle
+    assert scheduler.observe(frame, True, 1, 4.5)
+    assert scheduler.idle
+
+
+def test_refresh_while_idle():
+    scheduler = _idle_scheduler(refresh_every=5.0)
+    assert not scheduler.wants_full(_board(), 5.9)
+    assert scheduler.wants_full(_board(), 6.0)
+    assert scheduler.observe(_board(105), True, 0, 6.0)
+    assert scheduler.idle and scheduler.refreshes == 1
+    # The next refresh counts from the new reference
+    assert not scheduler.wants_full(_board(105), 10.9)
+
+    # Motion on a refresh frame escalates like a probe would
+    assert scheduler.wants_full(_board(105), 11.0)
+    assert not scheduler.observe(_board(105), False, 0, 11.0)
+    assert not scheduler.idle
+
+
+def test_background_reset_wakes_the_scheduler():
+    scheduler = _idle_scheduler()
+    detector = DartDetector(scheduler=scheduler)
+    detector.bg_frame = None
+    assert not scheduler.idle
+    assert scheduler.wants_full(_board(), 2.0)
+
+
+def test_build_scheduler():
+    assert build_scheduler({}) is None
+    scheduler = build_scheduler({"enabled": True, "scale": 2, "refresh_every": 0})
+    assert (scheduler.scale, scheduler.refresh_every) == (2, 0)
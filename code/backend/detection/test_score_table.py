@@ -0,0 +1,68 @@
+import numpy as np
+
+import score_table
+from calibration import Calibration
+from classifier import classify_field, classify_ring, classify_sector
+from score_table import ScoreTable, get_score_table, prepare_score_table, score_point
+from test_classifier import CALIBRATION, RINGS, SECTORS
+
+SHAPE = (270, 480)
+# The test board at a quarter of its size
+SMALL = Calibration([(x / 4, y / 4, s / 4, sx, sy) for x, y, s, sx, sy in RINGS],
+                    (SECTORS[0], SECTORS[1] / 4, SECTORS[2] / 4) + SECTORS[3:])
+
+
+def _expected(x, y, calibration):
+    return classify_field(classify_ring(x, y, calibration), classify_sector(x, y, calibration))
+
+
+def test_table_matches_the_classifier():
+    table = ScoreTable(SHAPE, SMALL)
+    rng = np.random.default_rng(0)
+    xs, ys = rng.integers(0, SHAPE[1], 3000), rng.integers(0, SHAPE[0], 3000)
+    assert [table.lookup(x, y) for x, y in zip(xs, ys)] == [_expected(x, y, SMALL) for x, y in zip(xs, ys)]
+    assert table.lookup_many([-1, 10_000], [5, 5]).tolist() == ["0", "0"]
+    assert table.matches(SHAPE, SMALL) and not table.matches(SHAPE, CALIBRATION)
+    assert not table.matches((SHAPE[0] + 1, SHAPE[1]), SMALL)
+
+
+def test_score_point_never_waits_for_the_table(monkeypatch):
+    monkeypatch.setattr(score_table, "_table", None)
+    builds = []
+    monkeypatch.setattr(score_table, "prepare_score_table", lambda *args: builds.append(args))
+    # No table yet: the classifier answers and the table is prepared
+    assert score_point(120, 67, SHAPE, SMALL) == _expected(120, 67, SMALL)
+    assert builds == [(SHAPE, SMALL)]
+
+
+def test_prepare_builds_once_in_the_background(monkeypatch):
+    monkeypatch.setattr(score_table, "_table", None)
+    thread = prepare_score_table(SHAPE, SMALL)
+    assert thread is not None
+    # Already being built
+    assert prepare_score_table(SHAPE, SMALL) is None
+    thread.join()
+    table = get_score_table(SHAPE, SMALL)
+    assert table.matches(SHAPE, SMALL)
+    assert prepare_score_table(SHAPE, SMALL) is None
+    assert score_point(120, 67, SHAPE, SMALL) == table.lookup(120, 67)
+
+
+def test_get_score_table_follows_calibration_and_size(monkeypatch):
+    monkeypatch.setattr(score_table, "_table", None)
+    table = get_score_table(SHAPE, SMALL)
+    assert get_score_table(SHAPE, SMALL) is table
+    # An equal snapshot loaded again keeps the table, different values or sizes do not
+    assert get_score_table(SHAPE, Calibration(SMALL.ring_data, SMALL.sector_config)) is table
+    moved = Calibration([(x + 3, y, s, sx, sy) for x, y, s, sx, sy in SMALL.ring_data], SMALL.sector_config)
+    assert get_score_table(SHAPE, moved).matches(SHAPE, moved)
+    assert get_score_table((100, 200), moved).shape == (100, 200)
+
+
+def test_points_outside_the_frame(monkeypatch):
+    monkeypatch.setattr(score_table, "_table", ScoreTable(SHAPE, SMALL))
+    labels = score_table._table.lookup_labels([-1, 0, SHAPE[1], SHAPE[1] - 1], [0, -1, 0, SHAPE[0] - 1])
+    assert labels[:3].tolist() == [score_table.MISS_LABEL] * 3
+    # Past the frame the board can still reach, the classifier scores it
+    for x, y in ((-30, 60), (SHAPE[1] + 5, 100)):
+        assert score_point(x, y, SHAPE, SMALL) == _expected(x, y, SMALL)
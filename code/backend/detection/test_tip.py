@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+import pytest
+
+from blobs import find_contour_blobs
+from tip import REJECTIONS, TipLocator
+
+SHAPE = (120, 200)
+# Drawn to the right of its tip, for direction "left"
+TIP = (60.37, 58.81)
+
+
+def _dart_diff(tip=TIP, contrast=120, noise=2.0, seed=0):
+    """(diff, thresh) of a pointed shaft and barrel drawn at sub-pixel coordinates"""
+    rng = np.random.default_rng(seed)
+    img = np.zeros(SHAPE, dtype=np.float32)
+    tip = np.array(tip)
+    a = 0.2
+    d, n = np.array([np.cos(a), np.sin(a)]), np.array([-np.sin(a), np.cos(a)])
+    shaft_end, barrel_end = tip + 30 * d, tip + 90 * d
+
+    def poly(points):
+        return [np.round(np.array(points) * 16).astype(np.int32)]
+
+    cv2.fillPoly(img, poly([tip, shaft_end + 2 * n, shaft_end - 2 * n]), contrast, cv2.LINE_AA, 4)
+    cv2.fillPoly(img, poly([shaft_end + 4 * n, barrel_end + 4 * n, barrel_end - 4 * n, shaft_end - 4 * n]),
+                 contrast, cv2.LINE_AA, 4)
+    img = cv2.GaussianBlur(img + rng.normal(0, noise, SHAPE).astype(np.float32), (9, 9), 0)
+    diff = np.clip(np.abs(img), 0, 255).astype(np.uint8)
+    _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
+    return diff, thresh
+
+
+def _locate(locator, thresh, diff=None):
+    blobs, labels, origin = find_contour_blobs(thresh, 50)
+    return locator.locate(labels, blobs, origin, diff)
+
+
+@pytest.mark.parametrize("contrast", [150, 120])
+def test_subpixel_tip(contrast):
+    locator = TipLocator("left")
+    diff, thresh = _dart_diff(contrast=contrast)
+    tip, centroid, hull = _locate(locator, thresh, diff)
+    assert np.hypot(*(tip - TIP)) < 0.5
+    assert locator.faces_forward(tip, centroid)
+    assert (locator.refined, locator.coarse) == (1, 0)
+    assert locator.rejected == dict.fromkeys(REJECTIONS, 0)
+
+
+def test_faint_tip_is_found_past_the_blob():
+    # The blob ends well before the tip, the diff still shows it
+    diff, thresh = _dart_diff(contrast=60)
+    coarse, _, _ = _locate(TipLocator("left"), thresh)
+    assert coarse[0] - TIP[0] > 8
+    tip, _, _ = _locate(TipLocator("left"), thresh, diff)
+    assert np.hypot(*(tip - TIP)) < 1.5
+
+
+def test_coarse_tip_without_contrast():
+    locator = TipLocator("left", min_contrast=500)
+    diff, thresh = _dart_diff()
+    tip, _, _ = _locate(locator, thresh, diff)
+    assert (locator.refined, locator.coarse) == (0, 1)
+    assert locator.rejected["no_shaft"] == 1
+    assert tip[0] > TIP[0]
+
+    # Without a diff nothing is refined or rejected
+    _locate(locator, thresh)
+    assert locator.coarse == 2 and sum(locator.rejected.values()) == 1
@@ -0,0 +1,173 @@
+import math
+
+import cv2
+import numpy as np
+
+from blobs import blob_hull, blob_mask
+
+# Which way darts point in the image, for DartDetector(tip_direction=...). Degrees in
+# image coordinates (0 = right, 90 = down) are accepted as well
+DIRECTIONS = {"right": 0.0, "down": 90.0, "left": 180.0, "up": 270.0}
+
+# Why TipLocator kept a coarse tip: the profiles left the diff image, no shaft across the
+# axis, too little contrast between shaft and board along it, or no drop to level
+REJECTIONS = ("outside", "no_shaft", "low_contrast", "no_edge")
+
+
+def direction_vector(direction):
+    angle = DIRECTIONS[direction] if isinstance(direction, str) else float(direction)
+    a = math.radians(angle)
+    return np.array([math.cos(a), math.sin(a)])
+
+
+def _median(values):
+    # np.median costs ~10 ms on its first call, which would land on the first dart
+    values = np.sort(values)
+    return values[len(values) // 2]
+
+
+class TipLocator:
+    """
+    Finds the tip of a dart blob with sub-pixel precision:
+
+    1. The dart's axis is the principal axis of the largest blob (from its second order
+       moments), signed to point along direction. A blob that is not elongated enough to
+       have a clear axis (min_elongation) uses direction itself.
+    2. The coarse tip is the hull point of all blobs furthest along that axis, moved
+       sideways onto the axis line through the blob centroid.
+    3. On the absdiff image the tip is then refined along the axis: a few profiles across
+       the shaft just behind the coarse tip centre the line on the shaft, and the profile
+       along the axis puts the tip where the diff has dropped to level (between board
+       0.0 and shaft 1.0) and stays below it for reach / 2, interpolated between samples.
+       The board level is taken ahead * reach past the coarse tip, as the blob of a faint
+       pointed tip can end 5-15 px before it. level is below 0.5 because a pointed tip
+       fades out before its end: 0.35 is within half a pixel for pointed tips and about
+       a pixel for blunt ones.
+
+    Without a diff image or with less than min_contrast between shaft and board, the
+    coarse tip is returned, see rejected for why.
+    """
+
+    def __init__(self, direction="left", level=0.35, reach=8.0, ahead=3.0, step=0.25, min_contrast=6.0,
+                 min_elongation=1.5):
+        self.direction = direction
+        self.level = level
+        self.reach = reach
+        self.ahead = ahead
+        self.step = step
+        self.min_contrast = min_contrast
+        self.min_elongation = min_elongation
+        self.refined = 0
+        self.coarse = 0
+        # Why _refine kept the coarse tip, per reason in REJECTIONS
+        self.rejected = dict.fromkeys(REJECTIONS, 0)
+
+    @property
+    def direction(self):
+        return self._direction
+
+    @direction.setter
+    def direction(self, direction):
+        self._vector = direction_vector(direction)
+        self._direction = direction
+
+    def axis(self, mask, corner=(0, 0)):
+        """(unit axis vector along direction, centroid) of a 0/1 mask, or (None, None) if it is empty."""
+        m = cv2.moments(mask, binaryImage=True)
+        if m["m00"] == 0:
+            return None, None
+        centroid = np.array([m["m10"] / m["m00"] + corner[0], m["m01"] / m["m00"] + corner[1]])
+        mu20, mu02, mu11 = m["mu20"] / m["m00"], m["mu02"] / m["m00"], m["mu11"] / m["m00"]
+        spread = math.hypot(mu20 - mu02, 2 * mu11)
+        major, minor = (mu20 + mu02 + spread) / 2, (mu20 + mu02 - spread) / 2
+        if minor > 0 and math.sqrt(major / minor) < self.min_elongation:
+            return self._vector.copy(), centroid
+        theta = 0.5 * math.atan2(2 * mu11, mu20 - mu02)
+        axis = np.array([math.cos(theta), math.sin(theta)])
+        if axis @ self._vector < 0:
+            axis = -axis
+        return axis, centroid
+
+    def locate(self, labels, blobs, origin=(0, 0), diff=None, diff_origin=(0, 0)):
+        """
+        (tip, centroid, hull) of blobs as find_blobs returned them, tip and centroid as
+        float (x, y) in thresh pixels, or (None, None, None). diff is the absdiff image
+        with its corner at diff_origin in the same pixels, None to skip the refinement.
+        """
+        if not blobs:
+            return None, None, None
+        axis, centroid = self.axis(*blob_mask(labels, blobs[:1], origin))
+        hull = blob_hull(labels, blobs, origin)
+        pts = hull.reshape(-1, 2)
+        along = (pts - centroid) @ axis
+        # Furthest hull point along the axis, on the axis line
+        tip = centroid + along.max() * axis
+
+        if diff is not None:
+            refined, reason = self._refine(diff, tip - diff_origin, axis)
+            if refined is not None:
+                self.refined += 1
+                return refined + diff_origin, centroid, hull
+            self.rejected[reason] += 1
+        self.coarse += 1
+        return tip, centroid, hull
+
+    def faces_forward(self, tip, centroid):
+        """False for a 'tip' behind the centroid, i.e. on the flight end"""
+        return (np.asarray(tip, dtype=np.float64) - centroid) @ self._vector > 0
+
+    def _sample(self, diff, xs, ys):
+        """Bilinear samples of diff at float coordinates of the same shape."""
+        x0 = max(0, int(math.floor(xs.min())) - 1)
+        y0 = max(0, int(math.floor(ys.min())) - 1)
+        x1 = min(diff.shape[1], int(math.ceil(xs.max())) + 2)
+        y1 = min(diff.shape[0], int(math.ceil(ys.max())) + 2)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        window = diff[y0:y1, x0:x1].astype(np.float32)
+        return cv2.remap(window, (xs - x0).astype(np.float32), (ys - y0).astype(np.float32),
+                         cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+    def _refine(self, diff, tip, axis):
+        r, step = self.reach, self.step
+        normal = np.array([-axis[1], axis[0]])
+
+        # Across the shaft, a few pixels behind the tip: centre the axis line on it
+        across = np.arange(-r, r + step, step)
+        behind = np.array([-2.0, -3.0, -4.0])[:, None]
+        xs = tip[0] + behind * axis[0] + across * normal[0]
+        ys = tip[1] + behind * axis[1] + across * normal[1]
+        profile = self._sample(diff, xs, ys)
+        if profile is None:
+            return None, "outside"
+        profile = profile.mean(axis=0)
+        weights = np.clip(profile - _median(profile), 0, None)
+        if weights.max() < self.min_contrast:
+            return None, "no_shaft"
+        tip = tip + normal * float((weights * across).sum() / weights.sum())
+
+        # Along the axis: from the shaft behind the tip out onto the board
+        far = self.ahead * r
+        along = np.arange(-2 * r, far + step, step)
+        offsets = np.array([-1.0, 0.0, 1.0])[:, None]
+        xs = tip[0] + along * axis[0] + offsets * normal[0]
+        ys = tip[1] + along * axis[1] + offsets * normal[1]
+        profile = self._sample(diff, xs, ys)
+        if profile is None:
+            return None, "outside"
+        profile = profile.mean(axis=0)
+        shaft = _median(profile[along <= -r])
+        board = _median(profile[along >= far - r / 2])
+        if shaft - board < self.min_contrast:
+            return None, "low_contrast"
+        edge = board + self.level * (shaft - board)
+        below = profile < edge
+        # The first drop past the shaft that stays down, not a dip along it or the next dart
+        stay = int(r / 2 / step)
+        falls = [i for i in np.flatnonzero(~below[:-1] & below[1:]).tolist()
+                 if along[i] >= -r and below[i + 1:i + 1 + stay].all()]
+        if not falls:
+            return None, "no_edge"
+        i = falls[0]
+        t = along[i] + step * (profile[i] - edge) / (profile[i] - profile[i + 1])
+        return tip + t * axis, None